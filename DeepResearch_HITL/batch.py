@@ -0,0 +1,100 @@
+"""
+batch.py
+
+Recherches DeepResearch en lot, sans Streamlit.
+
+Lit un fichier de questions (une par ligne, lignes vides et '#' ignorées),
+lance N recherches en parallèle et écrit pour chacune un rapport Markdown,
+plus une ligne de statistiques dans stats.jsonl.
+
+    python -m DeepResearch_HITL.batch questions.txt --concurrency 4 --max-iterations 2 --out reports/
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+import traceback
+
+# Mêmes chemins que l'application Streamlit : racine du projet + agent_with_multitools (pour `utils`)
+current_dir = os.path.dirname(os.path.abspath(__file__))
+root_dir = os.path.abspath(os.path.join(current_dir, ".."))
+for path in (root_dir, os.path.join(root_dir, "agent_with_multitools")):
+    if path not in sys.path:
+        sys.path.append(path)
+
+from DeepResearch_HITL.engine import run_research
+from DeepResearch_HITL.utils.reporter import Reporter
+
+
+def read_questions(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def slugify(text: str, max_length: int = 60) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug[:max_length].rstrip("-") or "report"
+
+
+async def run_one(index: int, question: str, args, semaphore: asyncio.Semaphore, stats_file) -> dict:
+    async with semaphore:
+        reporter = Reporter(prefix=f"[{index:03d}] ")
+        reporter.info(f"▶️ {question}")
+        record = {"index": index, "query": question}
+        start = time.perf_counter()
+        try:
+            run = await run_research(question, max_iterations=args.max_iterations, reporter=reporter)
+            report_path = os.path.join(args.out, f"{index:03d}_{slugify(question)}.md")
+            with open(report_path, "w", encoding="utf-8") as f:
+                f.write(run.final_report)
+            record.update(run.stats(), status="ok", report=report_path)
+            reporter.info(f"✅ Done in {run.elapsed:.1f}s → {report_path}")
+        except Exception as e:
+            record.update(status="error", error=str(e), elapsed_s=round(time.perf_counter() - start, 2))
+            reporter.error(f"❌ {e}\n{traceback.format_exc()}")
+
+        stats_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        stats_file.flush()
+        return record
+
+
+async def run_batch(args) -> list:
+    questions = read_questions(args.questions)
+    os.makedirs(args.out, exist_ok=True)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    with open(os.path.join(args.out, "stats.jsonl"), "a", encoding="utf-8") as stats_file:
+        return await asyncio.gather(*(
+            run_one(i, question, args, semaphore, stats_file)
+            for i, question in enumerate(questions, 1)
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run DeepResearch on a file of questions.")
+    parser.add_argument("questions", help="Text file with one research question per line")
+    parser.add_argument("--out", default="reports", help="Output directory for reports and stats.jsonl")
+    parser.add_argument("--concurrency", type=int, default=4, help="Research runs in parallel")
+    parser.add_argument("--max-iterations", type=int, default=2, help="Research depth per question")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    start = time.perf_counter()
+    records = asyncio.run(run_batch(args))
+    ok = [r for r in records if r["status"] == "ok"]
+    total_cost = sum(r.get("cost_usd", 0.0) for r in ok)
+    print(
+        f"🏁 {len(ok)}/{len(records)} runs succeeded in {time.perf_counter() - start:.1f}s "
+        f"— estimated cost ${total_cost:.4f} — stats in {os.path.join(args.out, 'stats.jsonl')}"
+    )
+
+
+if __name__ == "__main__":
+    main()
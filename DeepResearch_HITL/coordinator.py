@@ -1,20 +1,36 @@
 import os
 import time
-from datetime import datetime
-from typing import List, TypedDict, Optional, Set
+import asyncio
+from typing import Dict, List, TypedDict, Optional, Set
 
-import streamlit as st
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
 
 from DeepResearch_HITL.model import SearchResult
 from DeepResearch_HITL.research_agents.query_agent import query_agent, QueryResponse
 from DeepResearch_HITL.research_agents.search_agent import search_agent
-from DeepResearch_HITL.research_agents.synthesis_agent import synthesis_agent
+from DeepResearch_HITL.research_agents.synthesis_agent import synthesis_agent, section_agent, framing_agent
 from DeepResearch_HITL.research_agents.followup_agent import follow_up_decision_agent, FollowUpDecisionResponse
+from DeepResearch_HITL.utils.config import (
+    get_summary_timeout, get_synthesis_mode, get_query_dedup_threshold,
+    get_followup_context_tokens, get_synthesis_context_tokens, get_section_context_tokens, get_digest_entry_tokens,
+    get_fetch_pool_size, get_fetch_per_host, get_fetch_timeout, get_fetch_deadline, get_fetch_max_bytes,
+)
+from DeepResearch_HITL.utils.adaptive_limiter import AdaptiveLimiter, get_limiter
+from DeepResearch_HITL.utils.context_packer import pack, pack_results, is_informative, digest_entry
+from DeepResearch_HITL.utils.page_fetcher import PageFetcher
+from DeepResearch_HITL.utils.query_dedup import dedup_queries
+from DeepResearch_HITL.utils.report_format import relabel_sources, number_section, table_of_contents
+from DeepResearch_HITL.utils.reporter import Reporter, get_reporter
+from DeepResearch_HITL.utils.summary_cache import get_summary_cache, summary_key
+from DeepResearch_HITL.utils.urls import canonical_url
 from tavily import TavilyClient
 
 
 from utils.config import load_env, get_openai_key, get_tavily_key
+from utils.model_routing import get_role_model
+from utils.search_cache import cached_search
+from utils.tracing import span, traced_node, KIND_CLIENT
 
 load_env()
 
@@ -31,97 +47,167 @@ class ResearchState(TypedDict):
     final_report: Optional[str]
     max_iterations: int  # Ajout du contrôle de profondeur
     processed_queries: Set[str]  # Nouvelle propriété pour suivre les requêtes déjà traitées
+    next: Optional[str]  # Prochain nœud choisi par followup_node
+    sections: Dict[str, str]  # Mode map-reduce : section rédigée par sous-requête
+    source_ids: Dict[str, int]  # URL canonique -> numéro provisoire [Source N]
+    findings_digest: List[str]  # Entrée compacte par résultat (alignée sur search_results) pour followup
 
 # --- LangGraph Nodes ---
-async def generate_subqueries_node(state: ResearchState) -> ResearchState:
-    query = state["query"]
-
-    if "session_id" not in st.session_state:
-        st.session_state.session_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
-
-    # --- Étape 1 : génération si subqueries n'existent pas en session ---
-    if st.session_state.subqueries is None:
-        with st.spinner("🔎 Generating sub-queries..."):
-            result: QueryResponse = await query_agent(query)
+# Aucun nœud ne dépend de Streamlit : l'affichage passe par le Reporter de la config
+# (config["configurable"]["reporter"]) et les callbacks LangChain sont hérités du graphe.
+async def plan_subqueries_node(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    """
+    Garde les sous-requêtes déjà validées (interface HITL) ; sinon les génère avec
+    query_agent, retire les quasi-doublons, puis les soumet au hook optionnel
+    config["configurable"]["validate_subqueries"].
+    """
+    reporter = get_reporter(config)
 
-        st.session_state.subqueries = result.queries
-        st.session_state.thoughts = result.thoughts
-        st.session_state.awaiting_feedback = True
-        
-        # Ne pas retourner state immédiatement, continuer pour afficher le formulaire
-
-    # --- Étape 2 : interface de feedback utilisateur ---
-    if st.session_state.awaiting_feedback:
-        form_key = f"subquery_form_{st.session_state.session_id}"
-        with st.form(key=form_key, clear_on_submit=True):
-            st.subheader("✏️ Validate or Edit Sub-Queries")
-            st.markdown(f"**🧠 AI Thoughts:** {st.session_state.thoughts}")
-
-            # Affichage de la profondeur de recherche configurée
-            st.info(f"🔍 Research depth: {state.get('max_iterations', 2)} iterations")
-
-            edited_queries = []
-            for i, query in enumerate(st.session_state.subqueries):
-                edited_query = st.text_input(
-                    f"Sub-Query {i + 1}",
-                    value=query,
-                    key=f"edit_query_{i}_{st.session_state.session_id}"
-                )
-                edited_queries.append(edited_query)
+    if not state.get("subqueries"):
+        with reporter.spinner("🔎 Generating sub-queries..."):
+            result: QueryResponse = await query_agent(state["query"])
+        state["thoughts"] = result.thoughts
+        result.queries = await drop_duplicate_queries(result.queries, state.get("processed_queries") or set(), reporter)
 
-            feedback = st.text_area(
-                "💬 Feedback for improvement (leave blank if satisfied):",
-                key=f"feedback_area_{st.session_state.session_id}"
-            )
+        validate = config.get("configurable", {}).get("validate_subqueries")
+        state["subqueries"] = await validate(state["query"], result) if validate else result.queries
 
-            submitted = st.form_submit_button("✅ Validate Queries")
-
-            if submitted:
-                if feedback.strip() == "":
-                    st.session_state.awaiting_feedback = False
-                    st.session_state.validated_queries = edited_queries
-                    st.session_state.step = "continue_graph"  # Signal pour continuer le flux
-                    st.rerun()
-                else:
-                    revised_input = f"Original query: {query}\nUser feedback: {feedback}"
-                    with st.spinner("🔄 Regenerating queries based on feedback..."):
-                        result = await query_agent(revised_input)
-                    st.session_state.subqueries = result.queries
-                    st.session_state.thoughts = result.thoughts
-                    st.rerun()
-
-        # Arrêter l'exécution pour permettre l'interaction avec le formulaire
-        st.stop()
-
-    # --- Étape 3 : feedback validé, mise à jour du state et signal de reprise ---
-    # Ce code ne sera exécuté que lorsque awaiting_feedback est False
-    state["subqueries"] = st.session_state.validated_queries
-    state["thoughts"] = st.session_state.thoughts
-    
     # Initialiser processed_queries s'il n'existe pas encore
     if "processed_queries" not in state or state["processed_queries"] is None:
         state["processed_queries"] = set()
-        
+
     return state
 
 
+TAVILY_PARAMS = {
+    "search_depth": "advanced",
+    "max_results": 5,
+    "include_answer": True,
+}
+
+
+def _tavily_fetch(query: str):
+    with span("tavily.search", KIND_CLIENT, query=query):
+        return tavily_client.search(query=query, **TAVILY_PARAMS)
+
+
+def _tavily_request(query: str):
+    # Cache SQLite partagé : même requête normalisée + mêmes paramètres = pas d'appel réseau
+    response = cached_search("tavily", query, TAVILY_PARAMS, lambda: _tavily_fetch(query))
+    return response.get('results', [])
 
-def tavily_search(query: str):
+
+def tavily_search(query: str, reporter: Optional[Reporter] = None):
     try:
-        response = tavily_client.search(
-            query=query,
-            search_depth="advanced",
-            max_results=5,
-            include_answer=True
-        )
-        return response.get('results', [])
+        return _tavily_request(query)
     except Exception as e:
-        st.error(f"❌ Tavily Search Error: {e}")
+        (reporter or Reporter()).error(f"❌ Tavily Search Error: {e}")
         return []
 
 
-async def perform_search_node(state: ResearchState) -> ResearchState:
-    st.info("🌐 Starting research on your queries...")
+async def atavily_search(query: str, reporter: Optional[Reporter] = None):
+    # Le client Tavily est synchrone : on l'exécute dans un thread pour lancer les requêtes en parallèle,
+    # dans la limite adaptative de l'étape "search" (réduite sur 429 / timeout)
+    try:
+        async with get_limiter("search").slot():
+            return await asyncio.to_thread(_tavily_request, query)
+    except Exception as e:
+        (reporter or Reporter()).error(f"❌ Tavily Search Error: {e}")
+        return []
+
+
+async def drop_duplicate_queries(candidates: List[str], processed: Set[str], reporter: Reporter) -> List[str]:
+    """Filtre les requêtes déjà traitées ou quasi identiques (similarité >= QUERY_DEDUP_THRESHOLD)."""
+    try:
+        kept, skipped = await dedup_queries(candidates, sorted(processed), get_query_dedup_threshold())
+    except Exception as e:
+        reporter.warning(f"⚠️ Semantic query deduplication unavailable, using exact matching: {e}")
+        return [q for q in dict.fromkeys(candidates) if q not in processed]
+
+    for skip in skipped:
+        reporter.info(f"⏭️ Skipped query '{skip.query}': too close to '{skip.duplicate_of}' (similarity {skip.similarity:.2f})")
+    return kept
+
+
+def build_summary_input(result: dict, page_text: Optional[str]) -> str:
+    # Sans page téléchargée, on se rabat sur l'extrait fourni par Tavily
+    content = page_text or result.get('content') or "No page content could be retrieved."
+    return (
+        f"Title: {result.get('title', 'No Title')}\n"
+        f"URL: {result.get('url', '')}\n\n"
+        f"Content:\n{content}"
+    )
+
+
+async def summarize_result(
+    input_text: str, url: str, limiter: AdaptiveLimiter, timeout: float, reporter: Reporter
+) -> Optional[str]:
+    """Résume un résultat Tavily. Retourne None si le résumé échoue ou dépasse le timeout."""
+    # Le timeout et les erreurs traversent la place du limiteur : ils réduisent la concurrence
+    try:
+        async with limiter.slot():
+            summary = await asyncio.wait_for(search_agent(input_text), timeout=timeout)
+    except asyncio.TimeoutError:
+        reporter.warning(f"⏱️ Summary timed out after {timeout:.0f}s: {url}")
+        return None
+    except Exception as e:
+        reporter.warning(f"⚠️ Summary failed for {url}: {e}")
+        return None
+    return summary.strip()
+
+
+# --- Map-reduce synthesis ---
+def assign_source_id(source_ids: Dict[str, int], url: str) -> int:
+    # Numéro provisoire, attribué à la première citation ; renuméroté dans l'ordre
+    # final des résultats lors de l'assemblage du rapport
+    key = canonical_url(url) or url
+    if key not in source_ids:
+        source_ids[key] = len(source_ids) + 1
+    return source_ids[key]
+
+
+def render_result(result: SearchResult) -> str:
+    return f"- **Title:** {result.title}\n- **URL:** {result.url}\n- **Summary:** {result.summary}\n"
+
+
+def build_section_input(
+    main_query: str, query: str, results: List[SearchResult], source_ids: Dict[str, int]
+) -> Optional[str]:
+    """Entrée de section_agent, limitée à SECTION_CONTEXT_TOKENS. None si aucun résultat exploitable."""
+    results = pack_results(
+        f"{main_query} {query}", results, render_result, get_section_context_tokens(),
+        model=get_role_model("synthesis_agent"),
+    )
+    if not results:
+        return None
+    parts = [f"Main research question: {main_query}\n\nSub-query covered by this section: {query}\n\nSources:\n"]
+    for result in results:
+        parts.append(f"[Source {assign_source_id(source_ids, result.url)}] {result.title} ({result.url})\n{result.summary}\n")
+    return "\n".join(parts)
+
+
+async def write_section(input_text: str, query: str, reporter: Reporter) -> Optional[str]:
+    """Rédige la section d'une sous-requête. Retourne None en cas d'échec (la section est réessayée à la synthèse)."""
+    try:
+        return await section_agent(input_text)
+    except Exception as e:
+        reporter.warning(f"⚠️ Section failed for '{query}': {e}")
+        return None
+
+
+def new_page_fetcher() -> PageFetcher:
+    return PageFetcher(
+        pool_size=get_fetch_pool_size(),
+        per_host=get_fetch_per_host(),
+        request_timeout=get_fetch_timeout(),
+        deadline=get_fetch_deadline(),
+        max_bytes=get_fetch_max_bytes(),
+    )
+
+
+async def perform_search_node(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    reporter = get_reporter(config)
+    reporter.info("🌐 Starting research on your queries...")
 
     queries = state.get("subqueries", [])
     search_results = state.get("search_results", [])
@@ -133,70 +219,194 @@ async def perform_search_node(state: ResearchState) -> ResearchState:
     processed_queries = state["processed_queries"]
 
     if not queries:
-        st.error("❌ No subqueries found. Cannot continue.")
+        reporter.error("❌ No subqueries found. Cannot continue.")
         raise ValueError("Missing subqueries in state.")
 
-    # Filtrer pour ne traiter que les nouvelles requêtes
-    new_queries = [q for q in queries if q not in processed_queries]
+    # Les doublons sémantiques sont retirés à la production des requêtes (plan_subqueries_node,
+    # followup_node, interface HITL) : ici, seules les requêtes déjà lancées (reprise) sont écartées
+    new_queries = [q for q in dict.fromkeys(queries) if q not in processed_queries]
     
     if not new_queries:
-        st.info("🔄 All queries have already been processed. Moving to next step.")
+        reporter.info("🔄 All queries have already been processed. Moving to next step.")
         # S'il n'y a pas de nouvelles requêtes, on passe à l'étape suivante
         return state
 
-    for query in new_queries:
-        with st.spinner(f"🔎 Searching: {query}"):
-            # Ajouter la requête à la liste des requêtes traitées
-            processed_queries.add(query)
-            
-            results = tavily_search(query)
-            if not results:
-                continue
+    # --- Étape 1 : toutes les recherches Tavily en parallèle ---
+    processed_queries.update(new_queries)
+    with reporter.spinner(f"🔎 Searching {len(new_queries)} queries in parallel..."):
+        results_per_query = await asyncio.gather(*(atavily_search(q, reporter) for q in new_queries))
+
+    # Déduplication par URL canonique : une source déjà résumée (dans ce run ou
+    # plus tôt dans ce lot) est seulement rattachée à la nouvelle requête.
+    known = {canonical_url(r.url): r for r in search_results if r.url}
+    jobs = []  # ordre stable : ordre des requêtes, puis rang Tavily
+    extra_queries = {}  # URL canonique -> autres requêtes du lot ayant trouvé la même source
+    linked = 0
+    for query, results in zip(new_queries, results_per_query):
+        for result in results:
+            key = canonical_url(result.get('url', ''))
+            if key and key in known:
+                if query not in known[key].all_queries():
+                    known[key].queries = known[key].all_queries() + [query]
+                linked += 1
+            elif key and key in extra_queries:
+                if query not in extra_queries[key]:
+                    extra_queries[key].append(query)
+                linked += 1
+            else:
+                jobs.append((query, result))
+                if key:
+                    extra_queries[key] = []
+    if linked:
+        reporter.info(f"🔗 {linked} duplicate sources linked to their queries without re-summarizing.")
+
+    # Mode map-reduce : la section d'une requête est lancée dès que tous ses résultats
+    # (y compris ceux partagés avec une autre requête du lot) sont résumés, en parallèle
+    # des recherches restantes.
+    map_reduce = get_synthesis_mode() == "map_reduce"
+    sections = state.get("sections") or {}
+    source_ids = state.get("source_ids") or {}
+    section_tasks = {}
+    positions = {}
+
+    def start_section(query: str):
+        results = sorted(
+            (r for r in search_results if query in r.all_queries()),
+            key=lambda r: positions.get(id(r), -1),
+        )
+        input_text = build_section_input(state["query"], query, results, source_ids)
+        if input_text:
+            section_tasks[query] = asyncio.create_task(write_section(input_text, query, reporter))
+
+    pending = {query: 0 for query in new_queries}
+    for query, result in jobs:
+        for q in [query] + extra_queries.get(canonical_url(result.get('url', '')), []):
+            pending[q] += 1
+    if map_reduce:
+        for query in new_queries:
+            if not pending[query]:
+                start_section(query)
+
+    async def finish() -> ResearchState:
+        if section_tasks:
+            with reporter.spinner(f"✍️ Finishing {len(section_tasks)} report sections..."):
+                written = await asyncio.gather(*section_tasks.values())
+            for query, section in zip(section_tasks, written):
+                if section:
+                    sections[query] = section
+            state["sections"] = sections
+            state["source_ids"] = source_ids
+        state["search_results"] = search_results
+        state["processed_queries"] = processed_queries
+        return state
 
-            for result in results:
-                input_text = f"Title: {result.get('title', 'No Title')}\nURL: {result.get('url', '')}"
-                agent_result = await search_agent(input_text)
+    if not jobs:
+        return await finish()
+
+    # --- Étape 2 : téléchargement des pages + résumés concurrents ---
+    # Tous les téléchargements démarrent immédiatement (bornés par le pool) ;
+    # seuls les résumés attendent une place du limiteur adaptatif "summarize"
+    # (SEARCH_CONCURRENCY au départ, puis AIMD entre SEARCH_CONCURRENCY_MIN et _MAX).
+    limiter = get_limiter("summarize")
+    timeout = get_summary_timeout()
+
+    summary_cache = get_summary_cache()
+
+    async def run_job(fetcher: PageFetcher, position: int, query: str, result: dict):
+        url = result.get('url', '')
+        page_text = await fetcher.fetch_text(url) if url else None
+        input_text = build_summary_input(result, page_text)
+
+        # Cache adressé par contenu : même URL + même texte = résumé réutilisé sans appel LLM
+        cache_key = summary_key(canonical_url(url), input_text)
+        summary = summary_cache.get(cache_key)
+        if summary is None:
+            summary = await summarize_result(input_text, url, limiter, timeout, reporter)
+            if summary:
+                summary_cache.set(cache_key, summary)
+        return position, query, result, summary
+
+    start = len(search_results)
+    progress = reporter.progress(f"📝 Reading and summarizing {len(jobs)} results...")
+    async with new_page_fetcher() as fetcher:
+        for done, next_job in enumerate(
+            asyncio.as_completed([run_job(fetcher, i, q, r) for i, (q, r) in enumerate(jobs)]), 1
+        ):
+            position, query, result, summary = await next_job
+            progress.update(
+                done / len(jobs),
+                text=f"📝 Summarized {done}/{len(jobs)} results (concurrency {int(limiter.limit)}, queued {limiter.queue_depth})",
+            )
+            job_queries = [query] + extra_queries.get(canonical_url(result.get('url', '')), [])
 
-                search_results.append(SearchResult(
+            if summary is not None:
+                # Ajout au fil de l'eau, un résumé lent ou en échec ne bloque pas les autres
+                search_result = SearchResult(
                     title=result.get('title', 'No Title'),
                     url=result.get('url', ''),
-                    summary=agent_result.strip(),
-                    query=query  # Sauvegarder la requête associée au résultat
-                ))
+                    summary=summary,
+                    query=query,  # Sauvegarder la requête associée au résultat
+                    queries=job_queries
+                )
+                positions[id(search_result)] = position
+                search_results.append(search_result)
 
-    state["search_results"] = search_results
-    state["processed_queries"] = processed_queries
-    return state
+            for q in job_queries:
+                pending[q] -= 1
+                if map_reduce and not pending[q]:
+                    start_section(q)
+    progress.close()
+
+    # Rétablir l'ordre stable (requête puis rang) pour les résultats de cette itération
+    search_results[start:] = sorted(search_results[start:], key=lambda r: positions[id(r)])
 
+    return await finish()
 
 
-async def followup_node(state: ResearchState) -> ResearchState:
+
+async def followup_node(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    reporter = get_reporter(config)
     current_iteration = state["iteration"]
     max_iterations = state.get("max_iterations", 2)
 
-    st.info(f"📊 Iteration: {current_iteration + 1}/{max_iterations}")
+    reporter.info(f"📊 Iteration: {current_iteration + 1}/{max_iterations}")
 
     if current_iteration >= max_iterations - 1:
-        st.info("🔚 Maximum iterations reached. Proceeding to synthesis.")
+        reporter.info("🔚 Maximum iterations reached. Proceeding to synthesis.")
         state["next"] = "synthesis"
         return state
 
-    findings_text = f"Original Query: {state['query']}\n\nCurrent Findings:\n"
-    for i, result in enumerate(state["search_results"], 1):
-        findings_text += f"{i}. Title: {result.title}\n   Summary: {result.summary}\n"
+    # Digest incrémental : seuls les résultats ajoutés depuis la dernière itération sont condensés,
+    # puis les entrées les plus pertinentes sont retenues dans le budget FOLLOWUP_CONTEXT_TOKENS
+    # Tokens comptés avec l'encodage du modèle routé de followup_agent (MODEL_TIER_FOLLOWUP_AGENT)
+    model = get_role_model("followup_agent")
+    digest = state.get("findings_digest") or []
+    entry_tokens = get_digest_entry_tokens()
+    for result in state["search_results"][len(digest):]:
+        digest.append(digest_entry(result, entry_tokens, model) if is_informative(result) else "")
+    state["findings_digest"] = digest
+
+    entries = pack(state["query"], [e for e in digest if e], lambda e: e, get_followup_context_tokens(), model)
+    processed_queries = state.get("processed_queries", set())
+    findings_text = "\n".join([
+        f"Original Query: {state['query']}\n",
+        "Queries already searched:",
+        *(f"- {q}" for q in sorted(processed_queries)),
+        f"\nCurrent Findings ({len(entries)} most relevant of {len(state['search_results'])}):",
+        *entries,
+    ])
 
     result = await follow_up_decision_agent(findings_text)
 
-    processed_queries = state.get("processed_queries", set())
-    unprocessed_queries = [q for q in result.queries if q not in processed_queries]
+    unprocessed_queries = await drop_duplicate_queries(result.queries, processed_queries, reporter)
 
     if result.should_follow_up and unprocessed_queries:
-        st.info(f"🔎 Follow-up Decision: Continue\n\nReason: {result.reasoning}")
+        reporter.info(f"🔎 Follow-up Decision: Continue\n\nReason: {result.reasoning}")
         state["subqueries"] = unprocessed_queries
         state["iteration"] += 1
         state["next"] = "perform_search"
     else:
-        st.info(f"🛑 Follow-up Decision: Stop OR no new queries\n\nReason: {result.reasoning}")
+        reporter.info(f"🛑 Follow-up Decision: Stop OR no new queries\n\nReason: {result.reasoning}")
         state["iteration"] += 1
         state["next"] = "synthesis"
 
@@ -205,46 +415,122 @@ async def followup_node(state: ResearchState) -> ResearchState:
 
 
 
-async def synthesis_node(state: ResearchState) -> ResearchState:
-    with st.spinner("📝 Synthesizing final report..."):
+async def map_reduce_synthesis(state: ResearchState, reporter: Reporter) -> str:
+    """
+    Assemble le rapport à partir des sections déjà rédigées pendant perform_search :
+    seules les sections manquantes sont écrites ici, puis le début (titre à méthodologie)
+    et la fin (discussion à conclusion) sont générés en parallèle à partir des sections.
+    """
+    search_results = state["search_results"]
+    sections = dict(state.get("sections") or {})
+    source_ids = state.get("source_ids") or {}
+
+    # Ordre stable des sous-requêtes : celui des résultats (requête puis rang)
+    queries = list(dict.fromkeys(q for r in search_results for q in r.all_queries()))
+    missing = [q for q in queries if q not in sections]
+    inputs = {
+        q: build_section_input(state["query"], q, [r for r in search_results if q in r.all_queries()], source_ids)
+        for q in missing
+    }
+    inputs = {q: text for q, text in inputs.items() if text}
+    if inputs:
+        written = await asyncio.gather(*(write_section(text, q, reporter) for q, text in inputs.items()))
+        sections.update({q: s for q, s in zip(inputs, written) if s})
+
+    # Numérotation finale des sources = ordre des résultats
+    mapping = {assign_source_id(source_ids, r.url): i for i, r in enumerate(search_results, 1)}
+    body = [
+        number_section(relabel_sources(sections[q], mapping), number, q)
+        for number, q in enumerate((q for q in queries if q in sections), 3)
+    ]
+    next_number = 3 + len(body)
+    body_text = "\n\n".join(body)
+
+    context = f"Main research question: {state['query']}\n\nSub-queries used for research:\n"
+    context += "".join(f"{i}. {q}\n" for i, q in enumerate(queries, 1))
+    context += (
+        f"\nIterations completed: {state['iteration'] + 1}\n"
+        f"Sources consulted: {len(search_results)}\n\n"
+        f"Body sections:\n\n{body_text}\n"
+    )
+
+    # Le début du rapport est streamé ; la fin est générée en même temps
+    stream = reporter.report_stream()
+    front, back = await asyncio.gather(
+        framing_agent(context, "front", on_token=stream.write, on_reset=stream.reset),
+        framing_agent(context + f"\nFirst heading number N = {next_number}\n", "back"),
+    )
+
+    references = f"## {next_number + 4}. References\n\n" + "\n".join(
+        f"- [Source {i}] {r.title}. {r.url}" for i, r in enumerate(search_results, 1)
+    )
+    rest = "\n\n".join([body_text, back, references])
+    stream.write("\n\n" + rest)
+    stream.close()
+
+    # Table des matières déterministe, insérée sous le titre
+    title, _, front_rest = front.partition("\n")
+    if not title.startswith("# "):
+        title, front_rest = f"# {state['query']}", front
+    report = "\n\n".join([front_rest.strip(), rest])
+    return f"{title}\n\n{table_of_contents(report)}\n\n{report}"
+
+
+async def synthesis_node(state: ResearchState, config: RunnableConfig) -> ResearchState:
+    reporter = get_reporter(config)
+    if get_synthesis_mode() == "map_reduce":
+        with reporter.spinner("📝 Assembling final report from sections..."):
+            state["final_report"] = await map_reduce_synthesis(state, reporter)
+        return state
+
+    with reporter.spinner("📝 Synthesizing final report..."):
         # Créer une liste complète de toutes les requêtes utilisées
         all_queries = list(state.get("processed_queries", set()))
         
+        # Résultats retenus dans le budget SYNTHESIS_CONTEXT_TOKENS : les plus pertinents pour la
+        # question, sans les résumés quasi vides. Une source dédupliquée est comptée autant de
+        # fois qu'elle apparaît (une fois sous chacune de ses requêtes).
+        kept = pack_results(
+            state["query"], state["search_results"],
+            lambda r: render_result(r) * max(1, len(r.all_queries())),
+            get_synthesis_context_tokens(),
+            model=get_role_model("synthesis_agent"),
+        )
+
         # Organiser les résultats par requête
         query_results = {}
-        for result in state["search_results"]:
-            query = getattr(result, "query", None)
-            if query:
+        for result in kept:
+            for query in result.all_queries():
                 if query not in query_results:
                     query_results[query] = []
                 query_results[query].append(result)
-        
+
         # Préparer le texte d'entrée pour l'agent de synthèse avec une structure basée sur les requêtes
-        text = f"# Research Report\n\n**Original Query:** {state['query']}\n\n"
-        
+        parts = [f"# Research Report\n\n**Original Query:** {state['query']}\n"]
+
         # Ajouter la liste des sous-requêtes utilisées pour la recherche
-        text += "## Sub-queries Used for Research:\n"
-        for i, query in enumerate(all_queries, 1):
-            text += f"{i}. {query}\n"
-        
-        text += "\n## Research Parameters:\n"
-        text += f"- **Iterations completed:** {state['iteration'] + 1}\n"
-        text += f"- **Maximum iterations set:** {state.get('max_iterations', 'Not specified')}\n\n"
-        
+        parts.append("## Sub-queries Used for Research:")
+        parts.extend(f"{i}. {query}" for i, query in enumerate(all_queries, 1))
+
+        parts.append("\n## Research Parameters:")
+        parts.append(f"- **Iterations completed:** {state['iteration'] + 1}")
+        parts.append(f"- **Maximum iterations set:** {state.get('max_iterations', 'Not specified')}\n")
+
         # Organiser les résultats par requête
-        text += "## Search Findings By Query:\n\n"
+        parts.append("## Search Findings By Query:\n")
         for query in all_queries:
-            text += f"### Query: {query}\n\n"
+            parts.append(f"### Query: {query}\n")
             if query in query_results:
                 for i, result in enumerate(query_results[query], 1):
-                    text += f"#### Result {i}\n"
-                    text += f"- **Title:** {result.title}\n"
-                    text += f"- **URL:** {result.url}\n"
-                    text += f"- **Summary:** {result.summary}\n\n"
+                    parts.append(f"#### Result {i}\n{render_result(result)}")
             else:
-                text += "No specific results for this query.\n\n"
+                parts.append("No specific results for this query.\n")
+        text = "\n".join(parts)
 
-        result = await synthesis_agent(input_text=text)
+        # Le rapport s'affiche au fil de la génération (Streamlit) au lieu d'attendre la fin
+        stream = reporter.report_stream()
+        result = await synthesis_agent(input_text=text, on_token=stream.write, on_reset=stream.reset)
+        stream.close()
         state["final_report"] = result
 
     return state
@@ -257,10 +543,11 @@ def route_followup(state):
 # --- Graph Construction ---
 graph = StateGraph(ResearchState)
 
-graph.add_node("generate_subqueries", generate_subqueries_node)
-graph.add_node("perform_search", perform_search_node)
-graph.add_node("followup", followup_node)
-graph.add_node("synthesis", synthesis_node)
+# Chaque nœud produit un span "node.<nom>" dans la trace du run (utils.tracing)
+graph.add_node("generate_subqueries", traced_node("generate_subqueries")(plan_subqueries_node))
+graph.add_node("perform_search", traced_node("perform_search")(perform_search_node))
+graph.add_node("followup", traced_node("followup")(followup_node))
+graph.add_node("synthesis", traced_node("synthesis")(synthesis_node))
 
 graph.set_entry_point("generate_subqueries")
 graph.add_edge("generate_subqueries", "perform_search")
@@ -275,53 +562,11 @@ graph.add_edge("synthesis", END)
 app = graph.compile()
 
 # Ce fichier peut maintenant être invoqué avec :
-# result = await app.invoke({
+# result = await app.ainvoke({
 #     "query": "your main research question",
 #     "search_results": [],
 #     "iteration": 0,
 #     "max_iterations": 2,  # Nombre d'itérations maximum
 #     "processed_queries": set(),  # Initialiser l'ensemble des requêtes traitées
 # })
-
-
-import asyncio
-
-def run_deepresearch(query: str) -> str:
-    """
-    Fonction de point d’entrée pour lancer le pipeline DeepResearch.
-    Appelée depuis main_streamlit.py.
-    """
-
-    try:
-        state = {
-            "query": query,
-            "search_results": [],
-            "iteration": 0,
-            "max_iterations": 2,
-            "processed_queries": set(),
-        }
-
-        # Lancer l’application LangGraph de façon synchrone
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        result = loop.run_until_complete(app.invoke(state))
-        loop.close()
-
-        final_report = result.get("final_report", "Aucun rapport généré.")
-        return final_report
-
-    except Exception as e:
-        return f"❌ Erreur dans DeepResearch : {e}"
-
-
-
-import asyncio
-from DeepResearch_HITL.main import main as deep_main  # <- importe ta logique async
-
-
-def deepresearch_ui():
-    """Fonction appelée depuis l'app principale pour afficher l'interface DeepResearch."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(deep_main())
-    loop.close()
\ No newline at end of file
+# ou, plus simplement, via DeepResearch_HITL.engine.run_research(query).
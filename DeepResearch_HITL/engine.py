@@ -0,0 +1,190 @@
+"""
+engine.py
+
+API async de DeepResearch, indépendante de Streamlit, au-dessus du graphe du coordinator.
+L'affichage (Reporter), les callbacks LangChain et la validation humaine des
+sous-requêtes sont injectés en paramètres.
+
+    run = await run_research("Impact of microplastics on marine life", max_iterations=2)
+    print(run.final_report)
+
+Avec un run_id, l'état est enregistré après chaque nœud (checkpoint SQLite) et un
+run interrompu reprend au dernier nœud terminé lorsqu'il est relancé avec le même id.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from DeepResearch_HITL.coordinator import app, graph, ResearchState
+from DeepResearch_HITL.model import SearchResult
+from DeepResearch_HITL.research_agents.query_agent import QueryResponse
+from DeepResearch_HITL.utils.adaptive_limiter import limiter_stats
+from DeepResearch_HITL.utils.config import get_checkpoint_path
+from DeepResearch_HITL.utils.reporter import Reporter
+from DeepResearch_HITL.utils.token_tracker import TokenCostTracker
+from utils.tracing import trace, tracing_handler
+
+# Hook de validation humaine : reçoit la question et la proposition de query_agent,
+# retourne la liste de sous-requêtes à lancer.
+ValidateSubqueries = Callable[[str, QueryResponse], Awaitable[List[str]]]
+
+
+@dataclass
+class ResearchRun:
+    query: str
+    final_report: str
+    subqueries: List[str] = field(default_factory=list)
+    processed_queries: List[str] = field(default_factory=list)
+    search_results: List[SearchResult] = field(default_factory=list)
+    iterations: int = 0
+    elapsed: float = 0.0
+    tokens: int = 0
+    cost: float = 0.0
+    cache_hits: int = 0
+    roles: List[dict] = field(default_factory=list)  # coût et latence par rôle d'agent
+    concurrency: List[dict] = field(default_factory=list)  # limites adaptatives en fin de run
+    trace_id: Optional[str] = None
+
+    def stats(self) -> dict:
+        return {
+            "query": self.query,
+            "iterations": self.iterations,
+            "queries": len(self.processed_queries),
+            "sources": len(self.search_results),
+            "elapsed_s": round(self.elapsed, 2),
+            "tokens": self.tokens,
+            "cost_usd": self.cost,
+            "llm_cache_hits": self.cache_hits,
+            "roles": self.roles,
+            "concurrency": self.concurrency,
+            "trace_id": self.trace_id,
+        }
+
+
+def initial_state(query: str, max_iterations: int = 2, subqueries: Optional[List[str]] = None) -> ResearchState:
+    return {
+        "query": query,
+        "subqueries": subqueries,
+        "thoughts": None,
+        "search_results": [],
+        "iteration": 0,
+        "final_report": None,
+        "max_iterations": max_iterations,
+        "processed_queries": set(),
+        "next": None,
+        "sections": {},
+        "source_ids": {},
+        "findings_digest": [],
+    }
+
+
+# --- Checkpoints ---
+def new_run_id() -> str:
+    return uuid.uuid4().hex
+
+
+def run_config(run_id: str, **configurable) -> dict:
+    return {"configurable": {"thread_id": run_id, **configurable}}
+
+
+@asynccontextmanager
+async def checkpointed_app():
+    """Graphe compilé avec un checkpointer SQLite (le state est persisté après chaque nœud)."""
+    path = get_checkpoint_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        yield graph.compile(checkpointer=saver)
+
+
+async def invoke_resumable(graph_app, state: Optional[ResearchState], config: dict) -> dict:
+    """
+    Lance le run du thread config["configurable"]["thread_id"], ou le reprend :
+    - run interrompu : reprise au nœud suivant le dernier checkpoint (state ignoré)
+    - run terminé : retourne directement son state final
+    """
+    snapshot = await graph_app.aget_state(config)
+    if snapshot.next:
+        return await graph_app.ainvoke(None, config=config)
+    if snapshot.values:
+        return snapshot.values
+    return await graph_app.ainvoke(state, config=config)
+
+
+async def get_run_snapshot(run_id: str):
+    """Dernier checkpoint d'un run (snapshot.values vide si le run est inconnu)."""
+    async with checkpointed_app() as graph_app:
+        return await graph_app.aget_state(run_config(run_id))
+
+
+async def run_research(
+    query: str,
+    max_iterations: int = 2,
+    subqueries: Optional[List[str]] = None,
+    validate_subqueries: Optional[ValidateSubqueries] = None,
+    reporter: Optional[Reporter] = None,
+    callbacks: Optional[list] = None,
+    tracker: Optional[TokenCostTracker] = None,
+    run_id: Optional[str] = None,
+) -> ResearchRun:
+    """
+    Lance une recherche complète et retourne le rapport avec ses statistiques.
+
+    - subqueries : sous-requêtes déjà validées (sinon générées par query_agent)
+    - validate_subqueries : hook async appelé sur la proposition de query_agent
+    - reporter : retour d'avancement (par défaut : logging)
+    - callbacks : callbacks LangChain supplémentaires
+    - tracker : TokenCostTracker à utiliser (un nouveau par défaut, un par run)
+    - run_id : active les checkpoints ; relancer avec le même id reprend le run
+    """
+    tracker = tracker or TokenCostTracker()
+    config = {
+        "callbacks": [tracker, tracing_handler, *(callbacks or [])],
+        "configurable": {
+            "reporter": reporter or Reporter(),
+            "validate_subqueries": validate_subqueries,
+        },
+    }
+
+    start = time.perf_counter()
+    state = initial_state(query, max_iterations, subqueries)
+    with trace("deepresearch.run", query=query[:200], run_id=run_id) as run_trace:
+        if run_id:
+            config["configurable"]["thread_id"] = run_id
+            async with checkpointed_app() as graph_app:
+                result = await invoke_resumable(graph_app, state, config)
+        else:
+            result = await app.ainvoke(state, config=config)
+    elapsed = time.perf_counter() - start
+
+    tokens, cost = tracker.get_report()
+    return ResearchRun(
+        query=query,
+        final_report=result.get("final_report") or "",
+        subqueries=list(result.get("subqueries") or []),
+        processed_queries=sorted(result.get("processed_queries") or set()),
+        search_results=list(result.get("search_results") or []),
+        iterations=result.get("iteration", 0) + 1,
+        elapsed=elapsed,
+        tokens=tokens,
+        cost=cost,
+        cache_hits=tracker.cache_hits,
+        roles=tracker.get_role_report(),
+        concurrency=limiter_stats(),
+        trace_id=run_trace.trace_id if run_trace else None,
+    )
+
+
+def run_deepresearch(query: str, max_iterations: int = 2) -> str:
+    """Point d'entrée synchrone : retourne uniquement le rapport final."""
+    try:
+        run = asyncio.run(run_research(query, max_iterations=max_iterations))
+        return run.final_report or "Aucun rapport généré."
+    except Exception as e:
+        return f"❌ Erreur dans DeepResearch : {e}"
@@ -2,8 +2,15 @@ import streamlit as st
 from datetime import datetime
 import asyncio
 
-from DeepResearch_HITL.coordinator import app, generate_subqueries_node
+from DeepResearch_HITL.coordinator import ResearchState, drop_duplicate_queries
+from DeepResearch_HITL.engine import checkpointed_app, invoke_resumable, get_run_snapshot, new_run_id, run_config
+from DeepResearch_HITL.research_agents.query_agent import query_agent, QueryResponse
+from DeepResearch_HITL.utils.adaptive_limiter import limiter_stats
+from DeepResearch_HITL.utils.reporter import StreamlitReporter
 from DeepResearch_HITL.utils.token_tracker import TokenCostTracker
+from utils.search_cache import get_search_cache
+from utils.tracing import trace, tracing_handler
+from utils.trace_view import render_waterfall
 
 
 # ─────────────────────────────────────────────
@@ -41,6 +48,82 @@ def init_deepresearch_session():
         st.session_state.start_time = datetime.now()
 
 
+# ─────────────────────────────────────────────
+# HUMAN-IN-THE-LOOP : VALIDATION DES SOUS-REQUÊTES
+# ─────────────────────────────────────────────
+async def generate_subqueries_node(state: ResearchState) -> ResearchState:
+    query = state["query"]
+
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
+
+    # --- Étape 1 : génération si subqueries n'existent pas en session ---
+    if st.session_state.subqueries is None:
+        with st.spinner("🔎 Generating sub-queries..."):
+            result: QueryResponse = await query_agent(query, callbacks=[st.session_state.tracker])
+
+        # Quasi-doublons retirés avant validation : perform_search_node lance les requêtes validées telles quelles
+        st.session_state.subqueries = await drop_duplicate_queries(result.queries, set(), StreamlitReporter())
+        st.session_state.thoughts = result.thoughts
+        st.session_state.awaiting_feedback = True
+        
+        # Ne pas retourner state immédiatement, continuer pour afficher le formulaire
+
+    # --- Étape 2 : interface de feedback utilisateur ---
+    if st.session_state.awaiting_feedback:
+        form_key = f"subquery_form_{st.session_state.session_id}"
+        with st.form(key=form_key, clear_on_submit=True):
+            st.subheader("✏️ Validate or Edit Sub-Queries")
+            st.markdown(f"**🧠 AI Thoughts:** {st.session_state.thoughts}")
+
+            # Affichage de la profondeur de recherche configurée
+            st.info(f"🔍 Research depth: {state.get('max_iterations', 2)} iterations")
+
+            edited_queries = []
+            for i, query in enumerate(st.session_state.subqueries):
+                edited_query = st.text_input(
+                    f"Sub-Query {i + 1}",
+                    value=query,
+                    key=f"edit_query_{i}_{st.session_state.session_id}"
+                )
+                edited_queries.append(edited_query)
+
+            feedback = st.text_area(
+                "💬 Feedback for improvement (leave blank if satisfied):",
+                key=f"feedback_area_{st.session_state.session_id}"
+            )
+
+            submitted = st.form_submit_button("✅ Validate Queries")
+
+            if submitted:
+                if feedback.strip() == "":
+                    st.session_state.awaiting_feedback = False
+                    st.session_state.validated_queries = edited_queries
+                    st.session_state.step = "continue_graph"  # Signal pour continuer le flux
+                    st.rerun()
+                else:
+                    revised_input = f"Original query: {query}\nUser feedback: {feedback}"
+                    with st.spinner("🔄 Regenerating queries based on feedback..."):
+                        result = await query_agent(revised_input, callbacks=[st.session_state.tracker])
+                    st.session_state.subqueries = await drop_duplicate_queries(result.queries, set(), StreamlitReporter())
+                    st.session_state.thoughts = result.thoughts
+                    st.rerun()
+
+        # Arrêter l'exécution pour permettre l'interaction avec le formulaire
+        st.stop()
+
+    # --- Étape 3 : feedback validé, mise à jour du state et signal de reprise ---
+    # Ce code ne sera exécuté que lorsque awaiting_feedback est False
+    state["subqueries"] = st.session_state.validated_queries
+    state["thoughts"] = st.session_state.thoughts
+    
+    # Initialiser processed_queries s'il n'existe pas encore
+    if "processed_queries" not in state or state["processed_queries"] is None:
+        state["processed_queries"] = set()
+        
+    return state
+
+
 # ─────────────────────────────────────────────
 # MAIN INTERFACE
 # ─────────────────────────────────────────────
@@ -49,6 +132,22 @@ async def main():
 
     st.markdown(f"⏱️ **Temps écoulé :** `{round((datetime.now() - st.session_state.start_time).total_seconds(), 2)}s`")
 
+    # --- REPRISE D'UN RUN (URL ?run=<id>) ---
+    # Le state du graphe est checkpointé après chaque nœud : une page rouverte reprend
+    # le run interrompu au dernier nœud terminé, ou affiche son rapport s'il est fini.
+    if st.session_state.step == "input_query" and "run" in st.query_params and "resume_checked" not in st.session_state:
+        st.session_state.resume_checked = True
+        snapshot = await get_run_snapshot(st.query_params["run"])
+        if snapshot.values:
+            st.session_state.query = snapshot.values.get("query", "")
+            st.session_state.max_iterations = snapshot.values.get("max_iterations", 2)
+            if snapshot.next:
+                st.info(f"♻️ Resuming interrupted research: {st.session_state.query}")
+                st.session_state.step = "continue_graph"
+            else:
+                st.session_state.result = snapshot.values
+                st.session_state.step = "display_result"
+
     # --- ÉTAPE 1 : INPUT DE LA QUESTION ---
     if st.session_state.step == "input_query":
         query = st.text_area("📥 Enter your main research question:", height=150)
@@ -94,18 +193,29 @@ async def main():
     # --- ÉTAPE 4 : CONTINUER LE GRAPHE APRÈS VALIDATION ---
     elif st.session_state.step == "continue_graph":
         with st.spinner("🚀 Launching research on validated queries..."):
+            # L'id du run est gardé dans l'URL pour pouvoir reprendre après un rerun ou un crash
+            if "run" not in st.query_params:
+                st.query_params["run"] = new_run_id()
+
             initial_state = {
                 "query": st.session_state.query,
-                "subqueries": st.session_state.validated_queries,
-                "thoughts": st.session_state.thoughts,
+                "subqueries": st.session_state.get("validated_queries"),
+                "thoughts": st.session_state.get("thoughts"),
                 "search_results": [],
                 "iteration": 0,
                 "final_report": None,
                 "max_iterations": st.session_state.max_iterations,
                 "processed_queries": set()
             }
+            config = run_config(st.query_params["run"], reporter=StreamlitReporter())
+            config["callbacks"] = [st.session_state.tracker, tracing_handler]
+
             start_step = datetime.now()
-            result = await app.ainvoke(initial_state, config={"callbacks": [st.session_state.tracker]})
+            # Trace du run : nœuds, appels LLM (tokens, TTFT), Tavily, pages, caches
+            with trace("deepresearch.run", query=st.session_state.query[:200], run_id=st.query_params["run"]) as run_trace:
+                async with checkpointed_app() as graph_app:
+                    result = await invoke_resumable(graph_app, initial_state, config)
+            st.session_state.research_trace = run_trace
             st.session_state.result = result
             st.session_state.timings["run_graph"] = (datetime.now() - start_step).total_seconds()
             st.session_state.step = "display_result"
@@ -129,6 +239,23 @@ async def main():
         tokens, cost = st.session_state.tracker.get_report()
         st.sidebar.info(f"💰 Tokens used: {tokens}")
         st.sidebar.info(f"💵 Estimated cost: ${cost}")
+        st.sidebar.info(f"♻️ LLM responses from cache: {st.session_state.tracker.cache_hits}")
+        role_report = st.session_state.tracker.get_role_report()
+        if role_report:
+            with st.sidebar.expander("🧭 Cost and latency per agent"):
+                st.dataframe(role_report, hide_index=True)
+
+        # Statistiques du cache Tavily
+        cache_stats = get_search_cache().stats()
+        st.sidebar.info(f"🗄️ Search cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+
+        # Concurrence adaptative (AIMD) des recherches et des résumés
+        for limiter in limiter_stats():
+            st.sidebar.info(
+                f"🚦 {limiter['stage'].capitalize()} concurrency: limit {limiter['limit']}, "
+                f"queue depth {limiter['queue_depth']} (peak {limiter['max_queue_depth']}), "
+                f"{limiter['overloads']} throttled/timed out"
+            )
 
         # ⏱️ Temps d'exécution global
         total_duration = (datetime.now() - st.session_state.start_time).total_seconds()
@@ -139,6 +266,10 @@ async def main():
             for step_name, duration in st.session_state.timings.items():
                 st.markdown(f"**{step_name}**: {round(duration, 2)} seconds")
 
+        # 🧭 Waterfall du run (nœuds, LLM, recherches, caches)
+        if st.session_state.get("research_trace"):
+            render_waterfall(st.session_state.research_trace)
+
         # Téléchargement du rapport
         filename = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
         st.download_button("📥 Download report", final_report, file_name=filename, mime="text/markdown")
@@ -146,6 +277,16 @@ async def main():
         if st.button("🔁 Start Over"):
             tracker = st.session_state.tracker
             st.session_state.clear()
+            st.query_params.clear()
+            st.session_state.resume_checked = True
             st.session_state.tracker = tracker
             tracker.reset()
             st.rerun()
+
+
+def deepresearch_ui():
+    """Fonction appelée depuis l'app principale pour afficher l'interface DeepResearch."""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(main())
+    loop.close()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 
 
 class SearchResult(BaseModel):
@@ -7,6 +7,11 @@ class SearchResult(BaseModel):
     url: str
     summary: str
     query: Optional[str] = None
+    # Toutes les requêtes ayant retourné cette source (la première est `query`)
+    queries: List[str] = []
+
+    def all_queries(self) -> List[str]:
+        return self.queries or ([self.query] if self.query else [])
 
     def to_dict(self):
         return {
@@ -1,12 +1,11 @@
-from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 import json
 import re
-import streamlit as st
 
 from utils.config import load_env, get_openai_key, get_tavily_key
+from utils.model_routing import get_chat_model
 
 load_env()
 
@@ -48,17 +47,18 @@ FOLLOW_UP_DECISION_PROMPT = (
 )
 
 # --- Initialisation LLM ---
-llm = ChatOpenAI(model="gpt-4o", temperature=0.3, openai_api_key=get_openai_key())
+# Modèle choisi par rôle (MODEL_TIER_FOLLOWUP_AGENT, niveau rapide par défaut)
+llm = get_chat_model("followup_agent", temperature=0.3, openai_api_key=get_openai_key())
 
 # --- Fonction agent ---
-async def follow_up_decision_agent(input_text: str) -> FollowUpDecisionResponse:
+async def follow_up_decision_agent(input_text: str, callbacks: Optional[list] = None) -> FollowUpDecisionResponse:
     try:
         messages = [
             SystemMessage(content=FOLLOW_UP_DECISION_PROMPT),
             HumanMessage(content=input_text)
         ]
         #response = await llm.ainvoke(messages)
-        response = await llm.ainvoke(messages, config={"callbacks": [st.session_state.tracker]})
+        response = await llm.ainvoke(messages, config={"callbacks": callbacks} if callbacks else None)
 
         content = response.content.strip()
 
@@ -1,10 +1,10 @@
-from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
+from typing import Optional
 from pydantic import BaseModel
 import json
-import streamlit as st
 
 from utils.config import load_env, get_openai_key, get_tavily_key
+from utils.model_routing import get_chat_model
 
 load_env()
 
@@ -50,20 +50,20 @@ Important:
 - DO NOT invent information or go beyond the research scope.
 """
 
-llm = ChatOpenAI(
-    model="gpt-4o",  # ou "gpt-3.5-turbo"
+llm = get_chat_model(
+    "query_agent",  # MODEL_TIER_QUERY_AGENT, LLM_CACHE_TTL_QUERY_AGENT
     temperature=0.3,
     openai_api_key=get_openai_key(),
 )
 
-async def query_agent(input_text: str) -> QueryResponse:
+async def query_agent(input_text: str, callbacks: Optional[list] = None) -> QueryResponse:
     messages = [
         SystemMessage(content=QUERY_AGENT_PROMPT),
         HumanMessage(content=input_text)
     ]
 
     #response = await llm.ainvoke(messages)
-    response = await llm.ainvoke(messages, config={"callbacks": [st.session_state.tracker]})
+    response = await llm.ainvoke(messages, config={"callbacks": callbacks} if callbacks else None)
 
     
     content = response.content.strip()
@@ -1,10 +1,10 @@
-from bs4 import BeautifulSoup
 import requests
-from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
-import streamlit as st
+from typing import Optional
 
+from DeepResearch_HITL.utils.page_fetcher import html_to_text, USER_AGENT
 from utils.config import load_env, get_openai_key, get_tavily_key
+from utils.model_routing import get_chat_model
 
 load_env()
 
@@ -37,40 +37,29 @@ SEARCH_AGENT_PROMPT = (
 )
 
 # --- LangChain LLM ---
-llm = ChatOpenAI(model="gpt-4o", temperature=0.3, openai_api_key=get_openai_key())
+# Résumés de pages : niveau rapide par défaut (MODEL_TIER_SEARCH_AGENT)
+llm = get_chat_model("search_agent", temperature=0.3, openai_api_key=get_openai_key())
 
 # --- Scraping function ---
+# Version synchrone conservée pour un usage ponctuel ; le pipeline utilise PageFetcher (async, pool partagé)
 def scrape_url(url: str) -> str:
     try:
-        headers = {
-            'User-Agent': (
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
-                'AppleWebKit/537.36 (KHTML, like Gecko) '
-                'Chrome/91.0.4472.124 Safari/537.36'
-            )
-        }
+        headers = {'User-Agent': USER_AGENT}
         response = requests.get(url, headers=headers, timeout=10)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        for tag in soup(["script", "style"]):
-            tag.decompose()
-        text = soup.get_text(separator=' ', strip=True)
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        clean_text = ' '.join(chunk for chunk in chunks if chunk)
-        return clean_text[:5000] if len(clean_text) > 5000 else clean_text
+        return html_to_text(response.text)
     except Exception as e:
         return f"Failed to scrape content from {url}: {str(e)}"
 
 # --- Agent runner function ---
-async def search_agent(input_text: str) -> str:
+async def search_agent(input_text: str, callbacks: Optional[list] = None) -> str:
     try:
         messages = [
             SystemMessage(content=SEARCH_AGENT_PROMPT),
             HumanMessage(content=input_text)
         ]
         #response = await llm.ainvoke(messages)
-        response = await llm.ainvoke(messages, config={"callbacks": [st.session_state.tracker]})
+        response = await llm.ainvoke(messages, config={"callbacks": callbacks} if callbacks else None)
 
         return response.content.strip()
     except Exception as e:
@@ -1,8 +1,9 @@
-from langchain_openai import ChatOpenAI
 from langchain.schema import SystemMessage, HumanMessage
-import streamlit as st
+from langchain_core.callbacks import BaseCallbackHandler
+from typing import Callable, Optional
 
 from utils.config import load_env, get_openai_key, get_tavily_key
+from utils.model_routing import get_chat_model
 
 load_env()
 
@@ -150,18 +151,169 @@ IMPORTANT INSTRUCTIONS:
 5. Aim for at least 12-15 pages of content
 """
 
+# --- Prompts du mode map-reduce (SYNTHESIS_MODE=map_reduce) ---
+# Chaque sous-requête produit sa propre section dès que ses résultats sont prêts ;
+# une passe finale courte écrit ensuite le début et la fin du rapport à partir des sections.
+SECTION_AGENT_PROMPT = """
+You are an expert scientific research analyst writing ONE section of a larger academic report.
+
+You will be provided with:
+- The main research question
+- The sub-query covered by this section
+- Numbered summaries of the sources found for this sub-query
+
+Write the section in **markdown format**:
+- Start with exactly one level-2 heading `## <concise section title>` (no number), derived from the sub-query
+- Write at least 3-4 substantial, dense paragraphs; use `###` subsections if the sub-query covers several topics
+- Begin with why this aspect matters to the main research question
+- Present the findings, analyze patterns and contradictions, and discuss the strength and limitations of the evidence
+- Support every claim with in-text citations using exactly the labels provided: [Source 1], [Source 2], etc.
+- Never invent sources or citation numbers
+
+Do NOT write a title, abstract, introduction, conclusion, table of contents or reference list: only this section.
+"""
+
+FRONT_MATTER_PROMPT = """
+You are an expert scientific research analyst and academic report writer. The body sections of a research report are already written; you write its opening.
+
+You will be provided with the main research question, the sub-queries used, the research parameters and the body sections.
+
+Write in **markdown format**, in this order and with these exact headings:
+
+# [Research Title]
+
+## Abstract
+A comprehensive summary (300-500 words) covering the research question, methodology, key findings of each section and overall conclusions.
+
+## Keywords
+5-8 discipline-specific keywords.
+
+## 1. Introduction
+At least 3-4 paragraphs: context of the main research question, significance, scope, objectives, and a preview of the structure (one section per sub-query).
+
+## 2. Methodology
+2-3 paragraphs: the iterative query-based research method, the types of sources consulted (without specifics), how information was synthesized, methodological limitations.
+
+Do NOT write a table of contents, the body sections, a discussion, a conclusion or references.
+Only cite sources with labels that already appear in the body sections ([Source N]).
+"""
+
+BACK_MATTER_PROMPT = """
+You are an expert scientific research analyst and academic report writer. The body sections of a research report are already written; you write its closing.
+
+You will be provided with the main research question, the sub-queries used, the body sections and the number N of the first heading you must write.
+
+Write in **markdown format**, in this order, numbering the headings from N:
+
+## N. Integrated Discussion
+4-5 paragraphs synthesizing findings across all sections, identifying overarching patterns and giving a cohesive answer to the main research question.
+
+## N+1. Limitations
+2-3 paragraphs on constraints of the research process, information gaps and potential biases.
+
+## N+2. Future Research Directions
+3-4 paragraphs on open questions, methodological recommendations and promising areas.
+
+## N+3. Conclusion
+3-4 paragraphs directly answering the main research question and ending with its broader implications.
+
+Replace N by the actual numbers. Do NOT write a title, abstract, introduction, body sections or references.
+Only cite sources with labels that already appear in the body sections ([Source N]).
+"""
+
 # --- LLM instanciation ---
-llm = ChatOpenAI(model="gpt-4o", temperature=0.3, openai_api_key=get_openai_key())
+# stream_usage : le dernier chunk du flux porte l'usage en tokens (pour TokenCostTracker)
+llm = get_chat_model("synthesis_agent", temperature=0.3, openai_api_key=get_openai_key(), stream_usage=True)
+
+
+class _TokenForwarder(BaseCallbackHandler):
+    """
+    Transmet les tokens du flux à on_token, dans l'ordre. Avec LATENCY_BUDGET_SYNTHESIS_AGENT,
+    le modèle de repli (with_fallbacks) reprend la génération depuis le début si le modèle
+    principal échoue en cours de flux : on_reset efface alors le texte déjà transmis.
+    """
+
+    run_inline = True
+
+    def __init__(self, on_token: Callable[[str], None], on_reset: Optional[Callable[[], None]] = None):
+        self.on_token = on_token
+        self.on_reset = on_reset
+        self._streamed = False
+
+    def on_chat_model_start(self, serialized, messages, **kwargs) -> None:
+        if self._streamed:
+            self._streamed = False
+            if self.on_reset is not None:
+                self.on_reset()
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        if token:
+            self._streamed = True
+            self.on_token(token)
+
+
+async def _generate(
+    system_prompt: str,
+    input_text: str,
+    callbacks: Optional[list] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    on_reset: Optional[Callable[[], None]] = None,
+) -> str:
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=input_text)
+    ]
+    config = {"callbacks": callbacks} if callbacks else None
+
+    if on_token is None:
+        response = await llm.ainvoke(messages, config=config)
+        return response.content.strip()
+
+    # ainvoke en mode flux plutôt que astream : l'appel passe par le cache de réponses.
+    # En flux, le budget de latence (timeout httpx par lecture) borne le délai avant le premier
+    # token et chaque pause du flux, pas la durée totale de la génération.
+    callbacks = [*(callbacks or []), _TokenForwarder(on_token, on_reset)]
+    response = await llm.ainvoke(messages, config={"callbacks": callbacks}, stream=True)
+    if response.response_metadata.get("cache_hit"):
+        on_token(response.content)  # Réponse relue du cache : pas de flux, tout le texte d'un coup
+    return response.content.strip()
+
 
 # --- Fonction principale ---
-async def synthesis_agent(input_text: str) -> str:
+async def synthesis_agent(
+    input_text: str,
+    callbacks: Optional[list] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    on_reset: Optional[Callable[[], None]] = None,
+) -> str:
+    """
+    Génère le rapport. Avec on_token, le rapport est streamé token par token pendant la
+    génération ; on_reset est appelé si la génération repart de zéro sur le modèle de repli.
+    """
     try:
-        messages = [
-            SystemMessage(content=SYNTHESIS_AGENT_PROMPT),
-            HumanMessage(content=input_text)
-        ]
-        response = await llm.ainvoke(messages, config={"callbacks": [st.session_state.tracker]})
+        return await _generate(SYNTHESIS_AGENT_PROMPT, input_text, callbacks, on_token, on_reset)
+    except Exception as e:
+        raise RuntimeError(f"Synthesis generation failed: {e}")
 
-        return response.content.strip()
+
+async def section_agent(input_text: str, callbacks: Optional[list] = None) -> str:
+    """Rédige la section d'une sous-requête (mode map-reduce)."""
+    try:
+        return await _generate(SECTION_AGENT_PROMPT, input_text, callbacks)
+    except Exception as e:
+        raise RuntimeError(f"Section generation failed: {e}")
+
+
+async def framing_agent(
+    input_text: str,
+    part: str,
+    callbacks: Optional[list] = None,
+    on_token: Optional[Callable[[str], None]] = None,
+    on_reset: Optional[Callable[[], None]] = None,
+) -> str:
+    """Rédige le début ("front" : titre à méthodologie) ou la fin ("back" : discussion à conclusion) du rapport."""
+    prompt = FRONT_MATTER_PROMPT if part == "front" else BACK_MATTER_PROMPT
+    try:
+        return await _generate(prompt, input_text, callbacks, on_token, on_reset)
     except Exception as e:
-        raise RuntimeError(f"Synthesis generation failed: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Report {part} matter generation failed: {e}")
@@ -0,0 +1,161 @@
+# utils/adaptive_limiter.py
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, Tuple
+
+from DeepResearch_HITL.utils.config import (
+    get_search_concurrency, get_concurrency_min, get_concurrency_max, get_target_latency,
+)
+from utils.llm_factory import on_throttle
+
+
+def is_overload(error: BaseException) -> bool:
+    """Timeout ou refus pour rate limit (429), quel que soit le client qui l'a levé."""
+    # asyncio.TimeoutError (levée par wait_for) n'est un alias de TimeoutError qu'à partir de Python 3.11
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return "429" in text or "ratelimit" in text or "rate limit" in text or "usagelimit" in text
+
+
+class AdaptiveLimiter:
+    """
+    Limite de concurrence AIMD, partagée par tous les runs du processus :
+    - chaque appel terminé sous la latence cible ajoute 1/limite (+1 par fenêtre complète)
+    - un 429 ou un timeout divise la limite par deux (au plus une fois par latence cible,
+      une rafale d'erreurs ne compte que pour une)
+    Les runs Streamlit tournent dans des threads et des boucles différents : l'état est
+    protégé par un verrou et chaque attente est réveillée dans sa propre boucle.
+    """
+
+    def __init__(self, name: str, initial: int, min_limit: int, max_limit: int, target_latency: float, backoff: float = 0.5):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.in_flight = 0
+        self.completed = 0
+        self.overloads = 0
+        self.max_queue_depth = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._last_cut = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    # --- Places ---
+    def _grant(self) -> None:
+        # Appelé avec self._lock : donne les places libres aux premiers en attente
+        while self._waiters and self.in_flight < int(self.limit):
+            loop, future = self._waiters.popleft()
+            self.in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._wake, future)
+            except RuntimeError:
+                self.in_flight -= 1  # Boucle fermée : run terminé entre-temps
+
+    def _wake(self, future: asyncio.Future) -> None:
+        if future.done():
+            self._release_slot()  # Attente annulée après l'attribution de la place
+        else:
+            future.set_result(None)
+
+    def _release_slot(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._grant()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            entry = (loop, future)
+            self._waiters.append(entry)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiters))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)  # Pas encore servie
+                elif future.done() and not future.cancelled():
+                    self.in_flight -= 1  # Place reçue juste avant l'annulation
+                    self._grant()
+            raise
+
+    def release(self, latency: float, overloaded: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            if overloaded:
+                self.overloads += 1
+                if now - self._last_cut >= self.target_latency:
+                    self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                    self._last_cut = now
+            elif latency <= self.target_latency:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._grant()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Place de concurrence ; latence, timeouts et 429 (y compris ceux retentés par utils.llm_factory) ajustent la limite."""
+        await self.acquire()
+        start = time.monotonic()
+        throttled = []
+        overloaded = False
+        try:
+            with on_throttle(lambda: throttled.append(True)):
+                yield
+        except BaseException as e:
+            overloaded = is_overload(e)
+            raise
+        finally:
+            self.release(time.monotonic() - start, overloaded or bool(throttled))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "stage": self.name,
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "max_queue_depth": self.max_queue_depth,
+                "completed": self.completed,
+                "overloads": self.overloads,
+            }
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(stage: str) -> AdaptiveLimiter:
+    """Limiteur du processus pour une étape ("search" : Tavily, "summarize" : search_agent)."""
+    with _limiters_lock:
+        if stage not in _limiters:
+            _limiters[stage] = AdaptiveLimiter(
+                stage,
+                initial=get_search_concurrency(),
+                min_limit=get_concurrency_min(),
+                max_limit=get_concurrency_max(),
+                target_latency=get_target_latency(stage),
+            )
+        return _limiters[stage]
+
+
+def limiter_stats() -> list:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.stats() for limiter in limiters]
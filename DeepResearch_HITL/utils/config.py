@@ -11,3 +11,96 @@ def get_openai_key():
 
 def get_tavily_key():
     return os.getenv("TAVILY_API_KEY")
+
+def get_cache_dir():
+    # Par défaut : .cache/ à la racine du projet (même dossier que l'agent multi-outils)
+    default_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '.cache'))
+    return os.getenv("CACHE_DIR", default_dir)
+
+# --- Search fan-out ---
+def get_search_concurrency():
+    # Concurrence initiale des recherches Tavily et des résumés search_agent (ajustée ensuite par AIMD)
+    return max(1, int(os.getenv("SEARCH_CONCURRENCY", "8")))
+
+def get_concurrency_min():
+    # Plancher de la limite adaptative (1 = séquentiel sous forte surcharge)
+    return max(1, int(os.getenv("SEARCH_CONCURRENCY_MIN", "1")))
+
+def get_concurrency_max():
+    # Plafond de la limite adaptative
+    return max(1, int(os.getenv("SEARCH_CONCURRENCY_MAX", "32")))
+
+# Latence (secondes) sous laquelle un appel est jugé sain : la limite de l'étape augmente
+DEFAULT_TARGET_LATENCIES = {"search": 10.0, "summarize": 30.0}
+
+def get_target_latency(stage: str):
+    # ADAPTIVE_TARGET_LATENCY_SEARCH, ADAPTIVE_TARGET_LATENCY_SUMMARIZE
+    default = DEFAULT_TARGET_LATENCIES.get(stage, 30.0)
+    return float(os.getenv(f"ADAPTIVE_TARGET_LATENCY_{stage.upper()}", str(default)))
+
+def get_summary_timeout():
+    # Timeout (secondes) d'un résumé avant abandon du résultat
+    return float(os.getenv("SUMMARY_TIMEOUT", "90"))
+
+# --- Query deduplication ---
+def get_query_dedup_threshold():
+    # Similarité cosinus à partir de laquelle une requête est jugée redondante (>= 1 : doublons exacts seulement)
+    return float(os.getenv("QUERY_DEDUP_THRESHOLD", "0.9"))
+
+# --- Synthesis ---
+def get_synthesis_mode():
+    # "single" : tout le rapport en un seul appel ; "map_reduce" : une section par sous-requête
+    # rédigée dès que ses résultats sont prêts, puis une passe finale courte
+    mode = os.getenv("SYNTHESIS_MODE", "single").strip().lower()
+    return mode if mode in ("single", "map_reduce") else "single"
+
+# --- Context packing (budgets en tokens, comptés avec tiktoken) ---
+def get_followup_context_tokens():
+    # Budget du digest des résultats envoyé à followup_agent
+    return int(os.getenv("FOLLOWUP_CONTEXT_TOKENS", "4000"))
+
+def get_synthesis_context_tokens():
+    # Budget des résultats envoyés à synthesis_agent (mode single)
+    return int(os.getenv("SYNTHESIS_CONTEXT_TOKENS", "60000"))
+
+def get_section_context_tokens():
+    # Budget des résultats envoyés à section_agent (mode map_reduce)
+    return int(os.getenv("SECTION_CONTEXT_TOKENS", "12000"))
+
+def get_digest_entry_tokens():
+    # Taille max d'une entrée du digest de followup
+    return int(os.getenv("DIGEST_ENTRY_TOKENS", "80"))
+
+# --- Page fetching ---
+def get_fetch_pool_size():
+    # Connexions HTTP simultanées dans le pool partagé
+    return int(os.getenv("FETCH_POOL_SIZE", "20"))
+
+def get_fetch_per_host():
+    # Connexions simultanées max vers un même hôte
+    return int(os.getenv("FETCH_PER_HOST", "2"))
+
+def get_fetch_timeout():
+    # Timeout (secondes) d'un téléchargement de page
+    return float(os.getenv("FETCH_TIMEOUT", "10"))
+
+def get_fetch_deadline():
+    # Budget total (secondes) pour télécharger toutes les pages d'une itération
+    return float(os.getenv("FETCH_DEADLINE", "30"))
+
+def get_fetch_max_bytes():
+    # Taille max lue par page (octets)
+    return int(os.getenv("FETCH_MAX_BYTES", "2000000"))
+
+# --- Summary cache ---
+def get_summary_cache_ttl():
+    # Durée de vie (secondes) d'un résumé search_agent en cache
+    return float(os.getenv("SUMMARY_CACHE_TTL", str(30 * 24 * 3600)))
+
+def get_summary_cache_max_entries():
+    return int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "20000"))
+
+# --- Checkpoints ---
+def get_checkpoint_path():
+    # Base SQLite des checkpoints LangGraph (un thread par run, reprise après interruption)
+    return os.getenv("CHECKPOINT_DB") or os.path.join(get_cache_dir(), "deepresearch_checkpoints.sqlite")
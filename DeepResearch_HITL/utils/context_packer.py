@@ -0,0 +1,102 @@
+import re
+from functools import lru_cache
+from typing import Callable, List, Sequence, TypeVar
+
+import tiktoken
+
+from DeepResearch_HITL.model import SearchResult
+
+T = TypeVar("T")
+
+# Encodage tiktoken par défaut ; les appelants passent le modèle routé du rôle (get_role_model)
+DEFAULT_MODEL = "gpt-4o"
+
+# Résumés que search_agent produit pour une page sans contenu utile
+EMPTY_SUMMARY_MARKERS = ("minimal relevant content", "no relevant content", "no page content could be retrieved")
+MIN_SUMMARY_WORDS = 12
+
+WORD = re.compile(r"\w+")
+STOPWORDS = {
+    "the", "and", "for", "are", "what", "how", "why", "with", "from", "that", "this", "which",
+    "les", "des", "une", "est", "pour", "dans", "que", "qui", "sur", "avec", "par",
+}
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Nombre exact de tokens de text pour le modèle cible."""
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    tokens = _encoding(model).encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return _encoding(model).decode(tokens[:max_tokens]).rstrip() + "…"
+
+
+def query_terms(text: str) -> set:
+    return {w for w in WORD.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS}
+
+
+def relevance(query: str, text: str) -> float:
+    """Part des termes de la requête présents dans text (0 à 1)."""
+    terms = query_terms(query)
+    if not terms:
+        return 0.0
+    return len(terms & query_terms(text)) / len(terms)
+
+
+def is_informative(result: SearchResult) -> bool:
+    summary = (result.summary or "").strip()
+    if len(summary.split()) < MIN_SUMMARY_WORDS:
+        return False
+    lowered = summary.lower()
+    return not any(marker in lowered for marker in EMPTY_SUMMARY_MARKERS)
+
+
+def pack(
+    query: str,
+    items: Sequence[T],
+    render: Callable[[T], str],
+    budget: int,
+    model: str = DEFAULT_MODEL,
+) -> List[T]:
+    """
+    Sélectionne les éléments les plus pertinents pour query dont le rendu tient dans
+    budget tokens. Les éléments retenus sont rendus dans leur ordre d'origine.
+    """
+    rendered = [render(item) for item in items]
+    ranked = sorted(range(len(items)), key=lambda i: (-relevance(query, rendered[i]), i))
+
+    kept, used = set(), 0
+    for i in ranked:
+        cost = count_tokens(rendered[i], model)
+        if used + cost > budget:
+            continue
+        kept.add(i)
+        used += cost
+    return [items[i] for i in sorted(kept)]
+
+
+def pack_results(
+    query: str,
+    results: Sequence[SearchResult],
+    render: Callable[[SearchResult], str],
+    budget: int,
+    model: str = DEFAULT_MODEL,
+) -> List[SearchResult]:
+    """pack() appliqué aux résultats de recherche, après élimination des résumés quasi vides."""
+    return pack(query, [r for r in results if is_informative(r)], render, budget, model)
+
+
+def digest_entry(result: SearchResult, max_tokens: int, model: str = DEFAULT_MODEL) -> str:
+    """Ligne compacte d'un résultat pour le digest de followup_node."""
+    return f"- {result.title}: {truncate_tokens(' '.join(result.summary.split()), max_tokens, model)}"
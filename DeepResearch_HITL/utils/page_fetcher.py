@@ -0,0 +1,114 @@
+# utils/page_fetcher.py
+
+import asyncio
+from typing import Optional
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+from utils.tracing import span, KIND_CLIENT
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
+    'AppleWebKit/537.36 (KHTML, like Gecko) '
+    'Chrome/91.0.4472.124 Safari/537.36'
+)
+
+MAX_PAGE_CHARS = 5000
+
+
+def html_to_text(html: str, max_chars: int = MAX_PAGE_CHARS) -> str:
+    """Extrait le texte lisible d'une page HTML (sans scripts ni styles)."""
+    soup = BeautifulSoup(html, 'html.parser')
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    text = soup.get_text(separator=' ', strip=True)
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    clean_text = ' '.join(chunk for chunk in chunks if chunk)
+    return clean_text[:max_chars]
+
+
+class PageFetcher:
+    """
+    Télécharge des pages en async à travers un pool de connexions partagé.
+
+    Le pool limite le nombre de connexions au total et par hôte. Toutes les
+    requêtes partagent une échéance globale (deadline) fixée à l'ouverture,
+    et chaque réponse est tronquée à max_bytes.
+
+    Usage :
+        async with PageFetcher() as fetcher:
+            text = await fetcher.fetch_text(url)
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 20,
+        per_host: int = 2,
+        request_timeout: float = 10.0,
+        deadline: float = 30.0,
+        max_bytes: int = 2_000_000,
+        max_chars: int = MAX_PAGE_CHARS,
+    ):
+        self.pool_size = pool_size
+        self.per_host = per_host
+        self.request_timeout = request_timeout
+        self.deadline = deadline
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._expires_at = 0.0
+
+    async def __aenter__(self) -> "PageFetcher":
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=300,
+        )
+        self._session = aiohttp.ClientSession(connector=connector, headers={"User-Agent": USER_AGENT})
+        self._expires_at = asyncio.get_running_loop().time() + self.deadline
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _remaining(self) -> float:
+        return self._expires_at - asyncio.get_running_loop().time()
+
+    async def fetch_html(self, url: str) -> Optional[str]:
+        remaining = self._remaining()
+        if self._session is None or remaining <= 0:
+            return None
+
+        timeout = aiohttp.ClientTimeout(total=min(self.request_timeout, remaining))
+        try:
+            async with self._session.get(url, timeout=timeout) as response:
+                if response.status >= 400:
+                    return None
+                content_type = response.headers.get("Content-Type", "")
+                if content_type and "html" not in content_type and "text" not in content_type:
+                    return None
+
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) >= self.max_bytes:
+                        break
+                return bytes(body[:self.max_bytes]).decode(response.charset or "utf-8", errors="replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError, LookupError, ValueError):
+            return None
+
+    async def fetch_text(self, url: str) -> Optional[str]:
+        """Retourne le texte nettoyé de la page, ou None si elle n'a pas pu être lue à temps."""
+        with span("http.fetch", KIND_CLIENT, url=url) as current:
+            html = await self.fetch_html(url)
+            if current is not None:
+                current.set(bytes=len(html) if html else 0)
+        if not html:
+            return None
+        # Le parsing BeautifulSoup est CPU-bound : hors de la boucle d'événements
+        text = await asyncio.to_thread(html_to_text, html, self.max_chars)
+        return text or None
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from utils.disk_cache import normalize_query
+from utils.embedding_cache import get_cached_embeddings
+
+
+@dataclass
+class SkippedQuery:
+    query: str
+    duplicate_of: str
+    similarity: float
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+async def dedup_queries(
+    candidates: Iterable[str],
+    processed: Iterable[str],
+    threshold: float,
+    model: str = "text-embedding-3-small",
+) -> Tuple[List[str], List[SkippedQuery]]:
+    """
+    Retire des candidates les requêtes quasi identiques à une requête déjà traitée
+    (ou à une candidate déjà retenue) : similarité cosinus des embeddings >= threshold.
+    Candidates et requêtes traitées sont embeddées en un seul appel batch (mis en cache).
+    """
+    processed = list(dict.fromkeys(processed))
+    seen = {normalize_query(q): q for q in processed}
+
+    # Doublons exacts (casse, espaces) : pas besoin d'embedding
+    unique, skipped = [], []
+    for query in candidates:
+        key = normalize_query(query)
+        if not key:
+            continue
+        if key in seen:
+            skipped.append(SkippedQuery(query, seen[key], 1.0))
+            continue
+        seen[key] = query
+        unique.append(query)
+
+    if not unique or threshold >= 1:
+        return unique, skipped
+
+    vectors = _unit_rows(await get_cached_embeddings(model).aembed_array(processed + unique))
+    reference = list(processed)
+    reference_vectors = [vectors[i] for i in range(len(processed))]
+
+    kept = []
+    for offset, query in enumerate(unique):
+        vector = vectors[len(processed) + offset]
+        if reference_vectors:
+            similarities = np.stack(reference_vectors) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= threshold:
+                skipped.append(SkippedQuery(query, reference[best], float(similarities[best])))
+                continue
+        kept.append(query)
+        reference.append(query)
+        reference_vectors.append(vector)
+    return kept, skipped
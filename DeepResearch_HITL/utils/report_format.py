@@ -0,0 +1,35 @@
+import re
+from typing import Dict, List
+
+# Étiquettes de citation "[Source N]" (et variantes "[Source 1, Source 2]")
+SOURCE_LABEL = re.compile(r"\bSource (\d+)\b")
+HEADING = re.compile(r"^## +(.+?) *$", re.MULTILINE)
+
+
+def relabel_sources(text: str, mapping: Dict[int, int]) -> str:
+    """Renumérote les citations [Source N] selon mapping (numéro provisoire -> numéro final)."""
+    return SOURCE_LABEL.sub(lambda m: f"Source {mapping.get(int(m.group(1)), int(m.group(1)))}", text)
+
+
+def number_section(section: str, number: int, fallback_title: str) -> str:
+    """Préfixe le titre de niveau 2 d'une section par son numéro ("## 3. Titre")."""
+    section = section.strip()
+    first_line, _, rest = section.partition("\n")
+    if first_line.startswith("## "):
+        title = first_line[3:].strip()
+        return f"## {number}. {title}\n{rest}".rstrip()
+    return f"## {number}. {fallback_title}\n\n{section}"
+
+
+def heading_anchor(title: str) -> str:
+    # Même règle que les ancres markdown de GitHub/Streamlit
+    anchor = re.sub(r"[^\w\s-]", "", title.lower())
+    return re.sub(r"\s", "-", anchor.strip())
+
+
+def table_of_contents(markdown: str) -> str:
+    """Table des matières construite à partir des titres de niveau 2."""
+    lines: List[str] = ["## Table of Contents"]
+    for title in HEADING.findall(markdown):
+        lines.append(f"- [{title}](#{heading_anchor(title)})")
+    return "\n".join(lines)
@@ -0,0 +1,149 @@
+# utils/reporter.py
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+class Progress:
+    """Barre de progression : sans interface, on journalise seulement la fin."""
+
+    def __init__(self, reporter: "Reporter"):
+        self.reporter = reporter
+        self.text = ""
+
+    def update(self, fraction: float, text: str = "") -> None:
+        self.text = text or self.text
+
+    def close(self) -> None:
+        if self.text:
+            self.reporter.info(self.text)
+
+
+class ReportStream:
+    """Réception du rapport token par token ; sans interface, on se contente d'accumuler."""
+
+    def __init__(self):
+        self.text = ""
+
+    def write(self, token: str) -> None:
+        self.text += token
+
+    def reset(self) -> None:
+        # Génération reprise depuis le début (repli sur un autre modèle) : on efface le texte reçu
+        self.text = ""
+
+    def close(self) -> None:
+        pass
+
+
+class Reporter:
+    """
+    Retour d'avancement des nœuds du graphe DeepResearch.
+
+    Implémentation par défaut sans Streamlit : tout passe par `logging`.
+    Les nœuds la récupèrent via get_reporter(config) ; l'interface Streamlit
+    fournit StreamlitReporter dans config["configurable"]["reporter"].
+    """
+
+    def __init__(self, prefix: str = "", logger: Optional[logging.Logger] = None):
+        self.prefix = prefix
+        self.logger = logger or logging.getLogger("deepresearch")
+
+    def info(self, message: str) -> None:
+        self.logger.info(f"{self.prefix}{message}")
+
+    def warning(self, message: str) -> None:
+        self.logger.warning(f"{self.prefix}{message}")
+
+    def error(self, message: str) -> None:
+        self.logger.error(f"{self.prefix}{message}")
+
+    @contextmanager
+    def spinner(self, message: str):
+        self.info(message)
+        yield
+
+    def progress(self, text: str = "") -> Progress:
+        return Progress(self)
+
+    def report_stream(self) -> ReportStream:
+        return ReportStream()
+
+
+class StreamlitProgress(Progress):
+    def __init__(self, reporter: "Reporter", text: str):
+        import streamlit as st
+
+        super().__init__(reporter)
+        self._bar = st.progress(0.0, text=text)
+
+    def update(self, fraction: float, text: str = "") -> None:
+        self._bar.progress(fraction, text=text or None)
+
+    def close(self) -> None:
+        self._bar.empty()
+
+
+class StreamlitReportStream(ReportStream):
+    """Affiche le rapport au fil de sa génération (rafraîchissement limité pour ne pas saturer l'UI)."""
+
+    def __init__(self, refresh_interval: float = 0.2):
+        import streamlit as st
+
+        super().__init__()
+        self._placeholder = st.empty()
+        self._refresh_interval = refresh_interval
+        self._last_render = 0.0
+
+    def write(self, token: str) -> None:
+        super().write(token)
+        now = time.monotonic()
+        if now - self._last_render >= self._refresh_interval:
+            self._placeholder.markdown(self.text + " ▌")
+            self._last_render = now
+
+    def reset(self) -> None:
+        super().reset()
+        self._placeholder.markdown(" ▌")
+        self._last_render = 0.0
+
+    def close(self) -> None:
+        self._placeholder.markdown(self.text)
+
+
+class StreamlitReporter(Reporter):
+    """Affichage dans la page Streamlit courante."""
+
+    def __init__(self):
+        import streamlit as st
+
+        super().__init__()
+        self.st = st
+
+    def info(self, message: str) -> None:
+        self.st.info(message)
+
+    def warning(self, message: str) -> None:
+        self.st.warning(message)
+
+    def error(self, message: str) -> None:
+        self.st.error(message)
+
+    @contextmanager
+    def spinner(self, message: str):
+        with self.st.spinner(message):
+            yield
+
+    def progress(self, text: str = "") -> Progress:
+        return StreamlitProgress(self, text)
+
+    def report_stream(self) -> ReportStream:
+        return StreamlitReportStream()
+
+
+def get_reporter(config: Optional[dict]) -> Reporter:
+    """Reporter transmis par l'appelant dans la config LangGraph, sinon journalisation simple."""
+    configurable = (config or {}).get("configurable", {})
+    return configurable.get("reporter") or Reporter()
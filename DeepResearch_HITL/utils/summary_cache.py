@@ -0,0 +1,32 @@
+# utils/summary_cache.py
+
+import hashlib
+import os
+import threading
+
+from DeepResearch_HITL.utils.config import get_cache_dir, get_summary_cache_ttl, get_summary_cache_max_entries
+from utils.disk_cache import DiskCache, make_key
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> DiskCache:
+    """Cache persistant des résumés search_agent, adressé par URL + contenu de la page."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(
+                    path=os.path.join(get_cache_dir(), "summary_cache.sqlite"),
+                    table="summaries",
+                    ttl=get_summary_cache_ttl(),
+                    max_entries=get_summary_cache_max_entries(),
+                )
+    return _cache
+
+
+def summary_key(canonical: str, content: str) -> str:
+    # Si la page change, le hash change : le résumé est recalculé
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return make_key("search_agent", canonical, content_hash)
@@ -1,36 +1,91 @@
 # utils/token_tracker.py
 
 from langchain.callbacks.base import BaseCallbackHandler
-from typing import Any
+from typing import Any, Dict
+from uuid import UUID
 import threading
+import time
+
+from utils.llm_cache import is_cache_hit
+
+
+def _new_role_stats() -> dict:
+    return {"calls": 0, "cache_hits": 0, "errors": 0, "tokens": 0, "cost": 0.0, "seconds": 0.0, "models": set()}
+
 
 class TokenCostTracker(BaseCallbackHandler):
     def __init__(self):
         self.total_tokens = 0
         self.total_cost = 0.0
+        self.cache_hits = 0  # réponses servies par le cache LLM (coût nul)
+        # Par rôle d'agent (metadata "role" posée par utils.model_routing) : appels, coût, latence
+        self.by_role: Dict[str, dict] = {}
+        self._started: Dict[UUID, tuple] = {}  # run_id -> (rôle, début)
         self.lock = threading.Lock()
 
-    def on_llm_end(self, response, **kwargs: Any) -> None:
+    # --- Début et fin de chaque appel (latence par rôle) ---
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs: Any) -> None:
+        role = (metadata or {}).get("role", "other")
+        with self.lock:
+            self._started[run_id] = (role, time.perf_counter())
+
+    def _finish(self, run_id: UUID) -> dict:
+        # Appelé avec self.lock
+        role, start = self._started.pop(run_id, ("other", time.perf_counter()))
+        stats = self.by_role.setdefault(role, _new_role_stats())
+        stats["seconds"] += time.perf_counter() - start
+        return stats
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any) -> None:
+        # Appel abandonné (ex. budget de latence dépassé avant repli sur le niveau rapide)
+        with self.lock:
+            self._finish(run_id)["errors"] += 1
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
         try:
+            if is_cache_hit(response):
+                with self.lock:
+                    self.cache_hits += 1
+                    stats = self._finish(run_id)
+                    stats["calls"] += 1
+                    stats["cache_hits"] += 1
+                return
+
             llm_output = response.llm_output or {}
             usage = llm_output.get("token_usage", {})
             model = llm_output.get("model_name", "unknown-model")
             prompt_tokens = usage.get("prompt_tokens", 0)
             completion_tokens = usage.get("completion_tokens", 0)
 
+            if not usage:
+                # Réponses streamées : l'usage est porté par le message final (stream_usage=True)
+                message = getattr(response.generations[0][0], "message", None) if response.generations else None
+                usage_metadata = getattr(message, "usage_metadata", None) or {}
+                prompt_tokens = usage_metadata.get("input_tokens", 0)
+                completion_tokens = usage_metadata.get("output_tokens", 0)
+                if message is not None:
+                    model = message.response_metadata.get("model_name", model)
+
             total = prompt_tokens + completion_tokens
             cost = self.estimate_cost(model, prompt_tokens, completion_tokens)
 
             with self.lock:
                 self.total_tokens += total
                 self.total_cost += cost
+                stats = self._finish(run_id)
+                stats["calls"] += 1
+                stats["tokens"] += total
+                stats["cost"] += cost
+                stats["models"].add(model)
         except Exception:
             pass
 
     def estimate_cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
         # Tarifs en dollars pour 1000 tokens
         model = model.lower()
-        if "gpt-4o" in model:
+        if "gpt-4o-mini" in model:
+            return (prompt_tokens * 0.00000015) + (completion_tokens * 0.0000006)
+        elif "gpt-4o" in model:
             return (prompt_tokens * 0.000005) + (completion_tokens * 0.000015)
         elif "gpt-4" in model:
             return (prompt_tokens * 0.00003) + (completion_tokens * 0.00006)
@@ -43,7 +98,29 @@ class TokenCostTracker(BaseCallbackHandler):
     def get_report(self):
         return self.total_tokens, round(self.total_cost, 4)
 
+    def get_role_report(self):
+        """Une ligne par rôle : appels, hits du cache, erreurs, tokens, coût, latence totale et moyenne."""
+        with self.lock:
+            rows = []
+            for role, stats in sorted(self.by_role.items()):
+                finished = stats["calls"] + stats["errors"]
+                rows.append({
+                    "role": role,
+                    "models": ", ".join(sorted(stats["models"])),
+                    "calls": stats["calls"],
+                    "cache_hits": stats["cache_hits"],
+                    "errors": stats["errors"],
+                    "tokens": stats["tokens"],
+                    "cost": round(stats["cost"], 4),
+                    "seconds": round(stats["seconds"], 2),
+                    "avg_seconds": round(stats["seconds"] / finished, 2) if finished else 0.0,
+                })
+            return rows
+
     def reset(self):
         with self.lock:
             self.total_tokens = 0
             self.total_cost = 0.0
+            self.cache_hits = 0
+            self.by_role = {}
+            self._started = {}
@@ -0,0 +1,35 @@
+# utils/urls.py
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Paramètres de suivi sans effet sur le contenu de la page
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src", "igshid"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Forme canonique d'une URL pour la déduplication :
+    schéma https, hôte en minuscules sans 'www.', port par défaut retiré,
+    pas de fragment ni de paramètres de suivi, paramètres triés, pas de '/' final.
+    """
+    url = url.strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{host}:{parts.port}"
+    if scheme in DEFAULT_PORTS:
+        scheme = "https"
+
+    path = parts.path.rstrip("/") or "/"
+    params = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, netloc, path, urlencode(params), ""))
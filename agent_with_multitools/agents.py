@@ -1,21 +1,20 @@
 # agents.py
 
 from dotenv import load_dotenv
+import asyncio
 import os
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
-from langchain_openai import ChatOpenAI
-from langchain.agents import create_tool_calling_agent, AgentExecutor
-from langchain.prompts import ChatPromptTemplate
 from langchain_core.tools import BaseTool
 
-# Importation du tracker modifié
-from tracking import tracker
-
-from crawl4ai import AsyncWebCrawler
-import asyncio
+# Suivi des outils propre à chaque requête (variables de contexte)
+from tracking import get_tracker, track_tool
 
-from utils.config import load_env, get_openai_key, get_tavily_key
+from utils.config import (
+    load_env, get_openai_key, get_tavily_key, get_crawler_contexts, get_crawler_page_timeout, get_tool_timeout,
+)
+from utils.search_cache import acached_search
+from utils.model_routing import get_chat_model
 load_env()
 # Charger les variables d'environnement
 
@@ -25,24 +24,39 @@ os.environ["TAVILY_API_KEY"] = get_tavily_key()
 # Importation des outils
 from tools import wikipedia, arxiv
 from my_tools.rag_tool import RAGTool
+from my_tools.crawler_pool import CrawlerPool
 from langchain_community.tools.tavily_search.tool import TavilySearchResults
 
 # Instanciation
 rag_tool = RAGTool()
 tavily = TavilySearchResults()
+# Navigateur lancé une seule fois par processus (au premier crawl), partagé par tous les appels
+crawler_pool = CrawlerPool(contexts=get_crawler_contexts(), page_timeout=get_crawler_page_timeout())
+
+# Timeouts par outil : un outil lent est abandonné et le LLM peut en essayer un autre
+def _timeout_message(tool_name: str, timeout: float) -> str:
+    return f"{tool_name} timed out after {timeout:.0f} seconds. Try another tool."
+
 
 # Définition des inputs via Pydantic et des outils avec marquage [TOOL: ...]
+# Tous les outils sont async : les appels demandés dans un même tour s'exécutent en parallèle.
 
 class WikipediaInput(BaseModel):
     query: str
 
 @tool(args_schema=WikipediaInput)
-def wikipedia_search(query: str) -> str:
+@track_tool("wikipedia_search")
+async def wikipedia_search(query: str) -> str:
     """Search for information using Wikipedia."""
-    result = wikipedia.invoke(query)
+    timeout = get_tool_timeout("wikipedia_search")
+    try:
+        # Le wrapper Wikipedia est synchrone : exécuté dans un thread pour ne pas bloquer la boucle
+        result = await asyncio.wait_for(asyncio.to_thread(wikipedia.invoke, query), timeout)
+    except asyncio.TimeoutError:
+        return _timeout_message("wikipedia_search", timeout)
     # N'ajouter l'outil que s'il fournit des informations utilisables
     if result and "No good Wikipedia Search Result was found" not in result:
-        tracker.add_tool("wikipedia_search", result)
+        get_tracker().add_tool("wikipedia_search", result)
         return result
     else:
         return "No relevant information found on Wikipedia."
@@ -52,12 +66,18 @@ class ArxivInput(BaseModel):
     query: str
 
 @tool(args_schema=ArxivInput)
-def arxiv_search(query: str) -> str:
+@track_tool("arxiv_search")
+async def arxiv_search(query: str) -> str:
     """Search academic papers using Arxiv."""
-    result = arxiv.invoke(query)
+    timeout = get_tool_timeout("arxiv_search")
+    try:
+        # Client Arxiv synchrone, même traitement que Wikipedia
+        result = await asyncio.wait_for(asyncio.to_thread(arxiv.invoke, query), timeout)
+    except asyncio.TimeoutError:
+        return _timeout_message("arxiv_search", timeout)
     # N'ajouter l'outil que s'il fournit des informations utilisables
     if result and len(result.strip()) > 10:  # vérifie que ce n'est pas vide ou presque
-        tracker.add_tool("arxiv_search", result)
+        get_tracker().add_tool("arxiv_search", result)
         return result
     else:
         return "No relevant academic article found on Arxiv."
@@ -67,9 +87,18 @@ class TavilyInput(BaseModel):
     query: str
 
 @tool(args_schema=TavilyInput)
-def tavily_search(query: str) -> str:
+@track_tool("tavily_search")
+async def tavily_search(query: str) -> str:
     """Search the web using Tavily."""
-    result = tavily.invoke(query)
+    timeout = get_tool_timeout("tavily_search")
+    # Cache partagé avec DeepResearch (clé : requête normalisée + paramètres de recherche)
+    params = {"max_results": tavily.max_results, "search_depth": tavily.search_depth}
+    try:
+        result = await asyncio.wait_for(
+            acached_search("tavily_results", query, params, lambda: tavily.ainvoke(query)), timeout
+        )
+    except asyncio.TimeoutError:
+        return _timeout_message("tavily_search", timeout)
     
     # Tavily retourne une liste de résultats, donc nous devons la traiter différemment
     if result and isinstance(result, list) and len(result) > 0:
@@ -84,7 +113,7 @@ def tavily_search(query: str) -> str:
         result_text = "\n".join(formatted_results)
         
         if result_text and len(result_text) > 10:
-            tracker.add_tool("tavily_search", result)
+            get_tracker().add_tool("tavily_search", result)
             return result_text
     
     return "No relevant result found with Tavily."
@@ -93,12 +122,17 @@ class RAGInput(BaseModel):
     query: str
 
 @tool(args_schema=RAGInput)
-def rag_search(query: str) -> str:
+@track_tool("rag_search")
+async def rag_search(query: str) -> str:
     """Retrieve documents from a Pinecone-powered RAG system."""
-    result = rag_tool.invoke(query)
+    timeout = get_tool_timeout("rag_search")
+    try:
+        result = await asyncio.wait_for(rag_tool.ainvoke(query), timeout)
+    except asyncio.TimeoutError:
+        return _timeout_message("rag_search", timeout)
     # N'ajouter l'outil que s'il fournit des informations utilisables
     if result and len(result.strip()) > 10:  # vérifie que ce n'est pas vide ou presque
-        tracker.add_tool("rag_search", result)
+        get_tracker().add_tool("rag_search", result)
         return result
     else:
         return "No relevant document found in the knowledge base."
@@ -108,20 +142,20 @@ class Crawl4AIInput(BaseModel):
     url: str
 
 @tool(args_schema=Crawl4AIInput)
-def crawl4ai_search(url: str) -> str:
+@track_tool("crawl4ai_search")
+async def crawl4ai_search(url: str) -> str:
     """Crawl a web page and return AI-optimized markdown."""
-    async def fetch():
-        async with AsyncWebCrawler() as crawler:
-            result = await crawler.arun(url=url)
-            return result.markdown.fit_markdown or result.markdown.raw_markdown
-
+    # Jamais moins que le timeout de page du navigateur (+ attente d'une session libre)
+    timeout = max(get_tool_timeout("crawl4ai_search"), crawler_pool.page_timeout + 10)
     try:
-        markdown = asyncio.run(fetch())
+        markdown = await asyncio.wait_for(crawler_pool.acrawl(url), timeout)
         if markdown and len(markdown.strip()) > 10:
-            tracker.add_tool("crawl4ai_search", markdown)
+            get_tracker().add_tool("crawl4ai_search", markdown)
             return markdown
         else:
             return "Crawling the page did not return any usable content."
+    except asyncio.TimeoutError:
+        return _timeout_message("crawl4ai_search", timeout)
     except Exception as e:
         return f"Error while crawling the page: {e}"
 
@@ -131,53 +165,35 @@ tools = [crawl4ai_search, rag_search, wikipedia_search, tavily_search, arxiv_sea
 
 tools = [t for t in tools if isinstance(t, BaseTool)]
 
-# LLM et prompt
-llm = ChatOpenAI(model="gpt-4o", temperature=0)
-
-prompt = ChatPromptTemplate.from_messages([
-    ("system", 
-     """You are a smart AI assistant that uses multiple tools to answer user questions.
-     
-     IMPORTANT: If a tool doesn't return a relevant or satisfactory result, ALWAYS try another tool.
-     
-     Here are your tools in order of preference:
-     1. tavily_search - use it for up-to-date web information (news, sports events, etc.)
-     2. crawl4ai_search - use it when you have a specific URL to analyze
-     3. rag_search - use it to search in the internal knowledge base
-     4. wikipedia_search - use it for general and factual knowledge
-     5. arxiv_search - use it for academic and scientific research
-     
-     If a tool returns an error message or says no information was found, ALWAYS try another relevant tool.
-     
-     For questions about recent or upcoming sports events, prioritize using tavily_search.
-     
-     IMPORTANT ABOUT CHAT HISTORY:
-     - You have access to the chat history via the variable {chat_history}.
-     - When asked about previous questions or responses, ALWAYS check the chat history.
-     - When the user asks about previous conversations or what questions they've asked before, use the chat history to provide accurate answers.
-     
-     Briefly explain why you're using each tool and summarize the responses clearly and in a structured format.
-     Be factual and don't make anything up. If no tool provides results, honestly acknowledge it.
-     """),
-    ("human", "{input}"),
-    ("placeholder", "{agent_scratchpad}")
-])
-
-
-# Création de l'agent
-agent = create_tool_calling_agent(llm, tools, prompt)
+# LLM et prompt système (la boucle d'appel des outils est dans workflow.py)
+# Modèle du rôle "agent" (MODEL_TIER_AGENT) ; cache de réponses désactivé par défaut (LLM_CACHE_TTL_AGENT)
+llm = get_chat_model("agent", temperature=0)
+
+SYSTEM_PROMPT = """You are a smart AI assistant that uses multiple tools to answer user questions.
+
+IMPORTANT: If a tool doesn't return a relevant or satisfactory result, ALWAYS try another tool.
+
+Here are your tools in order of preference:
+1. tavily_search - use it for up-to-date web information (news, sports events, etc.)
+2. crawl4ai_search - use it when you have a specific URL to analyze
+3. rag_search - use it to search in the internal knowledge base
+4. wikipedia_search - use it for general and factual knowledge
+5. arxiv_search - use it for academic and scientific research
+
+If a tool returns an error message or says no information was found, ALWAYS try another relevant tool.
+When several tools are relevant, request them in the same turn: they run in parallel.
+
+For questions about recent or upcoming sports events, prioritize using tavily_search.
+
+IMPORTANT ABOUT CHAT HISTORY:
+- The previous messages of the conversation are provided before the current question.
+- When asked about previous questions or responses, ALWAYS check the chat history.
+- When the user asks about previous conversations or what questions they've asked before, use the chat history to provide accurate answers.
+
+Briefly explain why you're using each tool and summarize the responses clearly and in a structured format.
+Be factual and don't make anything up. If no tool provides results, honestly acknowledge it.
+"""
 
 print("📦 Tool types:")
 for t in tools:
     print(f" - {t.name} => {type(t)}")
-
-# Ajout du paramètre chat_history dans l'exécuteur d'agent
-agent_executor = AgentExecutor(
-    agent=agent, 
-    tools=tools, 
-    verbose=True, 
-    handle_parsing_errors=True,
-    return_intermediate_steps=True,
-    # Permettre le passage de l'historique des conversations
-    allowed_tools=["wikipedia_search", "tavily_search", "arxiv_search", "rag_search", "crawl4ai_search"]
-)
\ No newline at end of file
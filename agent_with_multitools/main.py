@@ -1,4 +1,5 @@
 # main.py – Unified Interface for Multi-Tools + DeepResearch
+import asyncio
 import time
 
 import streamlit as st
@@ -6,8 +7,11 @@ import traceback
 from langchain_core.messages import HumanMessage, AIMessage
 
 # Internal imports
-from workflow import graph as multitask_graph
-from tracking import tracker
+from workflow import run_agent
+from utils.model_routing import get_chat_model
+from memory import ConversationMemory
+from utils.tracing import trace
+from utils.trace_view import render_waterfall
 
 st.set_page_config(page_title="Multi-Agent ChatBot", layout="wide")
 
@@ -19,7 +23,7 @@ root_dir = os.path.abspath(os.path.join(current_dir, ".."))
 if root_dir not in sys.path:
     sys.path.append(root_dir)
 
-from DeepResearch_HITL.coordinator import deepresearch_ui
+from DeepResearch_HITL.main import deepresearch_ui
 
 # ─────────────────────────────────────────────
 # ⚙️ Session Initialization
@@ -29,8 +33,10 @@ st.title("🧠 Multi-Agent ChatBot")
 if "mode" not in st.session_state:
     st.session_state.mode = "multi-tools"  # Default mode
 
-if "conversation" not in st.session_state:
-    st.session_state.conversation = []
+if "memory" not in st.session_state:
+    # Historique borné : derniers tours mot pour mot + résumé des plus anciens
+    # Résumé de l'historique : modèle du rôle "memory" (niveau rapide par défaut)
+    st.session_state.memory = ConversationMemory.from_config(get_chat_model("memory", temperature=0))
 
 if "history" not in st.session_state:
     st.session_state.history = []
@@ -42,7 +48,6 @@ col1, col2, col3 = st.columns([1, 5, 1])
 
 with col1:
     if st.button("🔄 Reset"):
-        tracker.reset()
         for key in list(st.session_state.keys()):
             del st.session_state[key]
         st.rerun()
@@ -64,10 +69,15 @@ if st.session_state.mode == "multi-tools":
     if st.button("🚀 Run Agent") and user_input.strip() != "":
         try:
             question = user_input.strip()
-            st.session_state.conversation.append(HumanMessage(content=question))
+            memory = st.session_state.memory
             start = time.time()
 
-            result = multitask_graph.invoke({"messages": st.session_state.conversation})
+            # Outils async : les appels d'un même tour s'exécutent en parallèle
+            # Tracker d'outils propre à cette requête (latence, taille, succès par appel)
+            # Trace : spans des nœuds, appels LLM, outils et caches (sidebar + TRACE_FILE)
+            with trace("agent.run", question=question[:200]) as run_trace:
+                result, tool_tracker = asyncio.run(run_agent(memory.messages(question), memory.summary))
+            st.session_state.last_trace = run_trace
             end = time.time()
             elapsed = round(end - start, 2)
 
@@ -79,15 +89,20 @@ if st.session_state.mode == "multi-tools":
                 for msg in reversed(result.get("messages", [])):
                     if isinstance(msg, AIMessage) and msg.content.strip():
                         ai_reply = msg.content
-                        st.session_state.conversation.append(msg)
                         break
 
             st.info(f"⏱️ Execution time: {elapsed} seconds")
 
             if ai_reply:
+                memory.add_turn(question, ai_reply)
+                # Le résumé n'est recalculé que si le budget MEMORY_MAX_TOKENS est dépassé
+                asyncio.run(memory.acompact())
+
                 st.session_state.history.append({
                     "question": question,
-                    "replies": [ai_reply]
+                    "replies": [ai_reply],
+                    "steps": result.get("step_timings", []),
+                    "tool_calls": tool_tracker.get_calls(),
                 })
 
         except Exception as e:
@@ -105,6 +120,23 @@ if st.session_state.mode == "multi-tools":
                 with st.expander(f"✅ Answer {j}", expanded=True):
                     st.markdown(reply)
 
+            # ⏳ Une ligne par étape de la boucle d'agent (appel LLM, outils, finalisation)
+            if entry.get("steps"):
+                with st.expander("⏳ Timings per step"):
+                    for step in entry["steps"]:
+                        tools_called = f" ({', '.join(step['tools'])})" if step.get("tools") else ""
+                        st.markdown(f"**{step['step']}**{tools_called}: {step['seconds']} seconds")
+
+            if entry.get("tool_calls"):
+                with st.expander("🔧 Tool calls"):
+                    for call in entry["tool_calls"]:
+                        status = "✅" if call.ok else f"⚠️ {call.error}"
+                        st.markdown(f"**{call.name}**: {round(call.seconds, 2)} s, {call.payload_bytes} bytes {status}")
+
+    # 🧭 Waterfall de la dernière question
+    if st.session_state.get("last_trace"):
+        render_waterfall(st.session_state.last_trace)
+
 elif st.session_state.mode == "DeepResearch":
     # Render the full DeepResearch interface
     deepresearch_ui()
@@ -0,0 +1,81 @@
+"""
+memory.py
+
+Mémoire de conversation bornée pour l'agent multi-outils : les derniers tours sont
+gardés mot pour mot, les plus anciens sont condensés dans un résumé glissant.
+Le résumé n'est recalculé que lorsque le budget de tokens est dépassé.
+"""
+
+from functools import lru_cache
+from typing import List, Tuple
+
+import tiktoken
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage
+
+from utils.config import get_memory_max_tokens, get_memory_keep_turns
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an AI assistant.\n"
+    "You receive the current summary (possibly empty) and the turns that are leaving the context window.\n"
+    "Return the updated summary: keep names, user preferences, questions asked, key facts and answers, "
+    "and anything the user may refer to later. Be concise (at most 200 words), no preamble."
+)
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    return len(_encoding(model).encode(text, disallowed_special=()))
+
+
+class ConversationMemory:
+    def __init__(self, llm: BaseChatModel, max_tokens: int = 3000, keep_turns: int = 4, model: str = "gpt-4o"):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.model = model
+        self.summary = ""
+        self.turns: List[Tuple[str, str]] = []  # (question, réponse) mot pour mot
+
+    @classmethod
+    def from_config(cls, llm: BaseChatModel) -> "ConversationMemory":
+        return cls(llm, max_tokens=get_memory_max_tokens(), keep_turns=get_memory_keep_turns())
+
+    def token_count(self) -> int:
+        texts = [self.summary] + [part for turn in self.turns for part in turn]
+        return sum(count_tokens(text, self.model) for text in texts if text)
+
+    def messages(self, question: str) -> List[AnyMessage]:
+        """Historique à envoyer au graphe pour une nouvelle question (le résumé passe par state["summary"])."""
+        history: List[AnyMessage] = []
+        for human, ai in self.turns:
+            history += [HumanMessage(content=human), AIMessage(content=ai)]
+        return history + [HumanMessage(content=question)]
+
+    def add_turn(self, question: str, answer: str) -> None:
+        self.turns.append((question, answer))
+
+    async def acompact(self) -> bool:
+        """Condense les tours les plus anciens si le budget est dépassé. Retourne True si le résumé a changé."""
+        if self.token_count() <= self.max_tokens or len(self.turns) <= self.keep_turns:
+            return False
+
+        old, self.turns = self.turns[:-self.keep_turns], self.turns[-self.keep_turns:]
+        transcript = "\n\n".join(f"User: {human}\nAssistant: {ai}" for human, ai in old)
+        response = await self.llm.ainvoke([
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(content=f"Current summary:\n{self.summary or '(empty)'}\n\nTurns to fold in:\n{transcript}"),
+        ])
+        self.summary = response.content.strip()
+        return True
+
+    def clear(self) -> None:
+        self.summary = ""
+        self.turns = []
@@ -0,0 +1,130 @@
+# src/my_tools/crawler_pool.py
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import Optional
+
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig, CacheMode
+
+from utils.tracing import span, KIND_CLIENT
+
+
+class CrawlerPool:
+    """
+    Navigateur headless partagé par tous les appels crawl4ai_search.
+
+    Le navigateur est lancé au premier appel, dans une boucle d'événements
+    dédiée (thread de fond), puis réutilisé jusqu'à la fin du processus.
+    `contexts` sessions (une page chacune) sont prêtées à tour de rôle :
+    au plus `contexts` pages sont chargées en même temps et chaque page
+    est réutilisée d'un appel à l'autre.
+    """
+
+    def __init__(self, contexts: int = 2, page_timeout: float = 30.0):
+        self.contexts = contexts
+        self.page_timeout = page_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._crawler: Optional[AsyncWebCrawler] = None
+        self._sessions: Optional[asyncio.Queue] = None
+        self._start_lock = threading.Lock()
+
+    # --- Cycle de vie ---
+    def _ensure_started(self) -> None:
+        if self._crawler is not None:
+            return
+        with self._start_lock:
+            if self._crawler is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="crawler-pool", daemon=True)
+            thread.start()
+            try:
+                crawler, sessions = asyncio.run_coroutine_threadsafe(self._start(), loop).result()
+            except Exception:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(timeout=5)
+                raise
+            # _crawler publié en dernier : le chemin rapide (crawler non nul) trouve la boucle prête
+            self._loop, self._thread, self._sessions = loop, thread, sessions
+            self._crawler = crawler
+            atexit.register(self.shutdown)
+
+    async def _start(self) -> tuple:
+        crawler = AsyncWebCrawler(config=BrowserConfig(headless=True, verbose=False))
+        await crawler.start()
+        sessions = asyncio.Queue()
+        for i in range(self.contexts):
+            sessions.put_nowait(f"crawler-pool-{i}")
+        return crawler, sessions
+
+    @staticmethod
+    async def _stop(crawler: AsyncWebCrawler) -> None:
+        await crawler.close()
+
+    def shutdown(self) -> None:
+        """Ferme le navigateur et la boucle de fond (appelé automatiquement à la sortie)."""
+        with self._start_lock:
+            loop, thread, crawler = self._loop, self._thread, self._crawler
+            if loop is None:
+                return
+            try:
+                if crawler is not None:
+                    asyncio.run_coroutine_threadsafe(self._stop(crawler), loop).result(timeout=10)
+            except Exception:
+                pass
+            finally:
+                # Même si _stop a échoué ou expiré : le prochain appel relance un navigateur neuf
+                self._crawler, self._sessions = None, None
+                self._loop, self._thread = None, None
+            loop.call_soon_threadsafe(loop.stop)
+            if thread is not None:
+                thread.join(timeout=5)
+
+    # --- Crawl ---
+    async def _crawl(self, url: str) -> str:
+        session_id = await self._sessions.get()
+        try:
+            config = CrawlerRunConfig(
+                session_id=session_id,
+                page_timeout=int(self.page_timeout * 1000),
+                cache_mode=CacheMode.BYPASS,
+            )
+            try:
+                result = await self._crawler.arun(url=url, config=config)
+            except Exception:
+                # Page de la session dans un état inconnu : on la recrée au prochain appel
+                try:
+                    await self._crawler.crawler_strategy.kill_session(session_id)
+                except Exception:
+                    pass
+                raise
+        finally:
+            self._sessions.put_nowait(session_id)
+
+        if not result.success:
+            raise RuntimeError(result.error_message or "crawl failed")
+        return result.markdown.fit_markdown or result.markdown.raw_markdown
+
+    def crawl(self, url: str) -> str:
+        """Version bloquante, utilisable depuis n'importe quel thread."""
+        with span("crawl4ai.crawl", KIND_CLIENT, url=url):
+            self._ensure_started()
+            future = asyncio.run_coroutine_threadsafe(self._crawl(url), self._loop)
+            # Marge au-delà du timeout de page pour l'attente d'une session libre
+            try:
+                return future.result(timeout=self.page_timeout * 4)
+            except concurrent.futures.TimeoutError:
+                # Sinon le crawl continue sur la boucle du pool et garde sa session
+                future.cancel()
+                raise
+
+    async def acrawl(self, url: str) -> str:
+        """Version async, utilisable depuis n'importe quelle boucle d'événements."""
+        with span("crawl4ai.crawl", KIND_CLIENT, url=url):
+            if self._crawler is None:
+                await asyncio.to_thread(self._ensure_started)
+            future = asyncio.run_coroutine_threadsafe(self._crawl(url), self._loop)
+            return await asyncio.wrap_future(future)
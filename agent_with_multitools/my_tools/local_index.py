@@ -0,0 +1,204 @@
+# src/my_tools/local_index.py
+
+"""
+Index vectoriel local pour le RAG, sans réseau.
+
+Fichiers d'un index (dans un dossier) :
+- manifest.json   : dimension, nombre de vecteurs, type de stockage, modèle d'embedding
+- vectors.f32     : matrice float32 (lignes normalisées) mappée en mémoire
+  ou vectors.i8 + scales.f32 : version quantifiée int8 (une échelle par ligne)
+- metadata.jsonl  : texte et métadonnées de chaque ligne, dans le même ordre
+
+Construction :
+    python -m my_tools.local_index <dossier_de_documents> [--out DIR] [--int8]
+"""
+
+import argparse
+import json
+import os
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+MANIFEST = "manifest.json"
+METADATA = "metadata.jsonl"
+FLOAT_VECTORS = "vectors.f32"
+INT8_VECTORS = "vectors.i8"
+INT8_SCALES = "scales.f32"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class LocalVectorStore(VectorStore):
+    """Recherche top-k par similarité cosinus, vectorisée sur une matrice mappée en mémoire."""
+
+    def __init__(self, path: str, embedding: Embeddings):
+        self.path = path
+        self.embedding = embedding
+
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        shape = (self.manifest["count"], self.manifest["dim"])
+
+        self.quantized = self.manifest["dtype"] == "int8"
+        if self.quantized:
+            self._matrix = np.memmap(os.path.join(path, INT8_VECTORS), dtype=np.int8, mode="r", shape=shape)
+            self._scales = np.fromfile(os.path.join(path, INT8_SCALES), dtype=np.float32)
+        else:
+            self._matrix = np.memmap(os.path.join(path, FLOAT_VECTORS), dtype=np.float32, mode="r", shape=shape)
+            self._scales = None
+
+        with open(os.path.join(path, METADATA), encoding="utf-8") as f:
+            self._records = [json.loads(line) for line in f]
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    # --- Recherche ---
+    def _scores(self, vector: List[float]) -> np.ndarray:
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)  # Hors place : le vecteur de l'appelant reste intact
+        scores = self._matrix @ query
+        if self.quantized:
+            # v ≈ q * scale / 127 : on applique l'échelle de chaque ligne au produit scalaire
+            scores = scores * self._scales / 127.0
+        return scores
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        count = len(self._records)
+        if count == 0:
+            return []
+        k = min(k, count)
+        scores = self._scores(embedding)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(page_content=self._records[i]["text"], metadata=self._records[i].get("metadata", {})), float(scores[i]))
+            for i in top
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        # Seul l'embedding de la requête est réseau ; la recherche locale prend quelques ms
+        return self.similarity_search_by_vector_with_score(await self.embedding.aembed_query(query), k)
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in await self.asimilarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Les scores sont déjà des similarités cosinus
+        return lambda score: score
+
+    # --- Construction ---
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("LocalVectorStore is read-only; rebuild it with LocalVectorStore.build().")
+
+    @classmethod
+    def build(
+        cls,
+        path: str,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        quantize: bool = False,
+        batch_size: int = 256,
+        embedding_model: Optional[str] = None,
+    ) -> "LocalVectorStore":
+        os.makedirs(path, exist_ok=True)
+        metadatas = metadatas or [{} for _ in texts]
+
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            vectors.extend(embedding.embed_documents(texts[start:start + batch_size]))
+        matrix = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1))
+
+        if quantize:
+            scales = np.abs(matrix).max(axis=1)
+            scales[scales == 0] = 1.0
+            quantized = np.round(matrix / scales[:, None] * 127).astype(np.int8)
+            quantized.tofile(os.path.join(path, INT8_VECTORS))
+            scales.astype(np.float32).tofile(os.path.join(path, INT8_SCALES))
+        else:
+            matrix.tofile(os.path.join(path, FLOAT_VECTORS))
+
+        with open(os.path.join(path, METADATA), "w", encoding="utf-8") as f:
+            for text, metadata in zip(texts, metadatas):
+                f.write(json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False) + "\n")
+
+        with open(os.path.join(path, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": int(matrix.shape[1]),
+                "count": len(texts),
+                "dtype": "int8" if quantize else "float32",
+                "embedding_model": embedding_model,
+            }, f, indent=2)
+
+        return cls(path, embedding)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        path: Optional[str] = None,
+        quantize: bool = False,
+        **kwargs: Any,
+    ) -> "LocalVectorStore":
+        if path is None:
+            raise ValueError("LocalVectorStore.from_texts requires a target `path`.")
+        return cls.build(path, texts, embedding, metadatas=metadatas, quantize=quantize)
+
+
+# --- Construction en ligne de commande ---
+def _load_documents(source_dir: str) -> Tuple[List[str], List[dict]]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    texts, metadatas = [], []
+    for root, _, files in os.walk(source_dir):
+        for name in sorted(files):
+            if not name.endswith((".txt", ".md")):
+                continue
+            file_path = os.path.join(root, name)
+            with open(file_path, encoding="utf-8") as f:
+                for i, chunk in enumerate(splitter.split_text(f.read())):
+                    texts.append(chunk)
+                    metadatas.append({"source": os.path.relpath(file_path, source_dir), "chunk": i})
+    return texts, metadatas
+
+
+if __name__ == "__main__":
+    from utils.config import load_env, get_rag_local_index_dir
+    from utils.embedding_cache import get_cached_embeddings
+
+    load_env()
+    parser = argparse.ArgumentParser(description="Build a local RAG index from .txt/.md files.")
+    parser.add_argument("source", help="Directory containing the documents to index")
+    parser.add_argument("--out", default=get_rag_local_index_dir(), help="Index directory")
+    parser.add_argument("--int8", action="store_true", help="Store int8-quantized vectors")
+    parser.add_argument("--model", default="text-embedding-3-small", help="Embedding model")
+    args = parser.parse_args()
+
+    texts, metadatas = _load_documents(args.source)
+    store = LocalVectorStore.build(
+        args.out, texts, get_cached_embeddings(args.model),
+        metadatas=metadatas, quantize=args.int8, embedding_model=args.model,
+    )
+    print(f"✅ Indexed {len(texts)} chunks into {args.out} ({store.manifest['dtype']})")
@@ -3,54 +3,83 @@
 from langchain.tools import BaseTool
 from typing import Type
 from pydantic import BaseModel, Field
-from langchain_community.embeddings import OpenAIEmbeddings
 #from langchain_community.vectorstores import Pinecone as LangChainPinecone
-from langchain_community.chat_models import ChatOpenAI
 from langchain.chains import RetrievalQA
 #from pinecone import Pinecone
 import os
+import threading
 from dotenv import load_dotenv
 
 from pinecone import Pinecone
 from langchain_pinecone import PineconeVectorStore
 
-from utils.config import load_env, get_pinecone_key, get_pinecone_index_name
+from my_tools.local_index import LocalVectorStore
+from utils.config import load_env, get_pinecone_key, get_pinecone_index_name, get_rag_backend, get_rag_local_index_dir
+from utils.embedding_cache import get_cached_embeddings
+from utils.model_routing import get_chat_model
 
 
-# Input schema
-class RAGInput(BaseModel):
-    query: str = Field(..., description="The user's question")
+load_env()
 
-class RAGTool(BaseTool):
-    name: str = "rag_tool"
-    description: str = "Query the Pinecone index using semantic search"
-    args_schema: Type[BaseModel] = RAGInput
+# Objets coûteux (clients Pinecone/OpenAI, vector store, chaîne QA) construits
+# une seule fois par processus puis réutilisés : les pools HTTP restent ouverts.
+_qa_chain = None
+_qa_chain_lock = threading.Lock()
 
-    def _run(self, query: str) -> str:
-        load_env()
 
-        # Load API keys and config
-        api_key = get_pinecone_key()
-        index_name = get_pinecone_index_name()
+def _build_vectorstore(embedding):
+    # Backend choisi par configuration : RAG_BACKEND=pinecone (défaut) ou local
+    if get_rag_backend() == "local":
+        return LocalVectorStore(get_rag_local_index_dir(), embedding)
+
+    # Load API keys and config
+    api_key = get_pinecone_key()
+    index_name = get_pinecone_index_name()
+
+    # Pinecone client (SDK v3)
+    pc = Pinecone(api_key=api_key)
+    index = pc.Index(index_name)
+
+    # LangChain wrapper over Pinecone
+    #vectorstore = LangChainPinecone(index, embedding.embed_query, text_key="text")
+    return PineconeVectorStore(index=index, embedding=embedding, text_key="text")
+
 
-        # Pinecone client (SDK v3)
-        pc = Pinecone(api_key=api_key)
-        index = pc.Index(index_name)
+def _build_qa_chain() -> RetrievalQA:
+    # Embeddings must match the ones used to index (cache LRU + disque devant le modèle)
+    embedding = get_cached_embeddings("text-embedding-3-small")
 
-        # Embeddings must match the ones used to index
-        embedding = OpenAIEmbeddings(model="text-embedding-3-small")
+    retriever = _build_vectorstore(embedding).as_retriever()
 
-        # LangChain wrapper over Pinecone
-        #vectorstore = LangChainPinecone(index, embedding.embed_query, text_key="text")
-        vectorstore = PineconeVectorStore(index=index, embedding=embedding, text_key="text")
+    # RAG chain (MODEL_TIER_RAG, niveau rapide par défaut)
+    llm = get_chat_model("rag")
+    return RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
 
-        retriever = vectorstore.as_retriever()
 
-        # RAG chain
-        llm = ChatOpenAI()
-        qa_chain = RetrievalQA.from_chain_type(llm=llm, retriever=retriever)
+def get_qa_chain() -> RetrievalQA:
+    """Chaîne RAG partagée (thread-safe, initialisée au premier appel)."""
+    global _qa_chain
+    if _qa_chain is None:
+        with _qa_chain_lock:
+            if _qa_chain is None:
+                _qa_chain = _build_qa_chain()
+    return _qa_chain
 
-        return qa_chain.run(query)
 
-    def _arun(self, query: str) -> str:
-        raise NotImplementedError("Async not supported.")
+# Input schema
+class RAGInput(BaseModel):
+    query: str = Field(..., description="The user's question")
+
+class RAGTool(BaseTool):
+    name: str = "rag_tool"
+    description: str = "Query the knowledge-base index (Pinecone or local) using semantic search"
+    args_schema: Type[BaseModel] = RAGInput
+
+    def _run(self, query: str) -> str:
+        result = get_qa_chain().invoke({"query": query})
+        return result["result"]
+
+    async def _arun(self, query: str) -> str:
+        # Embedding et génération en async natif ; la recherche Pinecone passe par l'executor par défaut
+        result = await get_qa_chain().ainvoke({"query": query})
+        return result["result"]
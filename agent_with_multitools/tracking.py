@@ -1,19 +1,53 @@
 # tracking.py
+#
+# Suivi des outils par requête : chaque requête a son propre ToolTracker, porté par une
+# variable de contexte (contextvars). Les tâches asyncio et les threads lancés pendant la
+# requête héritent du même tracker, deux requêtes concurrentes ne se mélangent donc plus.
+
+import contextvars
+import functools
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.tracing import span, KIND_CLIENT
+
+
+@dataclass
+class ToolCall:
+    name: str
+    seconds: float
+    payload_bytes: int
+    ok: bool
+    error: Optional[str] = None
+
 
 class ToolTracker:
     def __init__(self):
         self.tools_used = []  # liste de noms
         self.tool_results = {}  # mapping nom -> résultat (optionnel)
+        self.calls = []  # un ToolCall par appel (latence, taille, succès)
 
     def add_tool(self, tool_name, result=None):
         if tool_name and tool_name not in self.tools_used:
             self.tools_used.append(tool_name)
         if result:
             self.tool_results[tool_name] = result
+        # L'appel en cours (s'il est suivi par track_tool) a fourni un résultat exploitable
+        status = _call_status.get()
+        if status is not None:
+            status["ok"] = True
+
+    def record_call(self, call: ToolCall):
+        self.calls.append(call)
 
     def get_tools(self):
         return self.tools_used
 
+    def get_calls(self):
+        return self.calls
+
     def get_tools_string(self, contributing_only=False, answer=None):
         if not self.tools_used:
             return "Aucun"
@@ -37,6 +71,57 @@ class ToolTracker:
     def reset(self):
         self.tools_used = []
         self.tool_results = {}
+        self.calls = []
+
+
+# --- Tracker de la requête en cours ---
+_current_tracker: contextvars.ContextVar[Optional[ToolTracker]] = contextvars.ContextVar("tool_tracker", default=None)
+# Statut de l'appel d'outil en cours (propre à chaque tâche asyncio)
+_call_status: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("tool_call_status", default=None)
+
+
+def get_tracker() -> ToolTracker:
+    """Tracker de la requête en cours. Hors de track_request, un tracker jetable (rien n'est partagé)."""
+    tracker = _current_tracker.get()
+    return tracker if tracker is not None else ToolTracker()
+
+
+@contextmanager
+def track_request(tracker: Optional[ToolTracker] = None):
+    """Ouvre une portée de suivi : tous les outils appelés dans ce contexte écrivent dans le même tracker."""
+    tracker = tracker or ToolTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def track_tool(tool_name: str):
+    """
+    Décorateur d'outil async : enregistre latence, taille du résultat et succès dans le
+    tracker de la requête. Un appel réussit s'il a appelé add_tool (résultat exploitable).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            status = {"ok": False}
+            token = _call_status.set(status)
+            start = time.perf_counter()
+            with span(f"tool.{tool_name}", KIND_CLIENT, tool=tool_name) as current:
+                try:
+                    result = await func(*args, **kwargs)
+                except Exception as e:
+                    get_tracker().record_call(ToolCall(tool_name, time.perf_counter() - start, 0, False, str(e)))
+                    raise
+                finally:
+                    _call_status.reset(token)
 
-# Instance singleton
-tracker = ToolTracker()
\ No newline at end of file
+                payload = len(str(result).encode("utf-8")) if result is not None else 0
+                error = None if status["ok"] else str(result)[:200]
+                get_tracker().record_call(ToolCall(tool_name, time.perf_counter() - start, payload, status["ok"], error))
+                if current is not None:
+                    current.set(payload_bytes=payload, ok=status["ok"])
+            return result
+        return wrapper
+    return decorator
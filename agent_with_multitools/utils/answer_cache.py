@@ -0,0 +1,119 @@
+# utils/answer_cache.py
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+from utils.config import (
+    get_answer_cache_max_entries, get_answer_cache_threshold, get_answer_cache_ttl, get_answer_cache_fresh_ttl,
+)
+
+# Outils dont les résultats vieillissent vite (actualités, scores, pages web)
+FRESH_TOOLS = {"tavily_search", "crawl4ai_search"}
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    tools: List[str]
+    similarity: float = 1.0
+
+
+class SemanticAnswerCache:
+    """
+    Réponses passées de l'agent, retrouvées par similarité cosinus de la question.
+    Les vecteurs (normalisés, float32) sont rangés dans une matrice préallouée :
+    une recherche = un produit matrice-vecteur. TTL par entrée ; au-delà de max_entries,
+    l'entrée expirée (ou à défaut la moins récemment utilisée) est remplacée.
+    """
+
+    def __init__(self, max_entries: int = 1000, threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim), alloué au premier ajout
+        self._entries: List[Optional[CachedAnswer]] = [None] * max_entries
+        self._expires_at = np.zeros(max_entries)  # 0 = emplacement libre
+        self._used_at = np.zeros(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def lookup(self, vector) -> Optional[CachedAnswer]:
+        now = time.time()
+        with self._lock:
+            live = self._expires_at > now
+            if self._vectors is None or not live.any():
+                self.misses += 1
+                return None
+            similarities = np.where(live, self._vectors @ self._unit(vector), -1.0)
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+            self._used_at[best] = now
+            self.hits += 1
+            entry = self._entries[best]
+            return CachedAnswer(entry.question, entry.answer, list(entry.tools), float(similarities[best]))
+
+    def add(self, question: str, vector, answer: str, tools: List[str], ttl: float) -> None:
+        if ttl <= 0:
+            return
+        now = time.time()
+        unit = self._unit(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, unit.shape[0]), dtype=np.float32)
+            expired = np.flatnonzero(self._expires_at <= now)
+            # Emplacement libre ou expiré, sinon le moins récemment utilisé
+            slot = int(expired[0]) if expired.size else int(np.argmin(self._used_at))
+            self._vectors[slot] = unit
+            self._entries[slot] = CachedAnswer(question, answer, list(tools))
+            self._expires_at[slot] = now + ttl
+            self._used_at[slot] = now
+
+    def __len__(self) -> int:
+        with self._lock:
+            return int((self._expires_at > time.time()).sum())
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = [None] * self.max_entries
+            self._expires_at[:] = 0
+            self._used_at[:] = 0
+            self.hits = 0
+            self.misses = 0
+
+
+def answer_ttl(tools: List[str]) -> float:
+    """TTL d'une réponse : plus court si elle repose sur le web (Tavily, crawl)."""
+    if FRESH_TOOLS.intersection(tools):
+        return get_answer_cache_fresh_ttl()
+    return get_answer_cache_ttl()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Cache partagé par toutes les conversations du processus (None si ANSWER_CACHE_MAX_ENTRIES=0)."""
+    global _cache
+    if get_answer_cache_max_entries() <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache(get_answer_cache_max_entries(), get_answer_cache_threshold())
+    return _cache
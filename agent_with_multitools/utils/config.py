@@ -20,3 +20,172 @@ def get_pinecone_env():
 
 def get_pinecone_index_name():
     return os.getenv("PINECONE_INDEX_NAME")
+
+# --- Caches locaux ---
+def get_cache_dir():
+    # Par défaut : .cache/ à la racine du projet
+    default_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '.cache'))
+    return os.getenv("CACHE_DIR", default_dir)
+
+def get_search_cache_ttl():
+    # Durée de vie (secondes) d'un résultat Tavily en cache
+    return float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+
+def get_search_cache_max_entries():
+    return int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+def get_embedding_cache_memory_size():
+    # Nombre d'embeddings gardés en mémoire (LRU)
+    return int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))
+
+def get_embedding_cache_max_entries():
+    return int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "100000"))
+
+# TTL (secondes) par défaut des réponses LLM en cache, par agent (absent = pas de cache)
+LLM_CACHE_DEFAULT_TTLS = {
+    "query_agent": 7 * 24 * 3600,
+    "search_agent": 30 * 24 * 3600,
+    "followup_agent": 24 * 3600,
+    "synthesis_agent": 24 * 3600,
+}
+
+def get_llm_cache_ttl(role: str):
+    # TTL des réponses LLM en cache : LLM_CACHE_TTL_<AGENT> sinon LLM_CACHE_TTL sinon défaut ; 0 = pas de cache.
+    # LLM_CACHE_TTL ne s'applique qu'aux agents de LLM_CACHE_DEFAULT_TTLS : les autres (agent, rag, memory)
+    # restent sans cache tant que LLM_CACHE_TTL_<ROLE> n'est pas défini.
+    if role in LLM_CACHE_DEFAULT_TTLS:
+        default = os.getenv("LLM_CACHE_TTL", str(LLM_CACHE_DEFAULT_TTLS[role]))
+    else:
+        default = "0"
+    return float(os.getenv(f"LLM_CACHE_TTL_{role.upper()}", default))
+
+def get_llm_cache_max_entries():
+    return int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+
+# --- Model routing ---
+# Niveau de modèle par défaut de chaque rôle d'agent
+DEFAULT_ROLE_TIERS = {
+    "query_agent": "flagship",
+    "search_agent": "fast",
+    "followup_agent": "fast",
+    "synthesis_agent": "flagship",
+    "agent": "flagship",
+    "rag": "fast",
+    "memory": "fast",
+}
+DEFAULT_TIER_MODELS = {"flagship": "gpt-4o", "fast": "gpt-4o-mini"}
+
+def get_role_tier(role: str):
+    # Niveau du rôle : MODEL_TIER_<ROLE> (flagship, fast, ou directement un nom de modèle)
+    return os.getenv(f"MODEL_TIER_{role.upper()}", DEFAULT_ROLE_TIERS.get(role, "flagship"))
+
+def get_model_for_tier(tier: str):
+    # Modèle d'un niveau : MODEL_<TIER> ; un niveau inconnu est pris comme nom de modèle
+    return os.getenv(f"MODEL_{tier.upper()}", DEFAULT_TIER_MODELS.get(tier, tier))
+
+def get_latency_budget(role: str):
+    # Budget (secondes) d'un appel avant repli sur le niveau rapide : LATENCY_BUDGET_<ROLE> sinon LATENCY_BUDGET (0 = pas de repli)
+    default = os.getenv("LATENCY_BUDGET", "0")
+    return float(os.getenv(f"LATENCY_BUDGET_{role.upper()}", default))
+
+# --- OpenAI clients (utils/llm_factory.py) ---
+# Limites OpenAI par défaut d'un modèle (requêtes et tokens par minute)
+DEFAULT_OPENAI_LIMITS = {
+    "gpt-4o": (500, 30000),
+    "gpt-4o-mini": (500, 200000),
+    "text-embedding-3-small": (3000, 1000000),
+}
+
+def _model_env(prefix: str, model: str):
+    return os.getenv(f"{prefix}_{model.upper().replace('-', '_').replace('.', '_')}")
+
+def get_openai_rpm(model: str):
+    # Requêtes/minute : OPENAI_RPM_<MODELE> (ex. OPENAI_RPM_GPT_4O) sinon OPENAI_RPM
+    default = DEFAULT_OPENAI_LIMITS.get(model, (500, 30000))[0]
+    return float(_model_env("OPENAI_RPM", model) or os.getenv("OPENAI_RPM", str(default)))
+
+def get_openai_tpm(model: str):
+    # Tokens/minute (prompt estimé + sortie maximale) : OPENAI_TPM_<MODELE> sinon OPENAI_TPM
+    default = DEFAULT_OPENAI_LIMITS.get(model, (500, 30000))[1]
+    return float(_model_env("OPENAI_TPM", model) or os.getenv("OPENAI_TPM", str(default)))
+
+def get_llm_pool_size():
+    # Connexions HTTP keep-alive partagées par tous les clients OpenAI
+    return int(os.getenv("LLM_POOL_SIZE", "50"))
+
+def get_llm_keepalive():
+    # Durée (secondes) de vie d'une connexion inactive
+    return float(os.getenv("LLM_KEEPALIVE", "30"))
+
+def get_llm_max_retries():
+    # Nouveaux essais sur 429 / 5xx / erreur réseau
+    return int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+def get_llm_retry_base():
+    # Backoff : attente aléatoire dans [0, LLM_RETRY_BASE * 2^essai], plafonnée à LLM_RETRY_MAX
+    return float(os.getenv("LLM_RETRY_BASE", "1"))
+
+def get_llm_retry_max():
+    return float(os.getenv("LLM_RETRY_MAX", "30"))
+
+# --- RAG ---
+def get_rag_backend():
+    # "pinecone" (index distant) ou "local" (index mappé en mémoire, hors ligne)
+    return os.getenv("RAG_BACKEND", "pinecone").lower()
+
+def get_rag_local_index_dir():
+    return os.getenv("RAG_LOCAL_INDEX_DIR", os.path.join(get_cache_dir(), "rag_index"))
+
+# --- Crawl4AI ---
+def get_crawler_contexts():
+    # Nombre de pages navigateur réutilisées en parallèle
+    return int(os.getenv("CRAWLER_CONTEXTS", "2"))
+
+def get_crawler_page_timeout():
+    # Timeout (secondes) du chargement d'une page
+    return float(os.getenv("CRAWLER_PAGE_TIMEOUT", "30"))
+
+# --- Agent loop ---
+def get_agent_max_steps():
+    # Nombre max d'allers-retours LLM -> outils avant de forcer une réponse finale
+    return int(os.getenv("AGENT_MAX_STEPS", "6"))
+
+def get_tool_timeout(tool_name: str):
+    # Timeout (secondes) d'un appel d'outil : TOOL_TIMEOUT_<NOM> sinon TOOL_TIMEOUT
+    default = os.getenv("TOOL_TIMEOUT", "20")
+    return float(os.getenv(f"TOOL_TIMEOUT_{tool_name.upper()}", default))
+
+# --- Conversation memory ---
+def get_memory_max_tokens():
+    # Budget (tokens) de l'historique envoyé au LLM : résumé + derniers tours
+    return int(os.getenv("MEMORY_MAX_TOKENS", "3000"))
+
+def get_memory_keep_turns():
+    # Nombre de derniers tours (question + réponse) toujours gardés mot pour mot
+    return int(os.getenv("MEMORY_KEEP_TURNS", "4"))
+
+# --- Semantic answer cache ---
+def get_answer_cache_max_entries():
+    # Nombre max de réponses gardées en mémoire (0 = cache désactivé)
+    return int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+def get_answer_cache_threshold():
+    # Similarité cosinus minimale entre deux questions pour réutiliser une réponse
+    return float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+
+def get_answer_cache_ttl():
+    # Durée de vie (secondes) d'une réponse issue de Wikipedia, Arxiv ou du RAG
+    return float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+
+def get_answer_cache_fresh_ttl():
+    # Durée de vie (secondes) d'une réponse qui s'appuie sur le web (Tavily, crawl)
+    return float(os.getenv("ANSWER_CACHE_FRESH_TTL", "3600"))
+
+# --- Tracing ---
+def get_tracing_enabled():
+    # Spans des nœuds, appels LLM, outils et caches (0 pour désactiver)
+    return os.getenv("TRACING", "1").lower() not in ("0", "false", "no")
+
+def get_trace_file():
+    # Fichier JSONL des spans (une ligne par span, format JSON OTLP)
+    return os.getenv("TRACE_FILE", os.path.join(get_cache_dir(), "traces.jsonl"))
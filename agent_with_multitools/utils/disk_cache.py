@@ -0,0 +1,132 @@
+# utils/disk_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from utils.tracing import span
+
+_MISS = object()
+
+
+def normalize_query(query: str) -> str:
+    """Normalise une requête (casse et espaces) pour qu'elle serve de clé de cache."""
+    return " ".join(query.lower().split())
+
+
+def make_key(*parts: Any) -> str:
+    """Clé stable (sha256) construite à partir de valeurs JSON-sérialisables."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    Cache clé/valeur persistant sur SQLite.
+
+    - TTL par entrée (ttl=None : pas d'expiration)
+    - Éviction LRU au-delà de max_entries
+    - Compteurs hits / misses pour le suivi
+    Utilisable depuis plusieurs threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        table: str = "cache",
+        ttl: Optional[float] = None,
+        max_entries: int = 10000,
+        dumps: Callable[[Any], Any] = json.dumps,
+        loads: Callable[[Any], Any] = json.loads,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._dumps = dumps
+        self._loads = loads
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value BLOB, expires_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with span("cache.get", cache=self.table) as current:
+            value = self._get(key, _MISS)
+            if current is not None:
+                current.set(hit=value is not _MISS)
+        return default if value is _MISS else value
+
+    def _get(self, key: str, default: Any) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            value, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return default
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return self._loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl else None
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, self._dumps(value), expires_at, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        # Supprime les entrées les moins récemment utilisées au-delà de max_entries
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count}
+
+    def clear(self, prefix: Optional[str] = None) -> None:
+        """Vide la table, ou seulement les clés qui commencent par prefix."""
+        with self._lock:
+            if prefix is None:
+                self._conn.execute(f"DELETE FROM {self.table}")
+                self.hits = 0
+                self.misses = 0
+            else:
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+                )
+            self._conn.commit()
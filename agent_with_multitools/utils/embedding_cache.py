@@ -0,0 +1,131 @@
+# utils/embedding_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.config import get_cache_dir, get_embedding_cache_memory_size, get_embedding_cache_max_entries
+from utils.disk_cache import DiskCache, make_key, normalize_query
+from utils.llm_factory import create_embeddings
+
+
+def _dump_vector(vector) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def _load_vector(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Cache devant un modèle d'embedding : LRU en mémoire, puis stockage disque
+    (vecteurs float32 compacts). Clé : nom du modèle + texte normalisé.
+    Les textes absents du cache sont envoyés en une seule requête batch.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str, memory_size: int = 2048, store: Optional[DiskCache] = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.memory_size = memory_size
+        self.store = store
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, text: str) -> str:
+        return make_key("embedding", self.model_name, normalize_query(text))
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                return vector
+        if self.store is not None:
+            vector = self.store.get(key)
+            if vector is not None:
+                self._remember(key, vector)
+        return vector
+
+    def _split(self, texts: List[str]):
+        # Retourne les vecteurs connus et, pour les manquants, un texte par clé
+        keys = [self._key(t) for t in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vector = self._lookup(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+        return keys, found, missing
+
+    def _store(self, found: Dict[str, np.ndarray], missing: Dict[str, str], vectors: List[List[float]]) -> None:
+        for key, vector in zip(missing, vectors):
+            array = np.asarray(vector, dtype=np.float32)
+            found[key] = array
+            self._remember(key, array)
+            if self.store is not None:
+                self.store.set(key, array)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """Embeddings sous forme de matrice float32 (une ligne par texte)."""
+        keys, found, missing = self._split(texts)
+        if missing:
+            self._store(found, missing, self.embeddings.embed_documents(list(missing.values())))
+        return np.vstack([found[k] for k in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+    async def aembed_array(self, texts: List[str]) -> np.ndarray:
+        keys, found, missing = self._split(texts)
+        if missing:
+            self._store(found, missing, await self.embeddings.aembed_documents(list(missing.values())))
+        return np.vstack([found[k] for k in keys]) if keys else np.empty((0, 0), dtype=np.float32)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return (await self.aembed_array(texts)).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_array([text]))[0].tolist()
+
+
+_instances: Dict[str, CachedEmbeddings] = {}
+_instances_lock = threading.Lock()
+
+
+def get_cached_embeddings(model: str = "text-embedding-3-small") -> CachedEmbeddings:
+    """Embeddings OpenAI mis en cache, une instance partagée par modèle."""
+    with _instances_lock:
+        if model not in _instances:
+            store = DiskCache(
+                path=os.path.join(get_cache_dir(), "embedding_cache.sqlite"),
+                table="embeddings",
+                max_entries=get_embedding_cache_max_entries(),
+                dumps=_dump_vector,
+                loads=_load_vector,
+            )
+            _instances[model] = CachedEmbeddings(
+                create_embeddings(model),
+                model_name=model,
+                memory_size=get_embedding_cache_memory_size(),
+                store=store,
+            )
+        return _instances[model]
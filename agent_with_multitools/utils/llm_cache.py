@@ -0,0 +1,106 @@
+# utils/llm_cache.py
+
+import hashlib
+import os
+import threading
+import uuid
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import Generation
+
+from utils.config import get_cache_dir, get_llm_cache_ttl, get_llm_cache_max_entries
+from utils.disk_cache import DiskCache, make_key
+
+_store = None
+_store_lock = threading.Lock()
+_caches: Dict[str, "DiskLLMCache"] = {}
+_caches_lock = threading.Lock()
+
+
+def get_llm_store() -> DiskCache:
+    """Stockage SQLite commun à tous les agents (éviction LRU au-delà de LLM_CACHE_MAX_ENTRIES)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DiskCache(
+                    path=os.path.join(get_cache_dir(), "llm_cache.sqlite"),
+                    table="llm_responses",
+                    max_entries=get_llm_cache_max_entries(),
+                )
+    return _store
+
+
+class DiskLLMCache(BaseCache):
+    """
+    Cache de réponses LangChain (paramètre cache= de ChatOpenAI), une instance par agent.
+    Clé : rôle + modèle et paramètres (llm_string, outils liés compris) + hash de la liste
+    de messages complète, préfixée par le rôle. Chaque agent a son TTL ; le stockage est
+    partagé, clear() ne supprime que les entrées de l'agent.
+    Les réponses relues sont marquées response_metadata["cache_hit"] (coût nul au suivi).
+    """
+
+    def __init__(self, role: str, ttl: float, store: Optional[DiskCache] = None):
+        self.role = role
+        self.ttl = ttl
+        self._store = store
+
+    @property
+    def store(self) -> DiskCache:
+        return self._store or get_llm_store()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return self._prefix + make_key("llm", self.role, llm_string, prompt_hash)
+
+    @property
+    def _prefix(self) -> str:
+        return f"{self.role}:"
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        cached = self.store.get(self._key(prompt, llm_string))
+        if cached is None:
+            return None
+        try:
+            generations = [loads(g) for g in cached]
+        except Exception:
+            return None  # Entrée illisible (version de LangChain différente) : nouvel appel
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                message.response_metadata["cache_hit"] = True
+                # Nouvel id : deux réponses relues du même cache ne doivent pas se remplacer (add_messages)
+                message.id = f"run-{uuid.uuid4()}"
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        self.store.set(self._key(prompt, llm_string), [dumps(g) for g in return_val], ttl=self.ttl)
+
+    def clear(self, **kwargs: Any) -> None:
+        self.store.clear(prefix=self._prefix)
+
+
+def get_llm_cache(role: str) -> Optional[DiskLLMCache]:
+    """
+    Cache de l'agent role (query_agent, search_agent, ...), ou None si LLM_CACHE_TTL_<ROLE>
+    vaut 0 : l'agent n'utilise alors pas de cache.
+    """
+    ttl = get_llm_cache_ttl(role)
+    if ttl <= 0:
+        return None
+    with _caches_lock:
+        if role not in _caches:
+            _caches[role] = DiskLLMCache(role, ttl)
+    return _caches[role]
+
+
+def is_cache_hit(response) -> bool:
+    """True si le LLMResult (on_llm_end) a été servi par DiskLLMCache."""
+    for generations in response.generations:
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None and message.response_metadata.get("cache_hit"):
+                return True
+    return False
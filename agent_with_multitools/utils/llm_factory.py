@@ -0,0 +1,354 @@
+# utils/llm_factory.py
+#
+# Fabrique unique des clients OpenAI (chat et embeddings) du processus.
+# Tous les clients partagent :
+#   - un pool de connexions keep-alive (sync, et async dans une boucle de fond dédiée :
+#     les connexions survivent aux boucles asyncio.run créées à chaque question Streamlit)
+#   - un limiteur à seaux de jetons par modèle, en requêtes/minute et en tokens/minute
+#     (taille du prompt estimée à partir du corps de la requête)
+#   - des retries avec backoff exponentiel à jitter complet sur 429 / 5xx / erreurs réseau
+# Les retries du SDK OpenAI sont désactivés (max_retries=0) : ils ne se cumulent pas.
+
+import asyncio
+import atexit
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from utils.config import (
+    get_llm_pool_size, get_llm_keepalive, get_openai_rpm, get_openai_tpm,
+    get_llm_max_retries, get_llm_retry_base, get_llm_retry_max,
+)
+from utils.tracing import span
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+# En-tête interne : "0" = un seul essai pour cette requête (jamais envoyé à OpenAI)
+RETRY_HEADER = "x-llm-retries"
+
+
+# --- Limiteur RPM / TPM ---
+class TokenBucket:
+    """
+    Seau de jetons rechargé en continu (capacité = débit par minute). Une réservation
+    peut rendre le solde négatif : l'appelant attend le temps de rembourser la dette,
+    les demandes sont donc servies dans l'ordre d'arrivée.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = max(1.0, per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Réserve amount jetons ; retourne l'attente (secondes) avant de pouvoir les utiliser."""
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= min(amount, self.capacity)
+            return max(0.0, -self.level / self.rate)
+
+
+class RateLimiter:
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def reserve(self, tokens: int) -> float:
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """Limiteur partagé par tous les clients d'un même modèle (limites OpenAI par modèle)."""
+    with _limiters_lock:
+        if model not in _limiters:
+            _limiters[model] = RateLimiter(get_openai_rpm(model), get_openai_tpm(model))
+        return _limiters[model]
+
+
+def _text_size(value) -> int:
+    # Caractères de texte (contenus, arguments d'appels d'outils, schémas) d'une valeur JSON
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, list):
+        return sum(_text_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_text_size(v) for v in value.values())
+    return 0
+
+
+def estimate_request(request: httpx.Request) -> tuple:
+    """(modèle, tokens estimés) d'une requête OpenAI : ~4 caractères par token + tokens de sortie réservés."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except (ValueError, httpx.RequestNotRead):
+        return "unknown", 1
+    prompt = _text_size(body.get("messages")) + _text_size(body.get("input")) + _text_size(body.get("tools"))
+    completion = body.get("max_completion_tokens") or body.get("max_tokens") or 0
+    return body.get("model", "unknown"), prompt // 4 + completion + 1
+
+
+# --- Signal de surcharge ---
+# Observateur du contexte courant (ex. limiteur de concurrence AIMD de DeepResearch) :
+# prévenu à chaque 429 ou timeout, même quand le retry suivant réussit.
+_throttle_observer: ContextVar[Optional[Callable[[], None]]] = ContextVar("throttle_observer", default=None)
+
+
+@contextmanager
+def on_throttle(callback: Callable[[], None]):
+    token = _throttle_observer.set(callback)
+    try:
+        yield
+    finally:
+        _throttle_observer.reset(token)
+
+
+def _notify_throttle() -> None:
+    callback = _throttle_observer.get()
+    if callback is not None:
+        callback()
+
+
+# --- Transports httpx ---
+def _backoff(attempt: int, response: Optional[httpx.Response]) -> float:
+    # Délai imposé par le serveur si présent, sinon jitter complet : uniforme dans [0, base * 2^attempt]
+    if response is not None:
+        try:
+            if "retry-after-ms" in response.headers:
+                return min(get_llm_retry_max(), float(response.headers["retry-after-ms"]) / 1000)
+            if "retry-after" in response.headers:
+                return min(get_llm_retry_max(), float(response.headers["retry-after"]))
+        except ValueError:
+            pass
+    return random.uniform(0, min(get_llm_retry_max(), get_llm_retry_base() * 2 ** attempt))
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=get_llm_pool_size(),
+        max_keepalive_connections=get_llm_pool_size(),
+        keepalive_expiry=get_llm_keepalive(),
+    )
+
+
+class _LoopBoundStream(httpx.AsyncByteStream):
+    """Corps de réponse lu sur la boucle du pool, consommé depuis la boucle de l'appelant."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, loop: asyncio.AbstractEventLoop):
+        self._stream = stream
+        self._loop = loop
+
+    async def __aiter__(self):
+        chunks = self._stream.__aiter__()
+        while True:
+            chunk = await _run_on(self._loop, _next_chunk(chunks))
+            if chunk is None:
+                return
+            yield chunk
+
+    async def aclose(self) -> None:
+        await _run_on(self._loop, self._stream.aclose())
+
+
+async def _next_chunk(chunks):
+    try:
+        return await chunks.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _run_on(loop: asyncio.AbstractEventLoop, coroutine):
+    # Exécute coroutine sur loop ; l'annulation de l'appelant annule aussi la tâche distante
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, loop))
+
+
+class SharedTransport(httpx.BaseTransport, httpx.AsyncBaseTransport):
+    """
+    Un seul pool keep-alive par mode (sync, async) pour tout le processus, précédé du
+    limiteur RPM/TPM du modèle et suivi des retries. La politique de retry est lue sur
+    chaque requête (en-tête RETRY_HEADER, posé par client_kwargs(retries=False) : un seul
+    essai pour les appels soumis à un budget de latence), pas sur le transport.
+
+    Le pool async vit dans une boucle dédiée (thread de fond, comme CrawlerPool) :
+    asyncio.run de Streamlit crée une nouvelle boucle à chaque question et un pool lié à
+    la boucle de l'appelant perdrait ses connexions à chaque fois. Les requêtes et la
+    lecture des réponses sont relayées vers cette boucle ; elle est fermée à la sortie.
+    """
+
+    def __init__(self, sync_pool: Optional[httpx.BaseTransport] = None, async_pool: Optional[httpx.AsyncBaseTransport] = None):
+        self._sync = sync_pool
+        self._async = async_pool
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _sync_pool(self) -> httpx.BaseTransport:
+        with self._lock:
+            if self._sync is None:
+                self._sync = httpx.HTTPTransport(limits=_limits())
+            return self._sync
+
+    def _pool_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._lock:
+            if self._loop is None:
+                if self._async is None:
+                    self._async = httpx.AsyncHTTPTransport(limits=_limits())
+                loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=loop.run_forever, name="llm-http-pool", daemon=True)
+                self._thread.start()
+                # Boucle publiée en dernier : le chemin rapide trouve le pool prêt
+                self._loop = loop
+                atexit.register(self.shutdown)
+            return self._loop
+
+    @staticmethod
+    def _attempts(request: httpx.Request) -> int:
+        retries = request.headers.pop(RETRY_HEADER, "1") != "0"
+        return 1 + (get_llm_max_retries() if retries else 0)
+
+    async def _send_async(self, request: httpx.Request) -> httpx.Response:
+        loop = self._pool_loop()
+        response = await _run_on(loop, self._async.handle_async_request(request))
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_LoopBoundStream(response.stream, loop),
+            extensions=response.extensions,
+        )
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        model, tokens = estimate_request(request)
+        attempts = self._attempts(request)
+        for attempt in range(attempts):
+            wait = get_rate_limiter(model).reserve(tokens)
+            if wait:
+                with span("ratelimit.wait", model=model, wait_ms=round(wait * 1000)):
+                    time.sleep(wait)
+            try:
+                response = self._sync_pool().handle_request(request)
+            except httpx.TransportError as e:
+                if isinstance(e, httpx.TimeoutException):
+                    _notify_throttle()
+                if attempt + 1 >= attempts:
+                    raise
+                time.sleep(_backoff(attempt, None))
+                continue
+            if response.status_code == 429:
+                _notify_throttle()
+            if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                return response
+            delay = _backoff(attempt, response)
+            response.close()
+            time.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # Corps en mémoire : la requête peut être relayée vers la boucle du pool et rejouée
+        await request.aread()
+        model, tokens = estimate_request(request)
+        attempts = self._attempts(request)
+        for attempt in range(attempts):
+            wait = get_rate_limiter(model).reserve(tokens)
+            if wait:
+                with span("ratelimit.wait", model=model, wait_ms=round(wait * 1000)):
+                    await asyncio.sleep(wait)
+            try:
+                response = await self._send_async(request)
+            except httpx.TransportError as e:
+                if isinstance(e, httpx.TimeoutException):
+                    _notify_throttle()
+                if attempt + 1 >= attempts:
+                    raise
+                await asyncio.sleep(_backoff(attempt, None))
+                continue
+            if response.status_code == 429:
+                _notify_throttle()
+            if response.status_code not in RETRY_STATUSES or attempt + 1 >= attempts:
+                return response
+            delay = _backoff(attempt, response)
+            await response.aclose()
+            await asyncio.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    # Pool partagé : fermer un client httpx (ou un client OpenAI) ne doit pas le couper aux autres
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        """Ferme les deux pools et la boucle de fond (appelé automatiquement à la sortie)."""
+        with self._lock:
+            sync_pool, self._sync = self._sync, None
+            loop, thread, self._loop, self._thread = self._loop, self._thread, None, None
+            async_pool = self._async
+            if loop is not None:
+                self._async = None
+        if sync_pool is not None:
+            sync_pool.close()
+        if loop is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(async_pool.aclose(), loop).result(timeout=5)
+            except Exception:
+                pass
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+
+
+# --- Clients partagés ---
+_clients: Optional[tuple] = None
+_clients_lock = threading.Lock()
+
+
+def get_http_clients() -> tuple:
+    """(httpx.Client, httpx.AsyncClient) partagés par tous les clients OpenAI du processus (un seul transport)."""
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            transport = SharedTransport()
+            # Timeouts par requête fixés par le SDK OpenAI (ou timeout= du modèle)
+            timeout = httpx.Timeout(600.0, connect=5.0)
+            _clients = (
+                httpx.Client(transport=transport, timeout=timeout),
+                httpx.AsyncClient(transport=transport, timeout=timeout),
+            )
+        return _clients
+
+
+def client_kwargs(retries: bool = True, default_headers: Optional[dict] = None) -> dict:
+    http_client, http_async_client = get_http_clients()
+    headers = dict(default_headers or {})
+    if not retries:
+        headers[RETRY_HEADER] = "0"  # Lu et retiré par SharedTransport
+    return {
+        "http_client": http_client,
+        "http_async_client": http_async_client,
+        "default_headers": headers or None,
+        "max_retries": 0,
+    }
+
+
+def create_chat_model(retries: bool = True, **kwargs) -> ChatOpenAI:
+    """ChatOpenAI branché sur le pool, le limiteur et les retries partagés."""
+    return ChatOpenAI(**client_kwargs(retries, kwargs.pop("default_headers", None)), **kwargs)
+
+
+def create_embeddings(model: str, **kwargs) -> OpenAIEmbeddings:
+    return OpenAIEmbeddings(model=model, **client_kwargs(), **kwargs)
@@ -0,0 +1,54 @@
+# utils/model_routing.py
+#
+# Choix du modèle par rôle d'agent. Chaque rôle a un niveau (tier) ; chaque niveau
+# correspond à un modèle. Avec un budget de latence, un appel trop lent (ou refusé
+# pour rate limit) est relancé sur le niveau rapide.
+
+import openai
+from langchain_openai import ChatOpenAI
+
+from utils.config import get_model_for_tier, get_role_tier, get_latency_budget
+from utils.llm_cache import get_llm_cache
+from utils.llm_factory import create_chat_model
+
+FAST_TIER = "fast"
+
+# Erreurs qui déclenchent le repli : budget dépassé, connexion, surcharge
+FALLBACK_ERRORS = (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)
+
+
+def _chat_model(role: str, tier: str, retries: bool = True, **kwargs) -> ChatOpenAI:
+    # Client HTTP, limiteur RPM/TPM et retries partagés (utils/llm_factory.py)
+    return create_chat_model(
+        retries=retries,
+        model=get_model_for_tier(tier),
+        cache=get_llm_cache(role),
+        # Rôle et niveau transmis aux callbacks (TokenCostTracker : coût et latence par rôle)
+        metadata={"role": role, "tier": tier},
+        **kwargs,
+    )
+
+
+def get_role_model(role: str) -> str:
+    """Modèle principal du rôle (ex. encodage tiktoken pour compter les tokens de son prompt)."""
+    return get_model_for_tier(get_role_tier(role))
+
+
+def get_chat_model(role: str, **kwargs):
+    """
+    Modèle de chat du rôle (query_agent, search_agent, followup_agent, synthesis_agent, agent, rag, memory).
+    Sans budget de latence : un ChatOpenAI. Avec LATENCY_BUDGET_<ROLE> : le modèle du rôle,
+    limité à ce budget et sans retries, avec le niveau rapide en repli (with_fallbacks).
+    Le budget est un timeout httpx par lecture : en flux, il borne le délai avant le premier
+    token (et chaque pause du flux), pas la durée totale. Un repli en cours de flux repart de
+    zéro : l'appelant qui affiche les tokens doit effacer le texte reçu (voir synthesis_agent).
+    """
+    tier = get_role_tier(role)
+    budget = get_latency_budget(role)
+    if budget <= 0 or tier == FAST_TIER:
+        return _chat_model(role, tier, **kwargs)
+
+    primary = _chat_model(role, tier, retries=False, timeout=budget, **kwargs)
+    fallback = _chat_model(role, FAST_TIER, **kwargs)
+    # bind_tools, cache, ... restent accessibles : RunnableWithFallbacks les délègue aux deux modèles
+    return primary.with_fallbacks([fallback], exceptions_to_handle=FALLBACK_ERRORS)
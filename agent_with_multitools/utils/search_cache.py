@@ -0,0 +1,58 @@
+# utils/search_cache.py
+
+import os
+import threading
+from typing import Any, Awaitable, Callable
+
+from utils.config import get_cache_dir, get_search_cache_ttl, get_search_cache_max_entries
+from utils.disk_cache import DiskCache, make_key, normalize_query
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache() -> DiskCache:
+    """Cache Tavily partagé par le coordinator DeepResearch et l'agent multi-outils."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(
+                    path=os.path.join(get_cache_dir(), "search_cache.sqlite"),
+                    table="search_results",
+                    ttl=get_search_cache_ttl(),
+                    max_entries=get_search_cache_max_entries(),
+                )
+    return _cache
+
+
+def cached_search(provider: str, query: str, params: dict, fetch: Callable[[], Any]) -> Any:
+    """
+    Retourne le résultat en cache pour (provider, requête normalisée, paramètres),
+    sinon appelle fetch() et met en cache tout résultat non vide.
+    """
+    cache = get_search_cache()
+    key = make_key(provider, normalize_query(query), params)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = fetch()
+    # Les erreurs (chaînes) et les résultats vides ne sont pas mis en cache
+    if isinstance(result, (list, dict)) and result:
+        cache.set(key, result)
+    return result
+
+
+async def acached_search(provider: str, query: str, params: dict, fetch: Callable[[], Awaitable[Any]]) -> Any:
+    """Version async de cached_search : fetch est une coroutine (la lecture SQLite locale reste synchrone)."""
+    cache = get_search_cache()
+    key = make_key(provider, normalize_query(query), params)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = await fetch()
+    if isinstance(result, (list, dict)) and result:
+        cache.set(key, result)
+    return result
@@ -0,0 +1,35 @@
+# utils/trace_view.py
+#
+# Vue waterfall d'une trace dans Streamlit (une barre par span, décalée depuis le début du run).
+
+import streamlit as st
+
+from utils.tracing import Trace, waterfall_rows
+
+
+def render_waterfall(run: Trace, container=None) -> None:
+    container = container or st.sidebar
+    rows = waterfall_rows(run)
+    if not rows:
+        return
+
+    import altair as alt
+    import pandas as pd
+
+    data = pd.DataFrame(rows)
+    data["order"] = range(len(data))
+    chart = (
+        alt.Chart(data)
+        .mark_bar()
+        .encode(
+            x=alt.X("start_ms:Q", title="ms"),
+            x2="end_ms:Q",
+            y=alt.Y("span:N", sort=alt.EncodingSortField(field="order"), title=None),
+            color=alt.Color("status:N", scale=alt.Scale(domain=["ok", "error"], range=["#4c78a8", "#e45756"]), legend=None),
+            tooltip=["span", "duration_ms", "start_ms", "details"],
+        )
+        .properties(height=max(120, 18 * len(data)))
+    )
+    with container.expander(f"🧭 Trace waterfall ({len(rows)} spans)"):
+        st.altair_chart(chart, use_container_width=True)
+        st.caption(f"trace id: {run.trace_id}")
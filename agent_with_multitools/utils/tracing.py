@@ -0,0 +1,310 @@
+# utils/tracing.py
+#
+# Traces structurées (spans imbriqués) pour les graphes, les appels LLM, les outils et les caches.
+# Un span n'est enregistré qu'à l'intérieur d'une trace ouverte avec trace() ; en dehors,
+# span() ne coûte presque rien. À la fin de la trace, les spans sont ajoutés au fichier
+# TRACE_FILE, un span par ligne au format JSON OTLP (traceId, spanId, parentSpanId, ...).
+
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from utils.config import get_tracing_enabled, get_trace_file
+
+# Codes de statut OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+# Types de span OTLP
+KIND_INTERNAL = 1
+KIND_CLIENT = 3
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: int = KIND_INTERNAL
+    start_ns: int = 0
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    status: int = STATUS_OK
+    status_message: str = ""
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set(self, **attributes) -> None:
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def fail(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"[:500]
+
+    def to_otlp(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Trace:
+    """Spans terminés d'une exécution (une question, un run DeepResearch)."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+_export_lock = threading.Lock()
+
+
+def _new_span(name: str, kind: int, parent: Optional[Span], run: Trace, attributes: dict) -> Span:
+    span = Span(
+        trace_id=run.trace_id,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        name=name,
+        kind=kind,
+        start_ns=time.time_ns(),
+    )
+    span.set(**attributes)
+    return span
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, kind: int = KIND_INTERNAL, **attributes):
+    """Span enfant du span courant. Sans trace active, ne fait rien (yield None)."""
+    run = _current_trace.get()
+    if run is None:
+        yield None
+        return
+
+    current = _new_span(name, kind, _current_span.get(), run, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        run.add(current)
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """
+    Ouvre une trace et son span racine ; les spans sont exportés à la sortie.
+    Dans une trace déjà ouverte, crée seulement un span enfant (la trace englobante exporte).
+    """
+    outer = _current_trace.get()
+    if outer is not None:
+        with span(name, **attributes):
+            yield outer
+        return
+
+    if not get_tracing_enabled():
+        yield None
+        return
+
+    run = Trace(name)
+    token = _current_trace.set(run)
+    try:
+        with span(name, **attributes):
+            yield run
+    finally:
+        _current_trace.reset(token)
+        export(run)
+
+
+def export(run: Trace) -> None:
+    path = get_trace_file()
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        lines = "".join(json.dumps(s.to_otlp(), ensure_ascii=False) + "\n" for s in run.spans)
+        with _export_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(lines)
+    except OSError:
+        pass  # Le tracing ne doit jamais faire échouer une requête
+
+
+def traced_node(name: str):
+    """Décorateur de nœud LangGraph (sync ou async) : un span "node.<name>" par exécution."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(f"node.{name}", node=name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(f"node.{name}", node=name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Spans des appels LLM (modèle, tokens, time to first token) et des retrievers (Pinecone,
+    index local), rattachés au span courant au moment de l'appel. À passer dans les callbacks.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._spans: Dict[UUID, tuple] = {}  # run_id -> (span, trace)
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID, name: str, **attributes) -> None:
+        run = _current_trace.get()
+        if run is None:
+            return
+        current = _new_span(name, KIND_CLIENT, _current_span.get(), run, attributes)
+        with self._lock:
+            self._spans[run_id] = (current, run)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes) -> None:
+        with self._lock:
+            entry = self._spans.pop(run_id, None)
+        if entry is None:
+            return
+        current, run = entry
+        current.set(**attributes)
+        if error is not None:
+            current.fail(error)
+        current.end_ns = time.time_ns()
+        run.add(current)
+
+    @staticmethod
+    def _model_name(serialized: Optional[dict], kwargs: dict) -> Optional[str]:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name")
+        if not model and serialized:
+            model = (serialized.get("kwargs") or {}).get("model_name")
+        return model
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs) -> None:
+        self._start(run_id, "llm.chat", model=self._model_name(serialized, kwargs))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs) -> None:
+        self._start(run_id, "llm.completion", model=self._model_name(serialized, kwargs))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs) -> None:
+        with self._lock:
+            entry = self._spans.get(run_id)
+        if entry and "ttft_ms" not in entry[0].attributes:
+            entry[0].set(ttft_ms=round((time.time_ns() - entry[0].start_ns) / 1e6, 1))
+
+    def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        # Import local : llm_cache -> disk_cache -> tracing
+        from utils.llm_cache import is_cache_hit
+        if is_cache_hit(response):
+            self._end(run_id, cache_hit=True, prompt_tokens=0, completion_tokens=0)
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        if prompt_tokens is None:
+            # Réponses streamées : l'usage est porté par le message
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    if metadata:
+                        prompt_tokens = (prompt_tokens or 0) + metadata.get("input_tokens", 0)
+                        completion_tokens = (completion_tokens or 0) + metadata.get("output_tokens", 0)
+        self._end(run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error=error)
+
+    # --- Retrievers (Pinecone / index local) ---
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs) -> None:
+        name = (serialized or {}).get("name") or "retriever"
+        self._start(run_id, "retriever.search", retriever=name, query=query[:200])
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs) -> None:
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs) -> None:
+        self._end(run_id, error=error)
+
+
+tracing_handler = TracingCallbackHandler()
+
+
+def waterfall_rows(run: Trace) -> List[dict]:
+    """Spans à plat pour une vue waterfall : décalage et durée (ms) depuis le début de la trace, profondeur."""
+    if not run or not run.spans:
+        return []
+    by_id = {s.span_id: s for s in run.spans}
+    origin = min(s.start_ns for s in run.spans)
+
+    def depth(s: Span) -> int:
+        d = 0
+        while s.parent_id in by_id:
+            s = by_id[s.parent_id]
+            d += 1
+        return d
+
+    rows = []
+    for i, s in enumerate(sorted(run.spans, key=lambda s: s.start_ns), 1):
+        d = depth(s)
+        rows.append({
+            # Libellé unique (un même nom de span apparaît plusieurs fois)
+            "span": f"{i:>3}. {'· ' * d}{s.name}",
+            "depth": d,
+            "start_ms": round((s.start_ns - origin) / 1e6, 1),
+            "end_ms": round((s.end_ns - origin) / 1e6, 1),
+            "duration_ms": round(s.duration_ms, 1),
+            "status": "error" if s.status == STATUS_ERROR else "ok",
+            "details": ", ".join(f"{k}={v}" for k, v in s.attributes.items()),
+        })
+    return rows
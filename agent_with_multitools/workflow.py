@@ -2,87 +2,172 @@
 workflow.py
 
 Contient la logique de workflow entre l'utilisateur, les tools, et l'agent.
+
+Boucle d'agent native LangGraph :
+    answer_cache (question déjà répondue ? -> finalize)
+    -> tools_call_llm (LLM lié aux outils) -> tools (tous les appels demandés, en parallèle sur la boucle async)
+    -> tools_call_llm ... -> finalize (réponse + outils utilisés) -> END
+Chaque étape est chronométrée dans state["step_timings"].
 """
 
-from langchain_core.messages.human import HumanMessage
-from typing import TypedDict
+import operator
+import time
+from typing import Optional, TypedDict
 from typing_extensions import Annotated
-from langchain_core.messages import AnyMessage, AIMessage  # Human or AI message
+from langchain_core.messages import AnyMessage, AIMessage, HumanMessage, SystemMessage  # Human or AI message
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph.message import add_messages  # Reducers in Langgraph
 
 # Construction du graph LangGraph
-from IPython.display import Image, display
 from langgraph.graph import StateGraph, START, END
 from langgraph.prebuilt import ToolNode # Node for the tools
 from langgraph.prebuilt import tools_condition # Condition for the tools
 
-from agents import agent_executor, tools   # Importation de l'agent et des outils
+from agents import llm, tools, SYSTEM_PROMPT   # Importation du LLM, des outils et du prompt
 
-from langchain_core.messages import HumanMessage
 from schemas import AgentResponse
 
-# Importation du tracker modifié
-from tracking import tracker
+# Tracker de la requête en cours (voir run_agent)
+from tracking import ToolTracker, get_tracker, track_request
+
+from utils.answer_cache import get_answer_cache, answer_ttl
+from utils.config import get_agent_max_steps
+from utils.embedding_cache import get_cached_embeddings
+from utils.tracing import span, traced_node, tracing_handler
 
 # Définition de l'état
 class State(TypedDict):
     messages: Annotated[list[AnyMessage], add_messages]
-    tool_attempts: list[str]  # Pour suivre les tentatives d'outils
-
-# Fonction qui appelle l'agent
-def tools_call_llm(state: State):
-    from schemas import AgentResponse
-    from langchain_core.messages import HumanMessage, AIMessage
-    from agents import agent_executor
-    from tracking import tracker
-
-    # Réinitialiser le tracker à chaque nouvelle requête
-    tracker.reset()
-    
-    # Récupérer tous les messages pour fournir un contexte à l'agent
-    all_messages = state["messages"]
-    
-    # Obtenir la dernière question de l'utilisateur (le dernier message humain)
-    last_human_message = None
-    for msg in reversed(all_messages):
-        if isinstance(msg, HumanMessage):
-            last_human_message = msg
-            break
-            
-    if last_human_message is None:
+    tool_attempts: Annotated[list[str], operator.add]  # Pour suivre les tentatives d'outils
+    step_timings: Annotated[list[dict], operator.add]  # {"step", "seconds", "tools"} par étape
+    summary: str  # Résumé glissant des tours anciens (memory.ConversationMemory)
+    answer_cache_hit: bool  # Réponse reprise du cache sémantique (la boucle d'outils est sautée)
+
+
+def _timing(step: str, start: float, **extra) -> list[dict]:
+    return [{"step": step, "seconds": round(time.perf_counter() - start, 3), **extra}]
+
+
+# --- Cache sémantique des réponses ---
+ANSWER_EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+def _standalone_question(state: State) -> Optional[str]:
+    # Seules les questions sans historique passent par le cache : la réponse ne dépend que de la question
+    humans = [m for m in state["messages"] if isinstance(m, HumanMessage)]
+    if state.get("summary") or len(humans) != 1 or state["messages"][0] is not humans[0]:
+        return None
+    return humans[0].content if humans[0].content.strip() else None
+
+
+async def _question_vector(question: str):
+    # Embedding en cache (LRU mémoire + disque) : le calcul de finalize ne refait pas d'appel
+    return (await get_cached_embeddings(ANSWER_EMBEDDING_MODEL).aembed_array([question]))[0]
+
+
+async def check_answer_cache(state: State):
+    start = time.perf_counter()
+    cache = get_answer_cache()
+    question = _standalone_question(state)
+    hit = None
+    if cache is not None and question:
+        with span("cache.get", cache="answers") as current:
+            try:
+                hit = cache.lookup(await _question_vector(question))
+            except Exception:
+                hit = None  # Embedding indisponible : réponse normale avec les outils
+            if current is not None:
+                current.set(hit=hit is not None, similarity=round(hit.similarity, 4) if hit else None)
+
+    if hit is None:
+        return {"answer_cache_hit": False, "step_timings": _timing("answer_cache", start)}
+
+    # Attribution d'origine : finalize lit les outils dans le tracker de la requête
+    for tool_name in hit.tools:
+        get_tracker().add_tool(tool_name)
+    return {
+        "messages": [AIMessage(content=hit.answer)],
+        "answer_cache_hit": True,
+        "step_timings": _timing("answer_cache", start),
+    }
+
+
+def route_after_cache(state: State) -> str:
+    return "finalize" if state.get("answer_cache_hit") else "tools_call_llm"
+
+
+async def _store_answer(state: State, answer: str) -> None:
+    cache = get_answer_cache()
+    question = _standalone_question(state)
+    tools_used = get_tracker().get_tools()
+    # Réponses sans outil (conversation, refus) : rien de vérifiable à réutiliser
+    if cache is None or not question or not tools_used or not answer:
+        return
+    try:
+        cache.add(question, await _question_vector(question), answer, tools_used, answer_ttl(tools_used))
+    except Exception:
+        pass  # Le cache ne doit jamais faire échouer une réponse
+
+
+llm_with_tools = llm.bind_tools(tools)
+# Outils déclarés mais interdits : l'historique peut contenir des appels d'outils
+llm_answer_only = llm.bind_tools(tools, tool_choice="none")
+tool_node = ToolNode(tools)
+
+
+# Fonction qui appelle le LLM (un seul aller-retour par étape)
+async def tools_call_llm(state: State):
+    start = time.perf_counter()
+    timings = state.get("step_timings", [])
+
+    if not any(isinstance(msg, HumanMessage) for msg in state["messages"]):
         # Cas improbable: pas de message humain trouvé
         return {
             "messages": [AIMessage(content="Je n'ai pas trouvé de question à répondre.")],
-            "tool_attempts": []
+            "step_timings": _timing("tools_call_llm", start),
         }
-    
-    human_input = last_human_message.content
-    
-    # Si c'est une nouvelle requête, réinitialiser les tentatives d'outils
-    if "tool_attempts" not in state:
-        state["tool_attempts"] = []
-    
-    # Convertir les messages en format compréhensible pour l'agent
-    chat_history = []
-    for msg in all_messages:
-        if isinstance(msg, HumanMessage):
-            chat_history.append({"role": "user", "content": msg.content})
-        elif isinstance(msg, AIMessage) or (hasattr(msg, "type") and msg.type == "ai"):
-            chat_history.append({"role": "assistant", "content": msg.content})
-    
-    # Appeler l'agent avec l'historique complet
-    result = agent_executor.invoke({
-        "input": human_input,
-        "chat_history": chat_history,  # Passer l'historique de conversation
-        "tool_attempts": state.get("tool_attempts", [])
-    })
-
-    answer = result["output"]
-    
+
+    # Au-delà de AGENT_MAX_STEPS étapes d'outils, le LLM doit répondre sans outils
+    tool_steps = sum(1 for t in timings if t["step"] == "tools")
+    model = llm_with_tools if tool_steps < get_agent_max_steps() else llm_answer_only
+
+    # Contexte : résumé des tours anciens, derniers tours, appels d'outils et résultats de cette question
+    system_prompt = SYSTEM_PROMPT
+    if state.get("summary"):
+        system_prompt += f"\nSUMMARY OF THE EARLIER CONVERSATION:\n{state['summary']}\n"
+    response = await model.ainvoke([SystemMessage(content=system_prompt)] + state["messages"])
+
+    return {
+        "messages": [response],
+        "step_timings": _timing("tools_call_llm", start),
+    }
+
+
+# Exécution de tous les appels d'outils demandés par le dernier message du LLM
+async def run_tools(state: State, config: RunnableConfig):
+    start = time.perf_counter()
+    requested = [call["name"] for call in state["messages"][-1].tool_calls]
+    # ToolNode lance les outils async avec asyncio.gather : durée = l'appel le plus lent
+    result = await tool_node.ainvoke(state, config)
+    return {
+        "messages": result["messages"],
+        "tool_attempts": requested,
+        "step_timings": _timing("tools", start, tools=requested),
+    }
+
+
+# Mise en forme de la réponse finale avec les outils ayant fourni un résultat
+async def finalize(state: State):
+    start = time.perf_counter()
+    last_message = state["messages"][-1]
+    answer = last_message.content
+
     # Récupérer tous les outils utilisés depuis le tracker
-    tools_used = tracker.get_tools_string()
+    tools_used = get_tracker().get_tools_string()
+
+    if not state.get("answer_cache_hit"):
+        await _store_answer(state, answer)
 
-    
     final_answer = f"🧠 **Response** : {answer}\n\n🔧 **Tools Used** : `{tools_used}`"
 
     agent_response = AgentResponse(
@@ -91,9 +176,10 @@ def tools_call_llm(state: State):
         confidence=1.0
     )
 
+    # Même id : le message brut du LLM est remplacé par la réponse formatée
     return {
-        "messages": [AIMessage(content=agent_response.answer)],
-        "tool_attempts": tracker.get_tools()  # Mettre à jour les tentatives d'outils
+        "messages": [AIMessage(content=agent_response.answer, id=last_message.id)],
+        "step_timings": _timing("finalize", start),
     }
 
 # Condition pour vérifier si on doit réessayer avec un autre outil
@@ -106,7 +192,7 @@ def should_retry_tool(state: State):
     last_message = state["messages"][-1].content.lower()
     tool_attempts = state.get("tool_attempts", [])
     available_tools = [t.name for t in tools]
-    
+
     # Check if there is a failure indication in the message
     failure_indicators = [
         "no result",
@@ -116,33 +202,55 @@ def should_retry_tool(state: State):
         "error while"
     ]
 
-    
+
     has_failure = any(indicator in last_message for indicator in failure_indicators)
-    has_remaining_tools = len(tool_attempts) < len(available_tools)
-    
+    has_remaining_tools = len(set(tool_attempts)) < len(available_tools)
+
     if has_failure and has_remaining_tools:
         return "retry_tool"
     return "continue"
 
-builder = StateGraph(State)
-builder.add_node("tools_call_llm", tools_call_llm)
-builder.add_node("tools", ToolNode(tools)) ## Call the tools
 
-# Edges
-builder.add_edge(START, "tools_call_llm")
-builder.add_conditional_edges("tools_call_llm", tools_condition)
-builder.add_edge("tools", "tools_call_llm")
-builder.add_edge("tools", END)
+def build_graph():
+    builder = StateGraph(State)
+    builder.add_node("answer_cache", traced_node("answer_cache")(check_answer_cache))
+    builder.add_node("tools_call_llm", traced_node("tools_call_llm")(tools_call_llm))
+    builder.add_node("tools", traced_node("tools")(run_tools)) ## Call the tools
+    builder.add_node("finalize", traced_node("finalize")(finalize))
+
+    # Edges
+    builder.add_edge(START, "answer_cache")
+    builder.add_conditional_edges("answer_cache", route_after_cache, {"tools_call_llm": "tools_call_llm", "finalize": "finalize"})
+    builder.add_conditional_edges("tools_call_llm", tools_condition, {"tools": "tools", END: "finalize"})
+    builder.add_edge("tools", "tools_call_llm")
+    builder.add_edge("finalize", END)
+
+    return builder.compile()
 
-graph = builder.compile()
+
+graph = build_graph()
+
+
+async def run_agent(messages: list[AnyMessage], summary: str = "") -> tuple[dict, ToolTracker]:
+    """
+    Répond à une question avec un tracker d'outils propre à cette requête :
+    plusieurs conversations peuvent être servies en parallèle par le même processus.
+    """
+    with track_request() as request_tracker:
+        # tracing_handler : spans des appels LLM et des recherches du retriever RAG
+        result = await graph.ainvoke(
+            {"messages": messages, "summary": summary},
+            config={"callbacks": [tracing_handler]},
+        )
+    return result, request_tracker
 
 '''
 # Invocation
-messages = graph.invoke({
-    "messages": HumanMessage(content="Hi my name is Salah and I wanted to know who won the last Premier League trophy in 2025")
-})
+messages, tool_tracker = asyncio.run(run_agent(
+    [HumanMessage(content="Hi my name is Salah and I wanted to know who won the last Premier League trophy in 2025")]
+))
 
 
 for m in messages["messages"]:
     m.pretty_print()
-'''
\ No newline at end of file
+'''
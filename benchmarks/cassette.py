@@ -0,0 +1,220 @@
+"""
+cassette.py
+
+Enregistrement / rejeu des interactions LLM et outils pour les benchmarks.
+
+- mode "record" : les appels passent par les vrais clients (OpenAI, Tavily, ...) ;
+  la réponse et sa latence mesurée sont écrites dans une nouvelle cassette (fichier JSON).
+- mode "replay" : aucune requête réseau ; la réponse enregistrée est rendue après
+  une latence synthétique (voir LatencyModel).
+
+Les clés sont un hash du type d'appel, du nom du stand-in et des arguments. Les
+numéros provisoires de citation ([Source N]) sont neutralisés : ils dépendent de
+l'ordre de complétion des résumés, pas du contenu.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict
+
+SOURCE_LABEL = re.compile(r"\bSource \d+\b")
+
+
+class CassetteMiss(KeyError):
+    """Appel absent de la cassette en mode replay (corpus ou prompts modifiés : ré-enregistrer)."""
+
+
+class LatencyModel:
+    """
+    Latence synthétique du rejeu, par type d'appel ("llm", "tool", "http", "embedding").
+    Spécification : "recorded" (latence mesurée), "none", "scale:<x>", "fixed:<ms>",
+    éventuellement par type : "llm=scale:0.5,tool=fixed:200" ("*" = défaut).
+    """
+
+    def __init__(self, spec: str = "recorded"):
+        self.rules: Dict[str, tuple] = {}
+        for item in filter(None, (part.strip() for part in spec.split(","))):
+            kind, _, rule = item.rpartition("=")
+            self.rules[kind or "*"] = self._parse(rule)
+        self.rules.setdefault("*", ("recorded", 1.0))
+
+    @staticmethod
+    def _parse(rule: str) -> tuple:
+        name, _, value = rule.partition(":")
+        if name in ("recorded", "none"):
+            return name, 1.0
+        if name in ("scale", "fixed"):
+            return name, float(value)
+        raise ValueError(f"Unknown latency rule: {rule!r}")
+
+    def seconds(self, kind: str, recorded: float) -> float:
+        name, value = self.rules.get(kind, self.rules["*"])
+        if name == "none":
+            return 0.0
+        if name == "scale":
+            return recorded * value
+        if name == "fixed":
+            return value / 1000
+        return recorded
+
+
+class Cassette:
+    def __init__(self, path: str, mode: str = "replay", latency: Optional[LatencyModel] = None):
+        if mode not in ("record", "replay"):
+            raise ValueError("mode must be 'record' or 'replay'")
+        self.path = path
+        self.mode = mode
+        self.latency = latency or LatencyModel()
+        self.entries: Dict[str, List[dict]] = {}
+        self._cursor: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        if mode == "replay":
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == "record"
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(SOURCE_LABEL.sub("Source #", raw).encode("utf-8")).hexdigest()
+
+    def put(self, key: str, payload: dict) -> None:
+        with self._lock:
+            self.entries.setdefault(key, []).append(payload)
+
+    def take(self, key: str, label: str) -> dict:
+        """Réponse suivante pour key (les appels identiques sont rejoués dans l'ordre d'enregistrement)."""
+        with self._lock:
+            recorded = self.entries.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recording for {label}")
+            index = self._cursor[key]
+            self._cursor[key] += 1
+        return recorded[index % len(recorded)]
+
+    def rewind(self) -> None:
+        with self._lock:
+            self._cursor.clear()
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+
+    # --- Appels génériques (outils, HTTP, embeddings) ---
+    async def acall(self, kind: str, name: str, args: list, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        key = self.key(kind, name, args)
+        if self.recording:
+            start = time.perf_counter()
+            result = await fetch()
+            self.put(key, {"result": result, "latency": time.perf_counter() - start})
+            return result
+        entry = self.take(key, f"{kind} {name}{args}")
+        await asyncio.sleep(self.latency.seconds(kind, entry["latency"]))
+        return entry["result"]
+
+    def call(self, kind: str, name: str, args: list, fetch: Callable[[], Any]) -> Any:
+        key = self.key(kind, name, args)
+        if self.recording:
+            start = time.perf_counter()
+            result = fetch()
+            self.put(key, {"result": result, "latency": time.perf_counter() - start})
+            return result
+        entry = self.take(key, f"{kind} {name}{args}")
+        time.sleep(self.latency.seconds(kind, entry["latency"]))
+        return entry["result"]
+
+
+def _message_key(message: BaseMessage) -> dict:
+    return {
+        "type": message.type,
+        "content": message.content,
+        "tool_calls": [(c["name"], c["args"]) for c in getattr(message, "tool_calls", None) or []],
+    }
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    Stand-in d'un modèle de chat. En enregistrement, délègue au modèle réel (inner : ChatOpenAI
+    ou modèle routé avec repli, voir utils.model_routing) et enregistre le message du modèle qui
+    a répondu ; en rejeu, rend ce message (contenu, appels d'outils, usage en tokens, modèle).
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    role: str
+    cassette: Any
+    inner: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools, *, tool_choice: Optional[str] = None, **kwargs):
+        # Même format que ChatOpenAI.bind_tools : les kwargs sont transmis tels quels au modèle réel
+        formatted = [convert_to_openai_tool(t) for t in tools]
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return self.bind(tools=formatted, **kwargs)
+
+    def _key(self, messages: List[BaseMessage], kwargs: dict) -> str:
+        tools = sorted(t["function"]["name"] for t in kwargs.get("tools") or [])
+        return self.cassette.key("llm", self.role, [_message_key(m) for m in messages], tools, kwargs.get("tool_choice"))
+
+    @staticmethod
+    def _chat_result(message: BaseMessage) -> ChatResult:
+        usage = getattr(message, "usage_metadata", None) or {}
+        llm_output = {
+            "token_usage": {
+                "prompt_tokens": usage.get("input_tokens", 0),
+                "completion_tokens": usage.get("output_tokens", 0),
+                "total_tokens": usage.get("total_tokens", 0),
+            },
+            "model_name": message.response_metadata.get("model_name", "cassette"),
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)], llm_output=llm_output)
+
+    def _result(self, entry: dict) -> ChatResult:
+        return self._chat_result(messages_from_dict([entry["message"]])[0])
+
+    def _record(self, key: str, message: BaseMessage, latency: float) -> ChatResult:
+        self.cassette.put(key, {"message": message_to_dict(message), "latency": latency})
+        return self._chat_result(message)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        kwargs.pop("stream", None)  # Appels ainvoke(stream=True) : réponse enregistrée complète
+        key = self._key(messages, kwargs)
+        if self.cassette.recording:
+            start = time.perf_counter()
+            # Sans callbacks : l'appel est déjà suivi (tracker, spans) au niveau du stand-in
+            message = self.inner.invoke(messages, config={"callbacks": []}, stop=stop, **kwargs)
+            return self._record(key, message, time.perf_counter() - start)
+        entry = self.cassette.take(key, f"llm {self.role}")
+        time.sleep(self.cassette.latency.seconds("llm", entry["latency"]))
+        return self._result(entry)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        kwargs.pop("stream", None)
+        key = self._key(messages, kwargs)
+        if self.cassette.recording:
+            start = time.perf_counter()
+            message = await self.inner.ainvoke(messages, config={"callbacks": []}, stop=stop, **kwargs)
+            return self._record(key, message, time.perf_counter() - start)
+        entry = self.cassette.take(key, f"llm {self.role}")
+        await asyncio.sleep(self.cassette.latency.seconds("llm", entry["latency"]))
+        return self._result(entry)
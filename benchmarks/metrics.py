@@ -0,0 +1,112 @@
+"""
+metrics.py
+
+Métriques d'un run calculées à partir des spans de sa trace (utils/tracing.py) :
+latence de bout en bout, temps par nœud, appels LLM et tokens, appels d'outils, caches.
+"""
+
+import json
+import math
+from collections import defaultdict
+from typing import Dict, List
+
+from utils.tracing import Trace, STATUS_ERROR
+
+
+def run_metrics(run: Trace) -> Dict[str, float]:
+    """Métriques à plat d'une trace (une question) : {"e2e_ms": ..., "node.search_ms": ..., ...}."""
+    spans = run.spans
+    root = next(s for s in spans if s.parent_id is None)
+    metrics = defaultdict(float)
+    metrics["e2e_ms"] = root.duration_ms
+    for s in spans:
+        if s.name.startswith("node."):
+            metrics[f"{s.name}_ms"] += s.duration_ms
+        elif s.name.startswith("llm."):
+            metrics["llm_calls"] += 1
+            metrics["llm_cache_hits"] += 1 if s.attributes.get("cache_hit") else 0
+            metrics["llm_ms"] += s.duration_ms
+            metrics["prompt_tokens"] += s.attributes.get("prompt_tokens") or 0
+            metrics["completion_tokens"] += s.attributes.get("completion_tokens") or 0
+        elif s.name.startswith("tool.") or s.name in ("tavily.search", "http.fetch"):
+            metrics["tool_calls"] += 1
+            metrics[f"{s.name}.calls"] += 1
+        elif s.name == "cache.get":
+            metrics["cache_hits" if s.attributes.get("hit") else "cache_misses"] += 1
+        if s.status == STATUS_ERROR:
+            metrics["errors"] += 1
+    return dict(metrics)
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def aggregate(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    """mean / p50 / p95 de chaque métrique (une métrique absente d'un run compte 0)."""
+    names = sorted({name for run in runs for name in run})
+    summary = {}
+    for name in names:
+        values = [run.get(name, 0.0) for run in runs]
+        summary[name] = {
+            "mean": round(sum(values) / len(values), 2),
+            "p50": round(percentile(values, 50), 2),
+            "p95": round(percentile(values, 95), 2),
+        }
+    return summary
+
+
+# Métriques comparées à la baseline (plus haut = moins bien)
+COMPARED = ("e2e_ms", "llm_calls", "prompt_tokens", "completion_tokens", "tool_calls")
+
+
+def compare(current: dict, baseline: dict, max_regression: float = 0.1) -> List[dict]:
+    """
+    Compare deux rapports (voir run.py) question par question sur la moyenne des métriques COMPARED.
+    Une régression est une hausse relative supérieure à max_regression (0.1 = +10 %).
+    """
+    rows = []
+    for graph, questions in current.get("results", {}).items():
+        for question_id, summary in questions.items():
+            before = baseline.get("results", {}).get(graph, {}).get(question_id)
+            if before is None:
+                continue
+            for name in COMPARED:
+                new = summary.get(name, {}).get("mean", 0.0)
+                old = before.get(name, {}).get("mean", 0.0)
+                change = (new - old) / old if old else (math.inf if new else 0.0)
+                rows.append({
+                    "graph": graph,
+                    "question": question_id,
+                    "metric": name,
+                    "baseline": old,
+                    "current": new,
+                    "change": change,
+                    "regression": change > max_regression,
+                })
+    return rows
+
+
+def format_table(rows: List[dict]) -> str:
+    lines = [f"{'question':<20} {'metric':<18} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for row in rows:
+        flag = "  ⚠️" if row["regression"] else ""
+        lines.append(
+            f"{row['question']:<20} {row['metric']:<18} {row['baseline']:>12.1f} "
+            f"{row['current']:>12.1f} {row['change']:>+8.1%}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def load_report(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_report(report: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,161 @@
+"""
+run.py
+
+Benchmark hors ligne des deux graphes (agent multi-outils et DeepResearch) sur un corpus fixe.
+
+    # 1. Enregistrer les cassettes (appels réels OpenAI / Tavily / Pinecone, une fois)
+    python -m benchmarks.run --graph all --mode record
+    # 2. Rejouer sans réseau, avec une latence synthétique, et comparer à une baseline
+    python -m benchmarks.run --graph all --repeat 5 --latency "llm=scale:1,tool=fixed:300" --save-baseline
+    python -m benchmarks.run --graph all --repeat 5 --baseline benchmarks/baseline.json
+
+Les métriques sont lues dans les spans de utils/tracing.py (voir metrics.py).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BENCH_DIR = os.path.join(ROOT, "benchmarks")
+
+
+def _prepare_env(mode: str) -> None:
+    # Mêmes chemins d'import que batch.py (utils = agent_with_multitools/utils)
+    for path in (ROOT, os.path.join(ROOT, "agent_with_multitools")):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    # Caches et traces isolés : un benchmark ne lit ni n'écrit les caches de l'application
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    os.environ["CACHE_DIR"] = os.path.join(workdir, "cache")
+    os.environ["TRACE_FILE"] = os.path.join(workdir, "traces.jsonl")
+    os.environ["TRACING"] = "1"
+    if mode == "replay":
+        # Les clients sont construits à l'import ; en rejeu aucune requête ne part
+        for key in ("OPENAI_API_KEY", "TAVILY_API_KEY", "PINECONE_API_KEY"):
+            os.environ.setdefault(key, "replay")
+
+
+def _reset_caches() -> None:
+    """Caches (recherche, résumés, réponses LLM, réponses de l'agent) vidés : chaque répétition part à froid, comme l'enregistrement."""
+    from utils.search_cache import get_search_cache
+    from utils.llm_cache import get_llm_store
+    from utils.answer_cache import get_answer_cache
+    from DeepResearch_HITL.utils.summary_cache import get_summary_cache
+
+    get_search_cache().clear()
+    get_summary_cache().clear()
+    get_llm_store().clear()
+    if get_answer_cache() is not None:
+        get_answer_cache().clear()
+
+
+async def _run_multitool(question: dict) -> None:
+    from workflow import run_agent
+    from langchain_core.messages import HumanMessage
+
+    await run_agent([HumanMessage(content=question["question"])])
+
+
+async def _run_deepresearch(question: dict) -> None:
+    from DeepResearch_HITL.engine import run_research
+
+    await run_research(question["question"], max_iterations=question.get("max_iterations", 2))
+
+
+RUNNERS = {"multitool": _run_multitool, "deepresearch": _run_deepresearch}
+
+
+async def bench_graph(graph: str, questions: list, cassette, repeat: int, warm_cache: bool) -> dict:
+    from utils.tracing import trace
+    from benchmarks.metrics import run_metrics, aggregate
+    from benchmarks.standins import patch_multitool, patch_deepresearch
+
+    patch = patch_multitool if graph == "multitool" else patch_deepresearch
+    results = {}
+    with patch(cassette):
+        for question in questions:
+            runs = []
+            for i in range(repeat):
+                if not warm_cache:
+                    _reset_caches()
+                cassette.rewind()
+                # Trace englobante : les traces ouvertes par le graphe deviennent des spans enfants
+                with trace(f"benchmark.{graph}", question=question["id"], repeat=i) as run:
+                    await RUNNERS[graph](question)
+                runs.append(run_metrics(run))
+                print(f"  {question['id']} #{i + 1}: {runs[-1]['e2e_ms']:.0f} ms, "
+                      f"{runs[-1].get('llm_calls', 0):.0f} LLM calls")
+            results[question["id"]] = aggregate(runs)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline record/replay benchmarks for both agent graphs")
+    parser.add_argument("--graph", choices=["multitool", "deepresearch", "all"], default="all")
+    parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--questions", default=os.path.join(BENCH_DIR, "questions.json"))
+    parser.add_argument("--cassettes", default=os.path.join(BENCH_DIR, "cassettes"))
+    parser.add_argument("--latency", default="recorded", help='ex. "recorded", "none", "scale:0.5", "llm=fixed:800,tool=scale:1"')
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--warm-cache", action="store_true", help="Ne pas vider les caches entre les répétitions")
+    parser.add_argument("--out", default=None, help="Rapport JSON (défaut : benchmarks/results/<horodatage>.json)")
+    parser.add_argument("--baseline", default=None, help="Rapport de référence à comparer")
+    parser.add_argument("--save-baseline", action="store_true", help="Écrit aussi le rapport dans benchmarks/baseline.json")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="Hausse relative tolérée (0.1 = +10 %%)")
+    args = parser.parse_args(argv)
+
+    _prepare_env(args.mode)
+    from benchmarks.cassette import Cassette, LatencyModel
+    from benchmarks.metrics import compare, format_table, load_report, save_report
+
+    with open(args.questions, encoding="utf-8") as f:
+        corpus = json.load(f)
+    graphs = ["multitool", "deepresearch"] if args.graph == "all" else [args.graph]
+    # En enregistrement, une seule passe (les appels identiques sont ajoutés à la suite)
+    repeat = 1 if args.mode == "record" else max(1, args.repeat)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": args.mode,
+        "latency": args.latency,
+        "repeat": repeat,
+        "results": {},
+    }
+
+    async def bench_all():
+        # Une seule boucle pour tous les graphes : les clients async partagés y restent attachés
+        for graph in graphs:
+            print(f"▶ {graph} ({args.mode})")
+            cassette = Cassette(os.path.join(args.cassettes, f"{graph}.json"), args.mode, LatencyModel(args.latency))
+            try:
+                report["results"][graph] = await bench_graph(graph, corpus[graph], cassette, repeat, args.warm_cache)
+            finally:
+                if cassette.recording:
+                    cassette.save()
+
+    asyncio.run(bench_all())
+
+    out = args.out or os.path.join(BENCH_DIR, "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    save_report(report, out)
+    print(f"📄 Report: {out}")
+    if args.save_baseline:
+        save_report(report, os.path.join(BENCH_DIR, "baseline.json"))
+
+    if args.baseline:
+        rows = compare(report, load_report(args.baseline), args.max_regression)
+        print(format_table(rows))
+        regressions = [row for row in rows if row["regression"]]
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) above {args.max_regression:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
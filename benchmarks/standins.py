@@ -0,0 +1,165 @@
+"""
+standins.py
+
+Stand-ins locaux branchés à la place des clients réseau des deux graphes.
+Les graphes utilisent des objets de module (llm, tavily, crawler_pool, ...) : on remplace
+ces attributs le temps du benchmark puis on les restaure (patch_multitool / patch_deepresearch).
+"""
+
+import importlib
+from contextlib import contextmanager
+from typing import List
+
+import numpy as np
+
+from benchmarks.cassette import Cassette, CassetteChatModel
+
+
+class Patcher:
+    """Remplace des attributs de module et mémorise les originaux pour les restaurer."""
+
+    def __init__(self):
+        self._saved = []
+
+    def set(self, module, name: str, value) -> None:
+        self._saved.append((module, name, getattr(module, name)))
+        setattr(module, name, value)
+
+    def restore(self) -> None:
+        while self._saved:
+            module, name, value = self._saved.pop()
+            setattr(module, name, value)
+
+
+# --- Outils de l'agent multi-outils ---
+class ThreadToolStandIn:
+    """wikipedia / arxiv : wrappers synchrones appelés via asyncio.to_thread(tool.invoke, query)."""
+
+    def __init__(self, name: str, inner, cassette: Cassette):
+        self.name = name
+        self.inner = inner
+        self.cassette = cassette
+
+    def invoke(self, query: str) -> str:
+        return self.cassette.call("tool", self.name, [query], lambda: self.inner.invoke(query))
+
+
+class AsyncToolStandIn:
+    """tavily / rag_tool : outils LangChain appelés via await tool.ainvoke(query)."""
+
+    def __init__(self, name: str, inner, cassette: Cassette, copy: tuple = ()):
+        self.name = name
+        self.inner = inner
+        self.cassette = cassette
+        # Attributs lus par les outils (ex. tavily.max_results pour la clé du cache de recherche)
+        for key in copy:
+            setattr(self, key, getattr(inner, key))
+
+    async def ainvoke(self, query: str):
+        return await self.cassette.acall("tool", self.name, [query], lambda: self.inner.ainvoke(query))
+
+
+class CrawlerStandIn:
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.page_timeout = inner.page_timeout
+
+    async def acrawl(self, url: str) -> str:
+        return await self.cassette.acall("tool", "crawl4ai", [url], lambda: self.inner.acrawl(url))
+
+
+class EmbeddingsStandIn:
+    def __init__(self, model: str, factory, cassette: Cassette):
+        self.model = model
+        self.factory = factory
+        self.cassette = cassette
+
+    async def aembed_array(self, texts: List[str]) -> np.ndarray:
+        async def fetch():
+            return (await self.factory(self.model).aembed_array(texts)).tolist()
+        return np.asarray(await self.cassette.acall("embedding", self.model, texts, fetch), dtype=np.float32)
+
+
+@contextmanager
+def patch_multitool(cassette: Cassette):
+    import agents
+    import workflow
+
+    patcher = Patcher()
+    model = CassetteChatModel(
+        role="multitool", cassette=cassette, inner=agents.llm, cache=agents.llm.cache, metadata=agents.llm.metadata,
+    )
+    patcher.set(workflow, "llm_with_tools", model.bind_tools(agents.tools))
+    patcher.set(workflow, "llm_answer_only", model.bind_tools(agents.tools, tool_choice="none"))
+    patcher.set(agents, "wikipedia", ThreadToolStandIn("wikipedia", agents.wikipedia, cassette))
+    patcher.set(agents, "arxiv", ThreadToolStandIn("arxiv", agents.arxiv, cassette))
+    patcher.set(agents, "tavily", AsyncToolStandIn(
+        "tavily", agents.tavily, cassette, copy=("max_results", "search_depth"),
+    ))
+    patcher.set(agents, "rag_tool", AsyncToolStandIn("rag", agents.rag_tool, cassette))
+    patcher.set(agents, "crawler_pool", CrawlerStandIn(agents.crawler_pool, cassette))
+    embeddings = workflow.get_cached_embeddings
+    patcher.set(workflow, "get_cached_embeddings", lambda model: EmbeddingsStandIn(model, embeddings, cassette))
+    try:
+        yield
+    finally:
+        patcher.restore()
+
+
+# --- DeepResearch ---
+DEEPRESEARCH_AGENTS = ("query_agent", "search_agent", "followup_agent", "synthesis_agent")
+
+
+class TavilyClientStandIn:
+    def __init__(self, inner, cassette: Cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def search(self, query: str, **params) -> dict:
+        return self.cassette.call("http", "tavily", [query, params], lambda: self.inner.search(query=query, **params))
+
+
+class PageFetcherStandIn:
+    """Même interface que PageFetcher (context manager async + fetch_text)."""
+
+    def __init__(self, factory, cassette: Cassette):
+        self.factory = factory
+        self.cassette = cassette
+        self._fetcher = None
+
+    async def __aenter__(self) -> "PageFetcherStandIn":
+        if self.cassette.recording:
+            self._fetcher = await self.factory().__aenter__()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._fetcher is not None:
+            await self._fetcher.__aexit__(*exc)
+            self._fetcher = None
+
+    async def fetch_text(self, url: str):
+        return await self.cassette.acall("http", "fetch", [url], lambda: self._fetcher.fetch_text(url))
+
+
+@contextmanager
+def patch_deepresearch(cassette: Cassette):
+    from DeepResearch_HITL import coordinator
+    from DeepResearch_HITL.utils import query_dedup
+
+    patcher = Patcher()
+    for name in DEEPRESEARCH_AGENTS:
+        module = importlib.import_module(f"DeepResearch_HITL.research_agents.{name}")
+        # Même cache de réponses et même rôle (metadata) que l'agent réel : hits et coûts par rôle mesurés comme en production
+        patcher.set(module, "llm", CassetteChatModel(
+            role=name, cassette=cassette, inner=module.llm, cache=module.llm.cache, metadata=module.llm.metadata,
+        ))
+    patcher.set(coordinator, "tavily_client", TavilyClientStandIn(coordinator.tavily_client, cassette))
+    factory = coordinator.new_page_fetcher
+    patcher.set(coordinator, "new_page_fetcher", lambda: PageFetcherStandIn(factory, cassette))
+    embeddings = query_dedup.get_cached_embeddings
+    patcher.set(query_dedup, "get_cached_embeddings", lambda model: EmbeddingsStandIn(model, embeddings, cassette))
+    try:
+        yield
+    finally:
+        patcher.restore()
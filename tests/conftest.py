@@ -0,0 +1,15 @@
+# tests/conftest.py
+
+import os
+import sys
+
+# Mêmes chemins d'import que DeepResearch_HITL/batch.py : racine du projet + agent_with_multitools (pour `utils`)
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+for path in (ROOT, os.path.join(ROOT, "agent_with_multitools")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+# Pas de traces écrites pendant les tests
+os.environ.setdefault("TRACING", "0")
+# Les agents construisent leurs clients OpenAI à l'import ; aucun test n'appelle l'API
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,119 @@
+# tests/test_adaptive_limiter.py
+
+import asyncio
+
+import pytest
+
+from DeepResearch_HITL.utils.adaptive_limiter import AdaptiveLimiter, is_overload
+from utils.llm_factory import _notify_throttle
+
+
+def make_limiter(initial=2, min_limit=1, max_limit=4, target_latency=0.05):
+    return AdaptiveLimiter("test", initial, min_limit, max_limit, target_latency)
+
+
+async def run_jobs(limiter, count, delay=0.0, error=None):
+    async def job():
+        async with limiter.slot():
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+
+    return await asyncio.gather(*[job() for _ in range(count)], return_exceptions=True)
+
+
+@pytest.mark.parametrize("error", [
+    asyncio.TimeoutError(),
+    TimeoutError(),
+    RuntimeError("Error code: 429 - Too Many Requests"),
+    RuntimeError("Rate limit reached for gpt-4o"),
+    type("UsageLimitExceededError", (Exception,), {})("quota"),
+])
+def test_is_overload_detects_timeouts_and_rate_limits(error):
+    assert is_overload(error)
+
+
+def test_is_overload_ignores_other_errors():
+    assert not is_overload(ValueError("bad input"))
+    assert not is_overload(asyncio.CancelledError())
+
+
+def test_initial_limit_is_clamped():
+    assert make_limiter(initial=50).stats()["limit"] == 4
+    assert make_limiter(initial=0, min_limit=2).stats()["limit"] == 2
+
+
+def test_healthy_calls_grow_the_limit_up_to_the_ceiling():
+    limiter = make_limiter()
+    asyncio.run(run_jobs(limiter, 40))
+    stats = limiter.stats()
+    assert stats["limit"] == 4
+    assert stats["in_flight"] == 0
+    assert stats["completed"] == 40
+
+
+def test_slow_calls_do_not_grow_the_limit():
+    limiter = make_limiter(target_latency=0.001)
+    asyncio.run(run_jobs(limiter, 6, delay=0.01))
+    assert limiter.stats()["limit"] == 2
+
+
+def test_in_flight_never_exceeds_the_limit():
+    limiter = make_limiter(initial=2, max_limit=2)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.005)
+
+    async def main():
+        await asyncio.gather(*[job() for _ in range(10)])
+
+    asyncio.run(main())
+    assert peak == 2
+    assert limiter.stats()["max_queue_depth"] == 8
+
+
+def test_burst_of_timeouts_halves_the_limit_once():
+    limiter = make_limiter(initial=4, target_latency=60)
+    results = asyncio.run(run_jobs(limiter, 3, error=asyncio.TimeoutError()))
+    assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+    stats = limiter.stats()
+    assert stats["limit"] == 2
+    assert stats["overloads"] == 3
+
+
+def test_limit_never_drops_below_the_floor():
+    limiter = make_limiter(initial=2, min_limit=2, target_latency=0)
+    asyncio.run(run_jobs(limiter, 3, error=TimeoutError()))
+    assert limiter.stats()["limit"] == 2
+
+
+def test_retried_429_reported_by_the_transport_counts_as_overload():
+    limiter = make_limiter(initial=4, target_latency=60)
+
+    async def main():
+        async with limiter.slot():
+            _notify_throttle()  # ce que fait SharedTransport sur une réponse 429
+
+    asyncio.run(main())
+    assert limiter.stats()["limit"] == 2
+    assert limiter.stats()["overloads"] == 1
+
+
+def test_cancelled_waiters_do_not_leak_slots():
+    limiter = make_limiter(initial=1, max_limit=1)
+
+    async def main():
+        tasks = [asyncio.create_task(run_jobs(limiter, 1, delay=0.01)) for _ in range(5)]
+        await asyncio.sleep(0)
+        tasks[2].cancel()
+        tasks[4].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    stats = limiter.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
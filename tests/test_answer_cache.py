@@ -0,0 +1,93 @@
+# tests/test_answer_cache.py
+
+import pytest
+
+from utils import answer_cache
+from utils.answer_cache import SemanticAnswerCache, answer_ttl
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(answer_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(clock):
+    return SemanticAnswerCache(max_entries=2, threshold=0.95)
+
+
+def test_empty_cache_misses(cache):
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats() == {"hits": 0, "misses": 1, "entries": 0}
+
+
+def test_similar_question_hits_and_dissimilar_misses(cache):
+    cache.add("What is LangGraph?", [1.0, 0.0], "A graph library.", ["rag"], ttl=60)
+    hit = cache.lookup([0.99, 0.05])  # cosinus ≈ 0.999
+    assert hit.answer == "A graph library."
+    assert hit.tools == ["rag"]
+    assert hit.similarity == pytest.approx(0.9987, abs=1e-3)
+    assert cache.lookup([0.7, 0.7]) is None  # cosinus ≈ 0.71
+
+
+def test_vectors_are_compared_regardless_of_norm(cache):
+    cache.add("q", [2.0, 0.0], "a", [], ttl=60)
+    assert cache.lookup([10.0, 0.0]) is not None
+
+
+def test_entry_expires_after_its_ttl(cache, clock):
+    cache.add("q", [1.0, 0.0], "a", [], ttl=10)
+    clock.now += 11
+    assert cache.lookup([1.0, 0.0]) is None
+    assert len(cache) == 0
+
+
+def test_zero_ttl_is_not_stored(cache):
+    cache.add("q", [1.0, 0.0], "a", [], ttl=0)
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entry_is_replaced_when_full(cache, clock):
+    cache.add("x", [1.0, 0.0], "x", [], ttl=60)
+    clock.now += 1
+    cache.add("y", [0.0, 1.0], "y", [], ttl=60)
+    clock.now += 1
+    cache.lookup([1.0, 0.0])  # x devient le plus récent
+    clock.now += 1
+    cache.add("z", [-1.0, 0.0], "z", [], ttl=60)
+    assert cache.lookup([0.0, 1.0]) is None
+    assert cache.lookup([1.0, 0.0]).answer == "x"
+    assert cache.lookup([-1.0, 0.0]).answer == "z"
+
+
+def test_expired_slot_is_reused_before_evicting(cache, clock):
+    cache.add("x", [1.0, 0.0], "x", [], ttl=5)
+    cache.add("y", [0.0, 1.0], "y", [], ttl=60)
+    clock.now += 6
+    cache.add("z", [-1.0, 0.0], "z", [], ttl=60)
+    assert cache.lookup([0.0, 1.0]).answer == "y"
+    assert cache.lookup([-1.0, 0.0]).answer == "z"
+
+
+def test_clear_resets_entries_and_counters(cache):
+    cache.add("q", [1.0, 0.0], "a", [], ttl=60)
+    cache.lookup([1.0, 0.0])
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0}
+
+
+def test_web_answers_get_the_short_ttl(monkeypatch):
+    monkeypatch.setenv("ANSWER_CACHE_TTL", "3600")
+    monkeypatch.setenv("ANSWER_CACHE_FRESH_TTL", "300")
+    assert answer_ttl(["rag"]) == 3600
+    assert answer_ttl(["rag", "tavily_search"]) == 300
@@ -0,0 +1,105 @@
+# tests/test_context_packer.py
+
+import pytest
+
+from DeepResearch_HITL.model import SearchResult
+from DeepResearch_HITL.utils import context_packer
+from DeepResearch_HITL.utils.context_packer import (
+    count_tokens, digest_entry, is_informative, pack, pack_results, relevance, truncate_tokens,
+)
+from utils.model_routing import get_role_model
+
+INFORMATIVE = "LangGraph builds stateful multi agent applications as graphs of nodes that share a typed state object."
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    """Un token par mot : budgets prévisibles sans les fichiers d'encodage tiktoken. Enregistre le modèle demandé."""
+    models = []
+
+    def count(text, model=context_packer.DEFAULT_MODEL):
+        models.append(model)
+        return len(text.split())
+
+    monkeypatch.setattr(context_packer, "count_tokens", count)
+    return models
+
+
+@pytest.fixture
+def tiktoken_available():
+    try:
+        count_tokens("probe")
+    except Exception:
+        pytest.skip("tiktoken encoding files are not available offline")
+
+
+def result(title, summary=INFORMATIVE):
+    return SearchResult(title=title, url=f"https://example.com/{title}", summary=summary)
+
+
+def test_relevance_is_the_share_of_query_terms_found():
+    assert relevance("graph agents memory", "Agents talk to a graph") == pytest.approx(2 / 3)
+    assert relevance("the and for", "anything") == 0.0  # que des mots vides
+
+
+@pytest.mark.parametrize("summary, expected", [
+    (INFORMATIVE, True),
+    ("Too short to be useful.", False),
+    ("This page contains minimal relevant content about the query, mostly navigation links and ads here.", False),
+    ("", False),
+])
+def test_is_informative(summary, expected):
+    assert is_informative(result("r", summary)) is expected
+
+
+def test_pack_keeps_the_most_relevant_items_within_budget(word_tokens):
+    items = ["cooking pasta recipe", "langgraph agent graph", "weather today sunny", "agent graph state"]
+    assert pack("langgraph agent graph", items, lambda s: s, budget=6) == ["langgraph agent graph", "agent graph state"]
+
+
+def test_pack_preserves_original_order(word_tokens):
+    items = ["agent a", "unrelated b", "langgraph agent c"]
+    assert pack("langgraph agent", items, lambda s: s, budget=100) == items
+
+
+def test_pack_skips_oversized_items_but_keeps_smaller_ones(word_tokens):
+    items = ["agent " * 50, "agent small"]
+    assert pack("agent", items, lambda s: s, budget=10) == ["agent small"]
+
+
+def test_pack_with_zero_budget_keeps_nothing(word_tokens):
+    assert pack("agent", ["agent"], lambda s: s, budget=0) == []
+
+
+def test_pack_results_drops_empty_summaries(word_tokens):
+    results = [result("good"), result("empty", "No relevant content.")]
+    assert [r.title for r in pack_results("langgraph", results, lambda r: r.summary, budget=1000)] == ["good"]
+
+
+def test_pack_counts_tokens_with_the_given_model(word_tokens):
+    pack("agent", ["agent one", "agent two"], lambda s: s, budget=10, model="gpt-4o-mini")
+    assert set(word_tokens) == {"gpt-4o-mini"}
+
+
+def test_role_model_follows_the_tier_routing(monkeypatch):
+    monkeypatch.setenv("MODEL_TIER_FOLLOWUP_AGENT", "fast")
+    monkeypatch.setenv("MODEL_FAST", "gpt-4.1-mini")
+    assert get_role_model("followup_agent") == "gpt-4.1-mini"
+
+
+def test_truncate_tokens_respects_the_budget(tiktoken_available):
+    text = "word " * 200
+    truncated = truncate_tokens(text, 20, "gpt-4o-mini")
+    assert truncated.endswith("…")
+    assert count_tokens(truncated.rstrip("…"), "gpt-4o-mini") <= 20
+    assert truncate_tokens("short text", 20) == "short text"
+
+
+def test_digest_entry_is_one_compact_line(tiktoken_available):
+    entry = digest_entry(result("title", "line one\n\nline   two " * 30), 10)
+    assert entry.startswith("- title: line one line two")
+    assert "\n" not in entry
+
+
+def test_unknown_model_falls_back_to_o200k(tiktoken_available):
+    assert count_tokens("hello world", "some-future-model") == count_tokens("hello world", "gpt-4o")
@@ -0,0 +1,19 @@
+# tests/test_deepresearch_config.py
+
+import os
+
+from DeepResearch_HITL.utils import config as deepresearch_config
+from utils import config as shared_config
+
+
+def test_both_apps_default_to_the_same_cache_dir(monkeypatch):
+    monkeypatch.delenv("CACHE_DIR", raising=False)
+    assert deepresearch_config.get_cache_dir() == shared_config.get_cache_dir()
+
+
+def test_checkpoint_db_follows_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.delenv("CHECKPOINT_DB", raising=False)
+    monkeypatch.setenv("CACHE_DIR", str(tmp_path))
+    assert deepresearch_config.get_checkpoint_path() == os.path.join(str(tmp_path), "deepresearch_checkpoints.sqlite")
+    monkeypatch.setenv("CHECKPOINT_DB", "/data/runs.sqlite")
+    assert deepresearch_config.get_checkpoint_path() == "/data/runs.sqlite"
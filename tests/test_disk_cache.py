@@ -0,0 +1,93 @@
+# tests/test_disk_cache.py
+
+import pytest
+
+from utils import disk_cache
+from utils.disk_cache import DiskCache, make_key, normalize_query
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(disk_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return DiskCache(path=str(tmp_path / "cache.sqlite"), table="entries", max_entries=3)
+
+
+def test_normalize_query_ignores_case_and_spacing():
+    assert normalize_query("  What IS\tLangGraph ") == "what is langgraph"
+
+
+def test_make_key_is_stable_and_order_independent_for_dicts():
+    assert make_key("tavily", "q", {"a": 1, "b": 2}) == make_key("tavily", "q", {"b": 2, "a": 1})
+    assert make_key("tavily", "q") != make_key("serper", "q")
+
+
+def test_get_set_and_counters(cache):
+    assert cache.get("missing", "default") == "default"
+    cache.set("k", {"results": [1, 2]})
+    assert cache.get("k") == {"results": [1, 2]}
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_entry_expires_after_its_ttl(cache, clock):
+    cache.set("short", "value", ttl=10)
+    cache.set("forever", "value")
+    clock.now += 11
+    assert cache.get("short") is None
+    assert cache.get("forever") == "value"
+    assert cache.stats()["entries"] == 1
+
+
+def test_default_ttl_applies_when_none_is_given(tmp_path, clock):
+    cache = DiskCache(path=str(tmp_path / "ttl.sqlite"), ttl=5)
+    cache.set("k", 1)
+    clock.now += 6
+    assert cache.get("k") is None
+
+
+def test_least_recently_used_entry_is_evicted(cache, clock):
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+        clock.now += 1
+    cache.get("a")  # a devient le plus récent
+    clock.now += 1
+    cache.set("d", "d")
+    assert cache.get("b") is None
+    assert [cache.get(k) for k in ("a", "c", "d")] == ["a", "c", "d"]
+
+
+def test_clear_with_prefix_keeps_other_keys(cache):
+    cache.set("query_agent:1", 1)
+    cache.set("query_agentx:2", 2)  # même début de nom, autre préfixe
+    cache.set("search_agent:3", 3)
+    cache.get("search_agent:3")
+    cache.clear(prefix="query_agent:")
+    assert cache.get("query_agent:1") is None
+    assert cache.get("query_agentx:2") == 2
+    assert cache.get("search_agent:3") == 3
+
+
+def test_clear_without_prefix_empties_the_table_and_counters(cache):
+    cache.set("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "entries": 0}
+
+
+def test_entries_survive_a_new_connection(tmp_path, clock):
+    path = str(tmp_path / "persist.sqlite")
+    DiskCache(path=path).set("k", [1, 2, 3])
+    assert DiskCache(path=path).get("k") == [1, 2, 3]
@@ -0,0 +1,67 @@
+# tests/test_llm_cache.py
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from utils.config import get_llm_cache_ttl
+from utils.disk_cache import DiskCache
+from utils.llm_cache import DiskLLMCache, is_cache_hit
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DiskCache(path=str(tmp_path / "llm.sqlite"), table="llm_responses")
+
+
+def generation(text):
+    return ChatGeneration(message=AIMessage(content=text, id="run-original"))
+
+
+def test_cached_response_is_marked_and_gets_a_new_id(store):
+    cache = DiskLLMCache("query_agent", ttl=60, store=store)
+    cache.update("prompt", "gpt-4o", [generation("answer")])
+    first = cache.lookup("prompt", "gpt-4o")
+    second = cache.lookup("prompt", "gpt-4o")
+    assert first[0].message.content == "answer"
+    assert first[0].message.response_metadata["cache_hit"] is True
+    assert first[0].message.id != second[0].message.id != "run-original"
+    assert is_cache_hit(LLMResult(generations=[first]))
+    assert not is_cache_hit(LLMResult(generations=[[generation("fresh")]]))
+
+
+def test_key_depends_on_role_model_and_prompt(store):
+    query = DiskLLMCache("query_agent", ttl=60, store=store)
+    query.update("prompt", "gpt-4o", [generation("answer")])
+    assert query.lookup("other prompt", "gpt-4o") is None
+    assert query.lookup("prompt", "gpt-4o-mini") is None
+    assert DiskLLMCache("search_agent", ttl=60, store=store).lookup("prompt", "gpt-4o") is None
+
+
+def test_clear_only_drops_the_roles_own_entries(store):
+    query = DiskLLMCache("query_agent", ttl=60, store=store)
+    search = DiskLLMCache("search_agent", ttl=60, store=store)
+    query.update("prompt", "gpt-4o", [generation("query")])
+    search.update("prompt", "gpt-4o", [generation("search")])
+    query.clear()
+    assert query.lookup("prompt", "gpt-4o") is None
+    assert search.lookup("prompt", "gpt-4o")[0].message.content == "search"
+
+
+def test_research_agents_follow_the_global_ttl(monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_TTL_QUERY_AGENT", raising=False)
+    monkeypatch.delenv("LLM_CACHE_TTL", raising=False)
+    assert get_llm_cache_ttl("query_agent") == 7 * 24 * 3600
+    monkeypatch.setenv("LLM_CACHE_TTL", "3600")
+    assert get_llm_cache_ttl("query_agent") == 3600
+    monkeypatch.setenv("LLM_CACHE_TTL_QUERY_AGENT", "0")
+    assert get_llm_cache_ttl("query_agent") == 0
+
+
+@pytest.mark.parametrize("role", ["agent", "rag", "memory"])
+def test_opt_in_roles_ignore_the_global_ttl(monkeypatch, role):
+    monkeypatch.setenv("LLM_CACHE_TTL", "3600")
+    monkeypatch.delenv(f"LLM_CACHE_TTL_{role.upper()}", raising=False)
+    assert get_llm_cache_ttl(role) == 0
+    monkeypatch.setenv(f"LLM_CACHE_TTL_{role.upper()}", "60")
+    assert get_llm_cache_ttl(role) == 60
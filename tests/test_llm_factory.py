@@ -0,0 +1,166 @@
+# tests/test_llm_factory.py
+
+import asyncio
+import json
+import threading
+
+import httpx
+import pytest
+
+from utils import llm_factory
+from utils.llm_factory import (
+    RETRY_HEADER, RateLimiter, SharedTransport, TokenBucket, _backoff, client_kwargs, estimate_request, on_throttle,
+)
+
+
+class Clock:
+    def __init__(self, now=100.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_factory.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_RETRIES", "3")
+    monkeypatch.setenv("LLM_RETRY_BASE", "0")
+
+
+# --- Limiteur RPM / TPM ---
+def test_bucket_serves_its_capacity_without_waiting(clock):
+    bucket = TokenBucket(per_minute=60)
+    assert [bucket.reserve(1) for _ in range(60)] == [0.0] * 60
+
+
+def test_bucket_debt_is_repaid_at_the_refill_rate(clock):
+    bucket = TokenBucket(per_minute=60)  # 1 jeton par seconde
+    bucket.reserve(60)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    assert bucket.reserve(1) == pytest.approx(2.0)  # servi après le précédent
+    clock.now += 10
+    assert bucket.reserve(1) == pytest.approx(0.0)
+
+
+def test_bucket_refill_is_capped_at_capacity(clock):
+    bucket = TokenBucket(per_minute=60)
+    clock.now += 3600
+    bucket.reserve(60)
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_oversized_request_waits_at_most_one_minute(clock):
+    bucket = TokenBucket(per_minute=60)
+    bucket.reserve(60)
+    assert bucket.reserve(10_000) == pytest.approx(60.0)
+
+
+def test_rate_limiter_waits_for_the_tighter_bucket(clock):
+    limiter = RateLimiter(rpm=600, tpm=600)
+    assert limiter.reserve(600) == 0.0
+    assert limiter.reserve(60) == pytest.approx(6.0)
+
+
+# --- Estimation et backoff ---
+def test_estimate_request_counts_prompt_and_reserved_output():
+    body = {"model": "gpt-4o", "messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions", json=body)
+    model, tokens = estimate_request(request)
+    assert model == "gpt-4o"
+    assert tokens == pytest.approx(100 + 50 + 1, abs=5)
+
+
+def test_backoff_honours_retry_after(monkeypatch):
+    monkeypatch.setenv("LLM_RETRY_MAX", "30")
+    assert _backoff(0, httpx.Response(429, headers={"retry-after-ms": "1500"})) == 1.5
+    assert _backoff(0, httpx.Response(429, headers={"retry-after": "2"})) == 2.0
+    assert _backoff(0, httpx.Response(429, headers={"retry-after": "120"})) == 30.0
+
+
+def test_backoff_without_header_is_bounded(monkeypatch):
+    monkeypatch.setenv("LLM_RETRY_BASE", "1")
+    assert all(0 <= _backoff(3, None) <= 8 for _ in range(100))
+
+
+# --- Transport partagé ---
+class Upstream:
+    """Faux serveur OpenAI : renvoie les statuts prévus dans l'ordre, puis 200."""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.requests = []
+        self.threads = set()
+
+    def __call__(self, request):
+        self.requests.append(request)
+        self.threads.add(threading.current_thread().name)
+        status = self.statuses.pop(0) if self.statuses else 200
+        return httpx.Response(status, json={"status": status})
+
+
+def make_request(model, retries=True):
+    headers = {} if retries else {RETRY_HEADER: "0"}
+    body = {"model": model, "messages": [{"role": "user", "content": "hi"}]}
+    return httpx.Request("POST", "https://api.openai.com/v1/chat/completions", json=body, headers=headers)
+
+
+def test_sync_requests_retry_on_429():
+    upstream = Upstream(429, 503)
+    transport = SharedTransport(sync_pool=httpx.MockTransport(upstream))
+    response = transport.handle_request(make_request("sync-retry"))
+    assert response.status_code == 200
+    assert len(upstream.requests) == 3
+
+
+def test_retry_policy_is_read_per_request_and_not_forwarded():
+    upstream = Upstream(429, 429)
+    transport = SharedTransport(sync_pool=httpx.MockTransport(upstream))
+    response = transport.handle_request(make_request("sync-no-retry", retries=False))
+    assert response.status_code == 429
+    assert len(upstream.requests) == 1
+    assert RETRY_HEADER not in upstream.requests[0].headers
+
+
+def test_async_requests_share_one_pool_across_event_loops():
+    upstream = Upstream(429)
+    transport = SharedTransport(async_pool=httpx.MockTransport(upstream))
+
+    async def call():
+        async with httpx.AsyncClient(transport=transport) as client:
+            response = await client.send(make_request("async-pool"))
+            return response.status_code, json.loads(await response.aread())
+
+    try:
+        assert asyncio.run(call()) == (200, {"status": 200})
+        loop = transport._loop
+        assert asyncio.run(call()) == (200, {"status": 200})  # nouvelle boucle, même pool
+        assert transport._loop is loop
+        assert upstream.threads == {"llm-http-pool"}
+        assert len(upstream.requests) == 3
+    finally:
+        transport.shutdown()
+    assert transport._loop is None
+
+
+def test_429_is_reported_to_the_throttle_observer_even_when_retried():
+    upstream = Upstream(429)
+    transport = SharedTransport(sync_pool=httpx.MockTransport(upstream))
+    events = []
+    with on_throttle(lambda: events.append("throttled")):
+        assert transport.handle_request(make_request("observer")).status_code == 200
+    assert events == ["throttled"]
+
+
+def test_client_kwargs_disable_sdk_retries_and_mark_single_attempt():
+    assert client_kwargs()["max_retries"] == 0
+    assert client_kwargs()["default_headers"] is None
+    kwargs = client_kwargs(retries=False, default_headers={"x-app": "chatbot"})
+    assert kwargs["default_headers"] == {"x-app": "chatbot", RETRY_HEADER: "0"}
+    assert kwargs["http_async_client"] is client_kwargs()["http_async_client"]
@@ -0,0 +1,71 @@
+# tests/test_local_index.py
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from my_tools.local_index import LocalVectorStore
+
+VECTORS = {
+    "cats": [1.0, 0.0, 0.0],
+    "dogs": [0.8, 0.6, 0.0],
+    "cars": [0.0, 0.0, 2.0],
+}
+
+
+class TableEmbeddings(Embeddings):
+    """Vecteurs fixes par texte : résultats de recherche entièrement prévisibles."""
+
+    def embed_documents(self, texts):
+        return [VECTORS[t] for t in texts]
+
+    def embed_query(self, text):
+        return VECTORS[text]
+
+
+@pytest.fixture(params=[False, True], ids=["float32", "int8"])
+def store(request, tmp_path):
+    texts = list(VECTORS)
+    metadatas = [{"source": t} for t in texts]
+    return LocalVectorStore.build(str(tmp_path / "index"), texts, TableEmbeddings(), metadatas=metadatas, quantize=request.param)
+
+
+def test_manifest_describes_the_index(store):
+    assert store.manifest["count"] == 3
+    assert store.manifest["dim"] == 3
+    assert store.manifest["dtype"] == ("int8" if store.quantized else "float32")
+
+
+def test_results_are_ranked_by_cosine_similarity(store):
+    results = store.similarity_search_with_score("cats", k=3)
+    assert [doc.page_content for doc, _ in results] == ["cats", "dogs", "cars"]
+    scores = [score for _, score in results]
+    tolerance = 0.02 if store.quantized else 1e-6
+    assert scores == pytest.approx([1.0, 0.8, 0.0], abs=tolerance)
+    assert results[0][0].metadata == {"source": "cats"}
+
+
+def test_k_is_capped_at_the_index_size(store):
+    assert len(store.similarity_search("cars", k=10)) == 3
+
+
+def test_search_does_not_modify_the_query_vector(store):
+    vector = np.array([3.0, 4.0, 0.0], dtype=np.float32)
+    store.similarity_search_by_vector(vector, k=1)
+    assert vector.tolist() == [3.0, 4.0, 0.0]
+
+
+def test_search_accepts_a_read_only_query_vector(store):
+    vector = np.frombuffer(np.array([0.0, 0.0, 1.0], dtype=np.float32).tobytes(), dtype=np.float32)
+    assert not vector.flags.writeable
+    assert store.similarity_search_by_vector(vector, k=1)[0].page_content == "cars"
+
+
+def test_index_can_be_reopened(store):
+    reopened = LocalVectorStore(store.path, TableEmbeddings())
+    assert reopened.similarity_search("dogs", k=1)[0].page_content == "dogs"
+
+
+def test_index_is_read_only(store):
+    with pytest.raises(NotImplementedError):
+        store.add_texts(["new"])
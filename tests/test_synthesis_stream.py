@@ -0,0 +1,56 @@
+# tests/test_synthesis_stream.py
+
+import asyncio
+
+import httpx
+import openai
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from DeepResearch_HITL.research_agents import synthesis_agent as synthesis
+from DeepResearch_HITL.utils.reporter import ReportStream
+from utils.model_routing import FALLBACK_ERRORS
+
+
+class StallingModel(GenericFakeChatModel):
+    """Modèle principal qui commence à streamer puis dépasse son budget de latence."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for i, chunk in enumerate(super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)):
+            if i == 3:
+                raise openai.APITimeoutError(request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions"))
+            yield chunk
+
+
+def fake(text, cls=GenericFakeChatModel):
+    return cls(messages=iter([AIMessage(content=text)]))
+
+
+def generate(monkeypatch, llm, stream):
+    monkeypatch.setattr(synthesis, "llm", llm)
+    return asyncio.run(synthesis.synthesis_agent("findings", on_token=stream.write, on_reset=stream.reset))
+
+
+def test_report_is_streamed_token_by_token(monkeypatch):
+    stream = ReportStream()
+    tokens = []
+    monkeypatch.setattr(stream, "write", lambda token: (tokens.append(token), ReportStream.write(stream, token)))
+    report = generate(monkeypatch, fake("# Report on graph agents"), stream)
+    assert report == "# Report on graph agents"
+    assert stream.text == "# Report on graph agents"
+    assert len(tokens) > 1
+
+
+def test_fallback_mid_stream_replaces_the_partial_report(monkeypatch):
+    primary = fake("# Primary report that never finishes", StallingModel)
+    fallback = fake("# Fallback report")
+    stream = ReportStream()
+    report = generate(monkeypatch, primary.with_fallbacks([fallback], exceptions_to_handle=FALLBACK_ERRORS), stream)
+    assert report == "# Fallback report"
+    assert stream.text == "# Fallback report"  # aucun reste du flux interrompu
+
+
+def test_failure_without_fallback_is_reported(monkeypatch):
+    with pytest.raises(RuntimeError, match="Synthesis generation failed"):
+        generate(monkeypatch, fake("# Primary report that never finishes", StallingModel), ReportStream())
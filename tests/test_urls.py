@@ -0,0 +1,36 @@
+# tests/test_urls.py
+
+import pytest
+
+from DeepResearch_HITL.utils.urls import canonical_url
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://example.com/page", "https://example.com/page"),
+    ("http://WWW.Example.com/page/", "https://example.com/page"),
+    ("https://example.com:443/page", "https://example.com/page"),
+    ("http://example.com:80/", "https://example.com/"),
+    ("https://example.com:8443/page", "https://example.com:8443/page"),
+    ("https://example.com/page#section", "https://example.com/page"),
+    ("https://example.com", "https://example.com/"),
+    ("  https://example.com/page  ", "https://example.com/page"),
+])
+def test_canonical_url(url, expected):
+    assert canonical_url(url) == expected
+
+
+def test_tracking_parameters_are_dropped():
+    url = "https://example.com/a?utm_source=x&UTM_Medium=y&gclid=1&fbclid=2&id=7"
+    assert canonical_url(url) == "https://example.com/a?id=7"
+
+
+def test_remaining_parameters_are_sorted():
+    assert canonical_url("https://example.com/a?b=2&a=1") == canonical_url("https://example.com/a?a=1&b=2")
+
+
+def test_path_case_is_kept():
+    assert canonical_url("https://example.com/Page") != canonical_url("https://example.com/page")
+
+
+def test_empty_url():
+    assert canonical_url("   ") == ""